@@ -0,0 +1,36 @@
+import argparse
+import sys
+
+from benchmarks import suite, timing
+
+parser = argparse.ArgumentParser(
+    prog="benchmarks",
+    description="Times grammar sampling, annotation, rendering, scope lookups and MRs "
+                "on fixed seeds, grouped by program size.",
+)
+parser.add_argument("--seeds", type=int, default=30, help="number of fixed seeds")
+parser.add_argument("--repeat", type=int, default=5, help="repetitions of each benchmark")
+parser.add_argument("--only", type=str, default=None,
+                    help="only run benchmarks whose names start with this prefix")
+parser.add_argument("--output", "-o", type=str, default=None,
+                    help="save the results to this JSON file")
+parser.add_argument("--baseline", type=str, default=None,
+                    help="compare the results against those saved in this JSON file")
+parser.add_argument("--threshold", type=float, default=0.1,
+                    help="fraction by which a benchmark may be slower than the baseline")
+
+args = parser.parse_args()
+
+results = suite.run(seed_count=args.seeds, repeat=args.repeat, only=args.only)
+
+if args.output:
+    timing.save(args.output, results, seeds=args.seeds, repeat=args.repeat)
+
+comparisons = None
+if args.baseline:
+    comparisons = timing.compare(results, timing.load(args.baseline), args.threshold)
+
+timing.report(results, comparisons)
+
+if comparisons and any(regressed for *_, regressed in comparisons):
+    sys.exit(1)
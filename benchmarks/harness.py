@@ -0,0 +1,131 @@
+"""
+An end-to-end benchmark of the test harness, which runs the `Scheduler` on fixed seeds
+with the stand-in compiler, `scripts/swiftc_stub.py`, at several numbers of workers.
+
+For each number of workers it reports the seeds tested per second, the scheduler's
+overhead, and the fraction of the time the workers were idle. The overhead is the CPU
+time which the harness's own process spent per seed: scheduling jobs, writing their
+sources and starting the compiler, but not generating programs, which is done by
+other processes, nor compiling them. The stub's latency and failures are set by
+options, so the harness can be measured without a Swift toolchain.
+
+Run with `python3 -m benchmarks.harness`.
+"""
+from swiftsmith.harness import Scheduler, Toolchain
+from swiftsmith.metamorphic import unnecessary_addition
+
+from benchmarks import suite, timing
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+STUB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "swiftc_stub.py")
+
+
+def default_workers():
+    """Powers of two up to the number of CPUs."""
+    workers = [1]
+    while workers[-1] * 2 <= (os.cpu_count() or 1):
+        workers.append(workers[-1] * 2)
+    return workers
+
+
+def measure(workers, seeds, stub_options=(), generators=None, batch_size=1):
+    """Tests seeds with a scheduler of `workers` workers, and summarizes its report."""
+    toolchain = Toolchain(swiftc=[sys.executable, STUB] + list(stub_options))
+    with tempfile.TemporaryDirectory() as directory:
+        scheduler = Scheduler(
+            toolchain,
+            workers=workers,
+            directory=directory,
+            job_options={"mr": unnecessary_addition},
+            generators=generators,
+            batch_size=batch_size,
+        )
+        cpu = time.process_time()
+        report = asyncio.run(scheduler.run(seeds))
+        cpu = time.process_time() - cpu
+
+    elapsed = report["elapsed"]
+    busy = sum(report["stages"][name]["busy"] for name in ["compile", "link", "run"])
+    return {
+        # Seconds per seed, so that results can be compared like the other benchmarks.
+        "min": elapsed / len(seeds),
+        "seeds_per_second": len(seeds) / elapsed,
+        "overhead": cpu / len(seeds),
+        "idle": 1 - busy / (workers * elapsed),
+        "elapsed": elapsed,
+        "jobs": report["jobs"],
+        "statuses": report["statuses"],
+        "stalls": report["prefetch"]["stalls"],
+    }
+
+
+def run(workers=None, seed_count=40, repeat=1, stub_options=(), generators=None, batch_size=1):
+    """
+    Runs the benchmark at each number of workers, keeping the fastest of `repeat`
+    runs, and returns the results by name.
+    """
+    seeds = suite.fixed_seeds(seed_count)
+    results = {}
+    for count in workers or default_workers():
+        runs = [measure(count, seeds, stub_options, generators, batch_size) for _ in range(repeat)]
+        results[f"harness/workers={count}"] = min(runs, key=lambda result: result["min"])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.harness", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=str, default=None,
+                        help="comma-separated numbers of workers (by default, powers of two "
+                             "up to the number of CPUs)")
+    parser.add_argument("--seeds", type=int, default=40, help="number of fixed seeds")
+    parser.add_argument("--repeat", type=int, default=1, help="repetitions at each number of workers")
+    parser.add_argument("--generators", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--delay", type=float, default=0.05,
+                        help="the stub compiler's latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="a random latency of up to this many seconds, added to --delay")
+    parser.add_argument("--fail", choices=["compile", "link", "run"], default=None,
+                        help="the step which fails for --fail-rate of the programs")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--output", "-o", type=str, default=None,
+                        help="save the results to this JSON file")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="compare the results against those saved in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="fraction by which a benchmark may be slower than the baseline")
+    args = parser.parse_args()
+
+    stub_options = ["--stub-delay", str(args.delay), "--stub-jitter", str(args.jitter)]
+    if args.fail is not None:
+        stub_options += ["--stub-fail", args.fail, "--stub-fail-rate", str(args.fail_rate)]
+    workers = [int(count) for count in args.workers.split(",")] if args.workers else None
+    results = run(workers, args.seeds, args.repeat, stub_options, args.generators, args.batch_size)
+
+    comparisons = None
+    if args.baseline:
+        comparisons = timing.compare(results, timing.load(args.baseline), args.threshold)
+    compared = {c[0]: c for c in comparisons or []}
+    for name, result in results.items():
+        line = (f"{name:<24} {result['seeds_per_second']:>8.2f} seeds/s  "
+                f"overhead {result['overhead'] * 1000:>7.2f} ms/seed  "
+                f"idle {result['idle']:>6.1%}")
+        if name in compared:
+            _, old, _, ratio, regressed = compared[name]
+            line += f"  (baseline {1 / old:.2f} seeds/s, x{ratio:.2f})"
+            if regressed:
+                line += "  REGRESSION"
+        print(line)
+    if args.output:
+        timing.save(args.output, results, seeds=args.seeds, repeat=args.repeat, stub=stub_options)
+    return 1 if any(regressed for *_, regressed in comparisons or []) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
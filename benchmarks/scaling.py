@@ -0,0 +1,184 @@
+"""
+Stress benchmarks on synthetic inputs far larger than generated programs, which fit
+empirical complexity exponents to catch superlinear behavior.
+
+Each benchmark times an operation on inputs of geometrically increasing size `n`,
+then fits `time = c * n^k` by least squares on a log-log scale. A benchmark fails if
+its exponent `k` exceeds the expected exponent by more than a tolerance.
+
+Run with `python3 -m benchmarks.scaling`.
+"""
+from swiftsmith.grammar import Nonterminal, PProduction, PCFG
+from swiftsmith.scope import Scope
+from swiftsmith.semantics import SemanticPCFG
+from swiftsmith.standard_library import Int
+from swiftsmith.types import EnumType
+
+from benchmarks import timing
+
+import argparse
+import io
+import math
+import sys
+import threading
+
+
+def chain_grammar(n, grammar=PCFG):
+    """
+    A grammar with `n` productions, whose only tree is a chain `n` nodes deep:
+    N0 -> "a" N1, N1 -> "a" N2, ..., N(n-1) -> "a"
+    """
+    symbols = [Nonterminal(f"N{i}") for i in range(n)]
+    productions = [PProduction(symbols[i], ("a", symbols[i + 1]), 1.0) for i in range(n - 1)]
+    productions.append(PProduction(symbols[-1], ("a",), 1.0))
+    return grammar(symbols[0], productions)
+
+
+def wide_grammar(n):
+    """
+    A grammar with `n` alternatives for its start symbol, each of which derives a
+    single terminal. This exercises sampling from many productions.
+    """
+    S = Nonterminal("S")
+    return PCFG(S, [PProduction(S, (f"t{i}",), 1.0) for i in range(n)])
+
+
+def deep_tree(n):
+    return chain_grammar(n, grammar=SemanticPCFG).randomtree()
+
+
+def scope_with_variables(n):
+    """A chain of 10 nested scopes containing `n` variables, returning the innermost."""
+    scope = Scope()
+    for depth in range(10):
+        for i in range(n // 10):
+            scope.declare(f"v{depth}_{i}", Int, i % 2 == 0)
+        child = Scope()
+        scope.add_child(child)
+        scope = child
+    return scope
+
+
+def scope_with_enums(n):
+    """A scope nested inside a file scope which declares `n` enums."""
+    root = Scope()
+    root.import_standard_library()
+    for i in range(n):
+        root.add_child(Scope(datatype=EnumType(f"E{i}")))
+    scope = Scope()
+    root.add_child(scope)
+    return scope
+
+
+def timed(setup, run, repeat):
+    return timing.measure(setup, run, repeat)["min"]
+
+
+# Each benchmark maps its name to (sizes, setup(n), run(state), expected exponent).
+benchmarks = {
+    "generation/deep": (
+        [250, 500, 1000, 2000, 4000],
+        lambda n: chain_grammar(n),
+        lambda grammar: grammar.randomtree(),
+        1.0,
+    ),
+    "generation/productions": (
+        [1000, 2000, 4000, 8000, 16000],
+        wide_grammar,
+        lambda grammar: grammar.randomtree(),
+        1.0,
+    ),
+    "annotation/deep": (
+        [250, 500, 1000, 2000, 4000],
+        deep_tree,
+        lambda tree: tree.annotate(scope=Scope()),
+        1.0,
+    ),
+    "rendering/deep": (
+        [250, 500, 1000, 2000, 4000],
+        deep_tree,
+        lambda tree: tree.string(),
+        1.0,
+    ),
+    "rendering/stream": (
+        [250, 500, 1000, 2000, 4000],
+        deep_tree,
+        lambda tree: tree.render_to(io.StringIO()),
+        1.0,
+    ),
+    "accessible_variables": (
+        [6250, 12500, 25000, 50000, 100000],
+        scope_with_variables,
+        lambda scope: scope.accessible_variables(datatype=Int, mutable=True),
+        1.0,
+    ),
+    "accessible_types": (
+        [125, 250, 500, 1000, 2000],
+        scope_with_enums,
+        lambda scope: scope.accessible_types(),
+        1.0,
+    ),
+}
+
+
+def fit_exponent(sizes, times):
+    """Fits `time = c * size^k` by least squares on log-log scale and returns `k`."""
+    xs = [math.log(n) for n in sizes]
+    ys = [math.log(max(t, 1e-9)) for t in times]
+    xmean = sum(xs) / len(xs)
+    ymean = sum(ys) / len(ys)
+    covariance = sum((x - xmean) * (y - ymean) for x, y in zip(xs, ys))
+    variance = sum((x - xmean) ** 2 for x in xs)
+    return covariance / variance
+
+
+def run(repeat=3, tolerance=0.3, only=None):
+    """
+    Runs the scaling benchmarks and returns a dictionary of results by name, each
+    with the measured times, fitted exponent, and whether it passed.
+    """
+    results = {}
+    for name, (sizes, setup, operation, expected) in benchmarks.items():
+        if only is not None and not name.startswith(only):
+            continue
+        times = [timed(lambda: setup(n), operation, repeat) for n in sizes]
+        exponent = fit_exponent(sizes, times)
+        results[name] = {
+            "sizes": sizes,
+            "times": times,
+            "exponent": exponent,
+            "expected": expected,
+            "passed": exponent <= expected + tolerance,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.scaling", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="how far a fitted exponent may exceed the expected exponent")
+    parser.add_argument("--only", type=str, default=None)
+    parser.add_argument("--output", "-o", type=str, default=None)
+    args = parser.parse_args()
+
+    results = run(repeat=args.repeat, tolerance=args.tolerance, only=args.only)
+    for name, result in results.items():
+        status = "ok" if result["passed"] else "FAILED"
+        print(f"{name:<28} n^{result['exponent']:.2f} "
+              f"(expected n^{result['expected']:.0f})  {status}")
+    if args.output:
+        timing.save(args.output, results, repeat=args.repeat, tolerance=args.tolerance)
+    return 0 if all(result["passed"] for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    # Trees thousands of nodes deep are traversed recursively, so they need a deeper
+    # stack than Python's defaults allow.
+    sys.setrecursionlimit(100000)
+    threading.stack_size(512 * 1024 * 1024)
+    status = []
+    thread = threading.Thread(target=lambda: status.append(main()))
+    thread.start()
+    thread.join()
+    sys.exit(status[0] if status else 1)
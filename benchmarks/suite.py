@@ -0,0 +1,148 @@
+from swiftsmith.grammar import ParseTree
+from swiftsmith.metamorphic import failable_initializer, unnecessary_addition, unnecessary_multiplication
+from swiftsmith.program import Program
+from swiftsmith.scope import Scope
+
+from benchmarks.timing import measure
+
+from contextlib import redirect_stdout
+import base64
+import io
+
+mrs = {
+    "unnecessary-addition": unnecessary_addition,
+    "unnecessary-multiplication": unnecessary_multiplication,
+    "failable-init": failable_initializer,
+}
+
+# Programs are bucketed by the number of nodes in their parse trees.
+size_buckets = [("small", 250), ("medium", 1000), ("large", None)]
+
+
+def fixed_seeds(count):
+    """The seeds used by the benchmarks, which are the same in every run."""
+    return [base64.b64encode(i.to_bytes(4, 'big')).decode() for i in range(count)]
+
+
+def bucket_seeds(seeds):
+    """Groups seeds by the size of the parse tree that they generate."""
+    buckets = {name: [] for name, _ in size_buckets}
+    for seed in seeds:
+        size = sum(1 for _ in Program(seed).generate().preorder())
+        for name, limit in size_buckets:
+            if limit is None or size < limit:
+                buckets[name].append(seed)
+                break
+    return {name: seeds for name, seeds in buckets.items() if seeds}
+
+
+def generated(seeds):
+    programs = [Program(seed) for seed in seeds]
+    for program in programs:
+        program.generate()
+    return programs
+
+
+def annotated(seeds):
+    programs = generated(seeds)
+    for program in programs:
+        program.annotate()
+    return programs
+
+
+def replay_expansions(trees):
+    """Rebuilds each tree with `ParseTree.expand`, using the productions it recorded."""
+    for tree in trees:
+        copy = ParseTree(tree.value)
+        stack = [(tree, copy)]
+        while stack:
+            original, node = stack.pop()
+            if original.production is None:
+                continue
+            node.expand([child.value for child in original.children])
+            stack.extend(zip(original.children, node.children))
+
+
+def annotated_scopes(seeds):
+    """
+    Annotates programs, returning all of the scopes created for them. Unlike
+    `Program.annotate`, this keeps the standard library in the scope tree.
+    """
+    scopes = []
+    for program in generated(seeds):
+        rootscope = Scope()
+        rootscope.import_standard_library()
+        program.parsetree.annotate(scope=rootscope)
+        scopes.extend(rootscope.preorder(values=False))
+    return scopes
+
+
+def scope_lookups(scopes):
+    for scope in scopes:
+        scope.accessible_variables()
+        scope.accessible_functions()
+        scope.accessible_types()
+
+
+def apply_mr(mr):
+    def run(programs):
+        # MRs report when they are not applicable by printing.
+        with redirect_stdout(io.StringIO()):
+            for program in programs:
+                mr(program.parsetree)
+    return run
+
+
+def apply_mrs(count):
+    """Applies every MR to each program `count` times, as when deriving many variants."""
+    def run(programs):
+        with redirect_stdout(io.StringIO()):
+            for program in programs:
+                for _ in range(count):
+                    for mr in mrs.values():
+                        mr(program.parsetree)
+    return run
+
+
+def rendered(seeds):
+    programs = annotated(seeds)
+    for program in programs:
+        program.render()
+    return programs
+
+
+def rerender(programs):
+    """Applies an MR to each rendered program and renders it again, as for ModuleB."""
+    apply_mr(unnecessary_addition)(programs)
+    for program in programs:
+        program.render()
+
+
+def benchmarks(seeds):
+    """
+    Returns a dictionary of benchmarks. Each maps its name to a `(setup, run)` pair,
+    where only `run` is timed, and it receives the result of `setup`.
+    """
+    return {
+        "randomtree": (lambda: None, lambda _: generated(seeds)),
+        "expand": (lambda: [p.parsetree for p in generated(seeds)], replay_expansions),
+        "annotate": (lambda: generated(seeds), lambda ps: [p.annotate() for p in ps]),
+        "string": (lambda: annotated(seeds), lambda ps: [p.render() for p in ps]),
+        "scope": (lambda: annotated_scopes(seeds), scope_lookups),
+        **{f"mr/{name}": (lambda: annotated(seeds), apply_mr(mr)) for name, mr in mrs.items()},
+        "mr/repeated": (lambda: annotated(seeds), apply_mrs(10)),
+        "mr/rerender": (lambda: rendered(seeds), rerender),
+    }
+
+
+def run(seed_count=30, repeat=5, only=None):
+    """Runs the benchmarks for each size bucket, returning their timings by name."""
+    results = {}
+    for bucket, seeds in bucket_seeds(fixed_seeds(seed_count)).items():
+        for name, (setup, timed) in benchmarks(seeds).items():
+            key = f"{name}/{bucket}"
+            if only is not None and not key.startswith(only):
+                continue
+            results[key] = measure(setup, timed, repeat)
+            results[key]["programs"] = len(seeds)
+    return results
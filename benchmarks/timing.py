@@ -0,0 +1,76 @@
+import json
+import platform
+import statistics
+import sys
+import time
+
+
+def measure(setup, run, repeat):
+    """
+    Times `run(state)` `repeat` times, where `state` is a fresh result of `setup()`
+    for every repetition. Only `run` is timed.
+    """
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "max": max(times),
+        "runs": times,
+    }
+
+
+def metadata(**kwargs):
+    """Describes the environment that a set of results was measured in."""
+    meta = {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+    }
+    meta.update(kwargs)
+    return meta
+
+
+def save(path, results, **kwargs):
+    with open(path, 'w') as f:
+        json.dump({"meta": metadata(**kwargs), "results": results}, f, indent=2)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares the fastest times of results against a baseline, since they are the
+    least affected by noise from the rest of the system.
+
+    Returns a list of `(name, baseline, current, ratio, regressed)` tuples for the
+    benchmarks present in both, where a benchmark has regressed if it is slower than
+    the baseline by more than `threshold` (a fraction, e.g. 0.1 for 10%).
+    """
+    comparisons = []
+    for name in sorted(set(results) & set(baseline)):
+        old = baseline[name]["min"]
+        new = results[name]["min"]
+        ratio = new / old if old > 0 else float("inf")
+        comparisons.append((name, old, new, ratio, ratio > 1 + threshold))
+    return comparisons
+
+
+def report(results, comparisons=None, file=sys.stdout):
+    """Prints a table of results, and their comparison with a baseline if given."""
+    compared = {c[0]: c for c in comparisons or []}
+    for name, result in sorted(results.items()):
+        line = f"{name:<40} {result['min'] * 1000:>10.3f} ms"
+        if name in compared:
+            _, old, _, ratio, regressed = compared[name]
+            line += f"  (baseline {old * 1000:.3f} ms, x{ratio:.2f})"
+            if regressed:
+                line += "  REGRESSION"
+        print(line, file=file)
@@ -0,0 +1,49 @@
+import argparse
+import json
+import os
+import sys
+
+# Note: expected to be invoked from project root directory.
+sys.path.insert(0, os.getcwd())
+
+from swiftsmith.harness import Campaign, Coordinator, ResultStore
+
+parser = argparse.ArgumentParser(prog="coordinator")
+parser.add_argument("--host", type=str, default="localhost",
+                    help="the address on which to listen for workers")
+parser.add_argument("--port", type=int, default=8470)
+parser.add_argument("--count", type=int, default=None,
+                    help="stop after leasing this many seeds")
+parser.add_argument("--lease-size", type=int, default=16,
+                    help="the number of seeds leased to a worker at once")
+parser.add_argument("--lease-duration", type=float, default=300,
+                    help="the seconds after which a worker's leases expire if it hasn't "
+                         "reported results")
+parser.add_argument("--results", type=str, default="results.db",
+                    help="the SQLite database to which the workers' results are added")
+parser.add_argument("--campaign", type=str, default="campaign.json",
+                    help="the checkpoint of the campaign, which is resumed if it exists")
+parser.add_argument("--campaign-seed", type=str, default=None,
+                    help="the seed from which a new campaign's seeds are derived")
+args = parser.parse_args()
+
+if __name__ == '__main__':
+    coordinator = Coordinator(
+        Campaign(args.campaign, seed=args.campaign_seed),
+        ResultStore(args.results),
+        lease_size=args.lease_size,
+        lease_duration=args.lease_duration,
+        count=args.count,
+    )
+    server = coordinator.serve(args.host, args.port)
+    print(f"Coordinating campaign {coordinator.campaign.seed} at "
+          f"http://{args.host}:{server.server_port}. Press ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        coordinator.flush()
+        coordinator.store.close()
+    print(json.dumps(coordinator.status(), indent=4))
@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import sys
+
+# Note: expected to be invoked from project root directory.
+sys.path.insert(0, os.getcwd())
+
+from swiftsmith.harness import Toolchain
+from swiftsmith.metamorphic import failable_initializer, unnecessary_addition, unnecessary_multiplication
+from swiftsmith.reducer import Reducer
+from swiftsmith.swarm import Configuration
+
+relations = {
+    "unnecessary-addition": unnecessary_addition,
+    "unnecessary-multiplication": unnecessary_multiplication,
+    "failable-init": failable_initializer,
+}
+
+parser = argparse.ArgumentParser(prog="reduce")
+parser.add_argument("seed", type=str, help="the seed of the program which fails")
+parser.add_argument("--swiftc", type=str, default="swiftc",
+                    help="the compiler command, which may include arguments")
+parser.add_argument("-mr", type=str, choices=sorted(relations), default="failable-init",
+                    help="the metamorphic relation with which the seed was tested")
+parser.add_argument("--oracle", action="store_true",
+                    help="the seed was tested against the reference interpreter")
+parser.add_argument("--status", type=str, default=None,
+                    help="the status which reduced programs must still have (by default, "
+                         "that of the unreduced program)")
+parser.add_argument("--configuration", type=str, default=None,
+                    help="the swarm configuration with which the seed was tested, as JSON "
+                         "(as report_results.py --failed prints it)")
+parser.add_argument("--processes", type=int, default=None,
+                    help="the number of candidates to test at once (by default, one per CPU)")
+parser.add_argument("--output", "-o", type=str, default=None,
+                    help="the directory to which the reduced sources are written (by "
+                         "default, reduced/SEED)")
+args = parser.parse_args()
+
+if __name__ == '__main__':
+    reducer = Reducer(
+        args.seed,
+        Toolchain(swiftc=args.swiftc.split()),
+        mr=relations[args.mr],
+        oracle=args.oracle,
+        processes=args.processes,
+        status=args.status,
+        configuration=Configuration.from_dict(json.loads(args.configuration)) if args.configuration else None,
+    )
+    try:
+        sources = reducer.reduce()
+    except ValueError as e:
+        print(f"SwiftSmith: {e}", file=sys.stderr)
+        sys.exit(1)
+    output = args.output or os.path.join("reduced", args.seed.replace("/", "_").replace("+", "-").rstrip("="))
+    os.makedirs(output, exist_ok=True)
+    for name, source in sources.items():
+        with open(os.path.join(output, name), "w") as f:
+            f.write(source)
+    print(json.dumps(reducer.report(), indent=4))
+    print("Reduced sources written to", output)
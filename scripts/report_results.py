@@ -0,0 +1,42 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+
+# Note: expected to be invoked from project root directory.
+sys.path.insert(0, os.getcwd())
+
+from swiftsmith.harness import ResultStore
+
+parser = argparse.ArgumentParser(prog="report_results")
+parser.add_argument("results", type=str, nargs="?", default="results.db",
+                    help="the SQLite database written by run_tests.py or run_tests_parallel.py")
+parser.add_argument("--since", type=float, default=None,
+                    help="measure the throughput over the last this many hours")
+parser.add_argument("--failed", type=str, nargs="?", const="", default=None,
+                    help="list the jobs which failed, or which have the given status")
+parser.add_argument("--limit", type=int, default=20,
+                    help="the number of failed jobs to list")
+args = parser.parse_args()
+
+if __name__ == '__main__':
+    with ResultStore(args.results) as results:
+        if args.failed is not None:
+            for job in results.failed(args.failed or None, limit=args.limit):
+                print(job["status"], "\tseed:", job["seed"], "\tmr:", job["mr"])
+                if job["culprits"]:
+                    print("culprits:", job["culprits"])
+                if job["configuration"]:
+                    print("configuration:", json.dumps(job["configuration"]))
+                if job["stderr"]:
+                    print(job["stderr"])
+        else:
+            since = None
+            if args.since is not None:
+                since = (datetime.datetime.now() - datetime.timedelta(hours=args.since)).timestamp()
+            print(json.dumps({
+                "throughput": results.throughput(since),
+                "stages": results.stages(),
+                "failures": results.failures(),
+            }, indent=4))
@@ -1,35 +1,40 @@
-import base64
+import asyncio
 import logging
 import os
-import random
-import subprocess
 import sys
 
-logging.basicConfig(filename="bug_candidates.txt", filemode='a', level=logging.DEBUG)
+# Note: expected to be invoked from project root directory.
+sys.path.insert(0, os.getcwd())
 
-def seeds():
-    seed_seed = os.urandom(64)
-    random.seed(seed_seed)
-    while True:
-        seed = random.getrandbits(256).to_bytes(32, 'big')
-        yield base64.b64encode(seed)
+from swiftsmith.harness import Campaign, Job, ResultStore, Toolchain, run_job
+
+logging.getLogger("asyncio").setLevel(logging.WARNING)
 
 print("Running tests ad infinitum. Press ctrl+C to quit.")
 
-iteration = 0
-for seed in seeds():
-    print("iteration:", iteration, "\tseed: ", seed)
-    result = subprocess.run(
-        ["sh", "scripts/run_test.sh", "generated", seed],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
-    if result.stdout:
-        logging.info("iteration: " + str(iteration) + "\tseed: " + str(seed))
-        logging.info(result.stdout.decode("utf-8"))
-        print(result.stdout.decode("utf-8"))
-    if result.stderr:
-        logging.info("iteration: " + str(iteration) + "\tseed: " + str(seed))
-        logging.error(result.stderr.decode("utf-8"))
-        print(result.stderr.decode("utf-8"))
-    iteration += 1
+async def main(results, campaign):
+    toolchain = Toolchain()
+    iteration = 0
+    for seed in campaign.seeds():
+        print("iteration:", iteration, "\tseed: ", seed)
+        job = await run_job(Job(seed, "generated"), toolchain)
+        for step in job.steps:
+            if step.stdout:
+                print(step.stdout)
+            if step.stderr:
+                print(step.stderr)
+        if not job.passed:
+            print(job.status())
+        results.add(job)
+        campaign.complete(seed)
+        iteration += 1
+
+with ResultStore("results.db") as results:
+    campaign = Campaign("campaign.json", results=results)
+    print("Campaign", campaign.seed, "from position", campaign.cursor)
+    try:
+        asyncio.run(main(results, campaign))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        campaign.save()
@@ -1,81 +1,135 @@
-import base64
-from concurrent.futures import ThreadPoolExecutor
-import logging
+import argparse
+import asyncio
+import json
 import os
-from queue import Queue
-import random
-import signal
-import subprocess
+import socket
 import sys
-from threading import Lock, Semaphore
 
-logging.basicConfig(filename="bug_candidates.txt", filemode='a')
+# Note: expected to be invoked from project root directory.
+sys.path.insert(0, os.getcwd())
 
-# The maximum number of processes to use.
-process_count = os.cpu_count()
+from swiftsmith.harness import (
+    Campaign, CompileCache, Metrics, RemoteSeeds, ResultStore, Scheduler, Toolchain,
+)
+from swiftsmith.swarm import Swarm
 
-class Counter(object):
-    """A threadsafe counter to keep track of the number of tests that have run"""
-    def __init__(self):
-        self._lock = Lock()
-        self.value = 0
-    
-    def increment(self):
-        with self._lock:
-            self.value += 1
+parser = argparse.ArgumentParser(prog="run_tests_parallel")
+parser.add_argument("--workers", type=int, default=None,
+                    help="the number of compiler processes to run at once (by default, "
+                         "as many as the CPUs and memory allow)")
+parser.add_argument("--generators", type=int, default=None,
+                    help="the number of processes which generate programs ahead of the "
+                         "compiler (by default, a quarter of the workers)")
+parser.add_argument("--count", type=int, default=None,
+                    help="stop after testing this many seeds")
+parser.add_argument("--swiftc", type=str, default="swiftc",
+                    help="the compiler command, which may include arguments")
+parser.add_argument("--cache", type=str, default=None,
+                    help="reuse compiled modules from this directory, and add them to it")
+parser.add_argument("--cache-size", type=float, default=1024,
+                    help="the size in MiB at which the least recently used modules are "
+                         "removed from the cache")
+parser.add_argument("--batch-size", type=int, default=1,
+                    help="test this many programs with each compiler invocation, and "
+                         "find the programs responsible when a batch fails")
+parser.add_argument("--swarm", type=int, default=0,
+                    help="swarm testing: generate each group of this many programs (or "
+                         "batches) with a random configuration of the generator")
+parser.add_argument("--swarm-seed", type=str, default=None,
+                    help="the seed from which the swarm's configurations are sampled")
+parser.add_argument("--directory", type=str, default=None,
+                    help="the directory in which programs are compiled and run (by "
+                         "default, a new directory in /dev/shm if it exists)")
+parser.add_argument("--artifacts", type=str, default="artifacts",
+                    help="the directory to which the programs and build products of "
+                         "failed tests are moved")
+parser.add_argument("--artifacts-size", type=float, default=1024,
+                    help="the size in MiB at which the oldest artifacts are removed")
+parser.add_argument("--status", type=str, default="status.json",
+                    help="the JSON file to which the harness's metrics are written "
+                         "periodically while it runs")
+parser.add_argument("--prometheus", type=str, default=None,
+                    help="also write the metrics to this file, for the textfile "
+                         "collector of the Prometheus node exporter")
+parser.add_argument("--interval", type=float, default=10.0,
+                    help="the number of seconds between writes of the metrics, and "
+                         "between lines of progress")
+parser.add_argument("--results", type=str, default="results.db",
+                    help="the SQLite database to which the results of tests are added")
+parser.add_argument("--campaign", type=str, default="campaign.json",
+                    help="the checkpoint of the campaign, which is resumed if it exists")
+parser.add_argument("--campaign-seed", type=str, default=None,
+                    help="the seed from which a new campaign's seeds are derived (by "
+                         "default, a random one)")
+parser.add_argument("--coordinator", type=str, default=None,
+                    help="the URL of a coordinator (scripts/coordinator.py) from which to "
+                         "lease seeds, and to which to report results, instead of running "
+                         "a campaign locally")
+parser.add_argument("--name", type=str, default=f"{socket.gethostname()}:{os.getpid()}",
+                    help="the name of this worker, for the coordinator")
+args = parser.parse_args()
 
-# The number of tests that have been run
-counter = Counter()
+if args.coordinator:
+    results = RemoteSeeds(args.coordinator, args.name)
+    campaign = None
+else:
+    results = ResultStore(args.results)
+    campaign = Campaign(args.campaign, seed=args.campaign_seed, results=results)
 
-# I'm sure there's a better way to do this. We need to maintain a lock for each
-# `generated{i}` directory so that one subprocess doesn't overwrite code that another
-# process is compiling. The thread that kicks off the subprocess may aquire a lock by
-# getting the next directory in line, and is then responsible for releasing it by
-# putting it back in the queue.
-working_dirs = Queue(maxsize=process_count)
-for i in range(process_count):
-    working_dirs.put(i, block=False)
+def report(job):
+    if job.status() != "passed":
+        print("seed:", job.seed, "\t", job.status())
+        if getattr(job, "culprits", None):
+            print("culprits:", " ".join(job.culprits))
+        step = job.failed_step
+        if step is not None:
+            if step.stdout:
+                print(step.stdout)
+            if step.stderr:
+                print(step.stderr)
+    results.add(job)
+    if campaign is not None:
+        for seed in getattr(job, "seeds", [job.seed]):
+            campaign.complete(seed)
 
-def seeds():
-    seed_seed = os.urandom(64)
-    random.seed(seed_seed)
-    while True:
-        seed = random.getrandbits(256).to_bytes(32, 'big')
-        yield base64.b64encode(seed)
+scheduler = Scheduler(
+    Toolchain(swiftc=args.swiftc.split()),
+    workers=args.workers,
+    on_result=report,
+    generators=args.generators,
+    cache=CompileCache(args.cache, int(args.cache_size * 2**20)) if args.cache else None,
+    batch_size=args.batch_size,
+    directory=args.directory,
+    artifacts=args.artifacts,
+    quota=int(args.artifacts_size * 2**20),
+    metrics=Metrics(args.prometheus, args.status, args.interval, log=sys.stdout),
+    swarm=Swarm(args.swarm_seed, args.swarm) if args.swarm else None,
+)
 
-def unit(queue: Queue):
-    # Ensure that child threads do not catch ctrl+C
-    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT})
-
-    # aquire lock
-    dir_number = working_dirs.get(block=True)
-    seed = queue.get(block=True)
-    result = subprocess.run([
-        "sh", "scripts/run_test.sh", f"generated{dir_number}", seed],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
-    # release lock
-    working_dirs.put(dir_number)
-    counter.increment()
-    print("counter:", counter.value, "\tseed:", seed)
-    if result.stdout:
-        logging.info("iteration: " + str(counter.value) + "\tseed: " + str(seed))
-        logging.info(result.stdout.decode("utf-8"))
-        print(result.stdout.decode("utf-8"))
-    if result.stderr:
-        logging.info("iteration: " + str(counter.value) + "\tseed: " + str(seed))
-        logging.error(result.stderr.decode("utf-8"))
-        print(result.stderr.decode("utf-8"))
-    return result.returncode
+async def work():
+    """Tests the seeds which the coordinator leases until it has none left."""
+    try:
+        while True:
+            summary = await scheduler.run(results.seeds())
+            await results.flush()
+            await results.release()
+            if results.done or scheduler.stopped:
+                return summary
+            await asyncio.sleep(results.wait)
+    finally:
+        await results.close()
 
 if __name__ == '__main__':
-    queue = Queue(maxsize=1)
-    seed = seeds()
-    with ThreadPoolExecutor(max_workers=4) as executor:
+    print("Running tests with", scheduler.workers, "workers. Press ctrl+C to stop, twice to cancel.")
+    if campaign is None:
+        print("Leasing seeds from", args.coordinator, "as", args.name)
+        summary = asyncio.run(work())
+    else:
+        print("Campaign", campaign.seed, "from position", campaign.cursor)
         try:
-            while True:
-                queue.put(next(seed), block=True)
-                f = executor.submit(unit, queue)
-        except KeyboardInterrupt:
-            pass
+            summary = asyncio.run(scheduler.run(campaign.seeds(), count=args.count))
+        finally:
+            campaign.save()
+            results.close()
+        summary["campaign"] = campaign.progress()
+    print(json.dumps(summary, indent=4))
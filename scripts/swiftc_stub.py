@@ -0,0 +1,104 @@
+"""
+A stand-in for swiftc, for testing the harness without a Swift toolchain.
+
+It accepts the commands which the harness runs: `--version`, compiling a module with
+`-emit-module -emit-library Name.swift` writes `libName.so` and `Name.swiftmodule`,
+and compiling tests with `-o test` writes an executable which passes. Its own options
+come before the compiler's:
+
+    python3 scripts/swiftc_stub.py [--stub-delay SECONDS] [--stub-jitter SECONDS]
+                                   [--stub-fail STEP] [--stub-fail-if TEXT]
+                                   [--stub-fail-rate FRACTION] [--stub-size BYTES]
+                                   [--stub-run-delay SECONDS] [--stub-output TEXT]
+                                   ARGS...
+
+`--stub-delay` sleeps before compiling, plus a random time of up to `--stub-jitter`,
+and `--stub-fail` makes the "compile" or "link" step fail, or the compiled tests fail
+when they "run". With `--stub-fail-if`, the step only fails if one of the sources
+which it compiles contains TEXT, and with `--stub-fail-rate`, only for that fraction
+of sources, chosen by their hash so that the same sources always fail.
+
+`--stub-size` pads each library to at least BYTES, and the compiled tests sleep for
+`--stub-run-delay` and print `--stub-output`, to simulate the outputs of real
+programs.
+"""
+import argparse
+import hashlib
+import os
+import random
+import shlex
+import stat
+import sys
+import time
+
+parser = argparse.ArgumentParser(prog="swiftc_stub")
+parser.add_argument("--stub-delay", type=float, default=0.0)
+parser.add_argument("--stub-fail", choices=["compile", "link", "run"], default=None)
+parser.add_argument("--stub-fail-if", type=str, default=None)
+parser.add_argument("--stub-fail-rate", type=float, default=None)
+parser.add_argument("--stub-jitter", type=float, default=0.0)
+parser.add_argument("--stub-size", type=int, default=0)
+parser.add_argument("--stub-run-delay", type=float, default=0.0)
+parser.add_argument("--stub-output", type=str, default=None)
+
+def fraction(texts):
+    """A number in [0, 1) which is determined by the texts."""
+    digest = hashlib.sha256("\0".join(texts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+def main(argv):
+    options, args = parser.parse_known_args(argv)
+    if "--version" in args:
+        print("Swift stub version 0.0 (swiftc_stub.py)")
+        return 0
+    time.sleep(options.stub_delay + random.uniform(0.0, options.stub_jitter))
+    sources = [arg for arg in args if arg.endswith(".swift")]
+    if not sources:
+        print("error: no input files", file=sys.stderr)
+        return 1
+    for source in sources:
+        if not os.path.exists(source):
+            print(f"error: no such file or directory: '{source}'", file=sys.stderr)
+            return 1
+    texts = []
+    for source in sources:
+        with open(source) as f:
+            texts.append(f.read())
+    if options.stub_fail_if is not None:
+        if not any(options.stub_fail_if in text for text in texts):
+            options.stub_fail = None
+    if options.stub_fail_rate is not None and fraction(texts) >= options.stub_fail_rate:
+        options.stub_fail = None
+
+    if "-emit-library" in args:
+        if options.stub_fail == "compile":
+            print(f"{sources[0]}:1:1: error: stub compiler failure", file=sys.stderr)
+            return 1
+        for source, text in zip(sources, texts):
+            name = os.path.splitext(os.path.basename(source))[0]
+            with open(f"lib{name}.so", "w") as f:
+                f.write(text)
+                f.write(" " * (options.stub_size - len(text)))
+            with open(f"{name}.swiftmodule", "w") as f:
+                f.write(name)
+        return 0
+
+    if options.stub_fail == "link":
+        print("error: link command failed with exit code 1", file=sys.stderr)
+        return 1
+    output = args[args.index("-o") + 1] if "-o" in args else "main"
+    with open(output, "w") as f:
+        f.write("#!/bin/sh\n")
+        if options.stub_run_delay:
+            f.write(f"sleep {options.stub_run_delay}\n")
+        if options.stub_output is not None:
+            f.write(f"echo {shlex.quote(options.stub_output)}\n")
+        if options.stub_fail == "run":
+            f.write("echo 'Assertion failed' >&2\nexit 134\n")
+        else:
+            f.write("exit 0\n")
+    os.chmod(output, os.stat(output).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,12 +1,16 @@
+from contextlib import nullcontext
 import argparse
-import base64
-import random
+import os
 import swiftsmith
 import sys
 
+from swiftsmith.coverage import CoverageTracker
+from swiftsmith.memory import MemoryBudgetExceeded, MemoryProfiler
 from swiftsmith.metamorphic import failable_initializer, unnecessary_addition, unnecessary_multiplication
-
-version = "v0.0.2"
+from swiftsmith.profiling import Profiler
+from swiftsmith.program import Program, version
+from swiftsmith.statistics import counters, StatisticsLog
+from swiftsmith.validation import InvalidProgram
 
 ########################################
 #   Argument Parsing                   #
@@ -31,6 +35,32 @@ parser.add_argument("--output", "-o", type=str)
 parser.add_argument("-mr", type=mr)
 parser.add_argument('--version', action='version', version='%(prog)s %(version)s')
 parser.add_argument("--tests", type=str, default=None)
+parser.add_argument("--variants", type=int, default=None,
+                    help="write this many transformed modules, B1 to BN, each of which "
+                         "applies a random composition of MRs (or only the MR given "
+                         "with -mr) to the same program")
+parser.add_argument("--oracle", action="store_true",
+                    help="write tests which check each module against results computed by "
+                         "the reference interpreter, instead of against ModuleA, so that "
+                         "ModuleA isn't written or compiled")
+parser.add_argument("--validate", action="store_true",
+                    help="check that the program (and each transformed module) is valid "
+                         "Swift before writing it, and exit with status 4 if it isn't")
+parser.add_argument("--coverage-log", type=str, default=None,
+                    help="adapt production weights to the coverage recorded in this log, "
+                         "and record the generated program in it")
+parser.add_argument("--profile", type=str, default=None,
+                    help="write the wall and CPU time of each phase to this JSON file")
+parser.add_argument("--profile-pstats", type=str, default=None,
+                    help="run each phase under cProfile and write pstats to this directory")
+parser.add_argument("--stats", type=str, default=None,
+                    help="write generation statistics (lookups, fallbacks, tree shape) to "
+                         "this JSON file")
+parser.add_argument("--memory-profile", type=str, default=None,
+                    help="trace the memory allocated by each phase, and write the top "
+                         "allocating sites and object types to this JSON file")
+parser.add_argument("--memory-budget", type=float, default=None,
+                    help="abort generation if traced memory exceeds this many MiB")
 
 args = parser.parse_args()
 
@@ -38,66 +68,131 @@ args = parser.parse_args()
 #   Program Generation                 #
 ########################################
 
-def decode_seed(b64str: str):
-    binarystr = base64.b64decode(b64str)
-    return int.from_bytes(binarystr, 'big', signed=False)
-
-seed = decode_seed(args.seed)
-random.seed(seed)
-
-parsetree = swiftsmith.swift.randomtree()
-
-# We play a game of musical chairs to ensure that the generated main function uses a
-# function defined in the generated code instead of one imported from the standard
-# library. Public symbols are visible from anywhere in the scope tree, so when the
-# program is generated then the file scope and standard library scope must be in the
-# same tree. When main is generated, they must be in different trees.
-
-rootscope = swiftsmith.Scope()
-rootscope.import_standard_library()
-parsetree.annotate(scope=rootscope)
+profiler = None
+if args.profile or args.profile_pstats or args.memory_profile or args.memory_budget:
+    profiler = Profiler(pstats_dir=args.profile_pstats)
+    profiler.start_program(args.seed)
+
+memory = None
+if args.memory_profile or args.memory_budget:
+    budget = None if args.memory_budget is None else int(args.memory_budget * 2**20)
+    memory = MemoryProfiler(budget=budget, detailed=args.memory_profile is not None)
+    profiler.add_hook(memory)
+    memory.start()
+
+if args.stats:
+    counters.enabled = True
+
+tracker = None
+if args.coverage_log is not None:
+    if os.path.exists(args.coverage_log):
+        tracker = CoverageTracker.load(swiftsmith.swift, args.coverage_log)
+    else:
+        tracker = CoverageTracker(swiftsmith.swift)
 
-# break the link between rootscope and the standard library scopes
-rootscope.children = [rootscope.children[-1]]
+program = Program(
+    args.seed,
+    weights=tracker.weights if tracker else None,
+    profiler=profiler,
+)
 
-########################################
-#   File I/O                           #
-########################################
+# The files written so far, which are removed if generation is aborted.
+written = []
 
 def openmodule(suffix):
     if args.output is None:
-        return open("/dev/stdout", 'w')
+        return nullcontext(sys.stdout)
     else:
+        written.append(args.output + f"{suffix}.swift")
         return open(args.output + f"{suffix}.swift", 'w')
 
-def writemodule(suffix, code):
+def writemodule(suffix, variant=None):
+    if args.validate:
+        program.validate(variant)
     with openmodule(suffix) as f:
         f.write(f"\n// Generated by Swiftsmith {version}")
-        f.write(code)
-
-def writetests(file):
-    from swiftsmith.expression import FunctionCall
-    from swiftsmith.semantics import SemanticParseTree
-
-    f.write(f"\n// Generated by Swiftsmith {version}\n\n")
-    modulename = args.output.split("/")[-1]
-    f.write(f"import {modulename}A\n")
-    f.write(f"import {modulename}B\n\n")
-
-    for _ in range(50):
-        fname, ftype = rootscope.choose_function(at_least=swiftsmith.AccessLevel.public)
-        call = SemanticParseTree(FunctionCall(fname, ftype), [])
-        call.annotate()
-        # TODO: handle prefix, infix, and postfix functions
-        f.write(f"assert(ModuleA.{call.string()}.hashValue == ModuleB.{call.string()}.hashValue)\n")
-
-if args.mr:
-    writemodule("A", parsetree.string())
-    args.mr(parsetree)
-    writemodule("B", parsetree.string())
-
-    if args.tests:
-        with open(args.tests, 'w') as f:
-            writetests(f)
-else:
-    writemodule("", parsetree.string())
+        program.render_to(f, variant)
+
+def generate():
+    parsetree = program.generate()
+
+    if tracker is not None:
+        tracker.record(parsetree, seed=args.seed)
+        tracker.append(args.coverage_log)
+
+    program.annotate()
+
+    if args.stats:
+        statistics = StatisticsLog()
+        statistics.record(parsetree, seed=args.seed)
+        statistics.save(args.stats)
+
+    if args.variants:
+        if not args.oracle:
+            writemodule("A")
+        if args.mr:
+            variants = program.variants([args.mr], args.variants, compose=False)
+        else:
+            variants = program.variants(
+                [unnecessary_addition, unnecessary_multiplication, failable_initializer],
+                args.variants,
+            )
+        suffixes = [f"B{i + 1}" for i in range(len(variants))]
+        for suffix, variant in zip(suffixes, variants):
+            writemodule(suffix, variant)
+        writetests(suffixes)
+    elif args.mr:
+        if args.oracle:
+            # The interpreter needs the untransformed program.
+            variant, = program.variants([args.mr], 1, compose=False)
+            writemodule("B", variant)
+        else:
+            writemodule("A")
+            program.apply(args.mr)
+            writemodule("B")
+        writetests(["B"])
+    else:
+        writemodule("")
+        if args.oracle:
+            writetests([""])
+
+def writetests(suffixes):
+    if not args.tests:
+        return
+    written.append(args.tests)
+    with open(args.tests, 'w') as f:
+        if args.oracle:
+            program.write_oracle_tests(f, args.output.split("/")[-1], variants=suffixes)
+        else:
+            program.write_tests(f, args.output.split("/")[-1], variants=suffixes)
+
+def abort(reason, status):
+    for path in written:
+        if os.path.exists(path):
+            os.remove(path)
+    print(f"SwiftSmith: aborted seed {args.seed}: {reason}", file=sys.stderr)
+    sys.exit(status)
+
+try:
+    generate()
+except MemoryBudgetExceeded as e:
+    abort(e, 3)
+except InvalidProgram as e:
+    abort(f"invalid program: {e.reason}", 4)
+except KeyboardInterrupt:
+    # The budget's watchdog may interrupt just after a phase has ended.
+    if memory is None or memory._exceeded is None:
+        raise
+    abort(f"memory budget exceeded (peak {memory._exceeded} bytes)", 3)
+finally:
+    if memory is not None:
+        memory.stop()
+
+if profiler is not None:
+    profiler.end_program()
+    if args.profile:
+        profiler.save(args.profile)
+    if args.memory_profile:
+        profiler.save(args.memory_profile)
+    if args.profile_pstats:
+        profiler.write_pstats()
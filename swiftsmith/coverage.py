@@ -0,0 +1,313 @@
+import hashlib
+import json
+import os
+
+
+class CoverageTracker(object):
+    """
+    Records which productions of a grammar, and which pairs of productions along
+    parent-child edges, have been exercised by generated programs.
+
+    A tracker also adapts the weights used to sample productions toward those which
+    are under-covered. Its `weights` method may be passed to `PCFG.randomtree`:
+    ```
+    tracker = CoverageTracker(swift)
+    tree = swift.randomtree(weights=tracker.weights)
+    tracker.record(tree, seed)
+    ```
+    A production's probability is scaled by a factor between `min_factor` and
+    `max_factor`, which favors productions that fewer programs have used than their
+    alternatives, and productions which would cover a new pair with their parent.
+
+    Adapting weights may make recursive productions more likely, and so make random
+    trees larger. The adjustment is damped wherever it would raise the growth rate of
+    a recursive part of the grammar above `max_radius` (or above the rate of the
+    grammar's own probabilities, if that is higher). Growth rates of 1 or more mean
+    that the expected size of a random tree is infinite.
+
+    The weights are a pure function of the recorded coverage, so the weights used for
+    any program in a campaign can be reproduced by replaying the campaign's log. With
+    generators running at once, programs are logged in the order they finished.
+    """
+
+    def __init__(
+        self,
+        grammar,
+        min_factor=0.5,
+        max_factor=2.0,
+        pair_boost=1.5,
+        max_radius=0.9,
+    ):
+        assert 0 < min_factor <= 1 <= max_factor, "weight bounds must contain 1"
+        assert 0 <= max_radius < 1, "max_radius must be less than 1"
+        self.grammar = grammar
+        self.max_radius = max_radius
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self.pair_boost = pair_boost
+
+        self._indices = {id(rule): i for i, rule in enumerate(grammar)}
+
+        # The number of programs that have used each production, by index.
+        self.production_counts = [0] * len(grammar)
+
+        # The number of programs that have used each (parent, child) production pair.
+        self.pair_counts = {}
+
+        self._alternatives = {}
+        for j, rule in enumerate(grammar):
+            self._alternatives.setdefault(rule.lhs, []).append(j)
+
+        # A parent production and a nonterminal in its right side determine the
+        # weights for expanding that nonterminal. None is the parent of the root.
+        self._contexts = [(None, symbol) for symbol in self._alternatives]
+        self.possible_pairs = set()
+        for i, rule in enumerate(grammar):
+            for symbol in rule.rhs:
+                if symbol in self._alternatives and (i, symbol) not in self._contexts:
+                    self._contexts.append((i, symbol))
+                    self.possible_pairs.update((i, j) for j in self._alternatives[symbol])
+
+        self._components = self._strongly_connected_components()
+        table = self._damped_table(0.0)
+        self._base_radii = [self._radius(table, c) for c in self._components]
+        self._table = None
+
+        self.log = []
+        # The number of entries of the log which have been written to its file.
+        self._written = 0
+
+    def index(self, rule):
+        """Returns the index of the given production in the tracked grammar."""
+        return self._indices[id(rule)]
+
+    def weights(self, parent, candidates):
+        """Returns adapted weights for the candidate productions of a nonterminal."""
+        i = None if parent is None else self.index(parent)
+        return self.table()[(i, candidates[0].lhs)]
+
+    def table(self):
+        """
+        Returns the current weight table, which maps a parent production index and a
+        nonterminal to the weights of that nonterminal's productions.
+        """
+        if self._table is None:
+            self._table = {}
+            for component, base_radius in zip(self._components, self._base_radii):
+                limit = max(base_radius, self.max_radius)
+                damping = 1.0
+                while True:
+                    rows = self._damped_table(damping, component)
+                    if damping == 0.0 or self._radius(rows, component) <= limit + 1e-9:
+                        break
+                    damping = damping / 2 if damping > 1 / 64 else 0.0
+                self._table.update(rows)
+        return self._table
+
+    def _factor(self, i, j, mean):
+        factor = (mean + 1) / (self.production_counts[j] + 1)
+        if i is not None and (i, j) not in self.pair_counts:
+            factor *= self.pair_boost
+        return min(max(factor, self.min_factor), self.max_factor)
+
+    def _damped_table(self, damping, contexts=None):
+        table = {}
+        for i, symbol in (self._contexts if contexts is None else contexts):
+            alternatives = self._alternatives[symbol]
+            counts = [self.production_counts[j] for j in alternatives]
+            mean = sum(counts) / len(counts)
+            table[(i, symbol)] = [
+                self.grammar[j].probability * self._factor(i, j, mean) ** damping
+                for j in alternatives
+            ]
+        return table
+
+    def _children(self, context):
+        """The contexts which expanding the given context may produce."""
+        for j in self._alternatives[context[1]]:
+            for child in self.grammar[j].rhs:
+                if child in self._alternatives:
+                    yield (j, child)
+
+    def _strongly_connected_components(self):
+        """
+        Partitions the contexts into sets which may derive one another. Each one is a
+        branching process whose growth rate is bounded separately.
+        """
+        reachable = {}
+        for context in self._contexts:
+            seen = set()
+            stack = list(self._children(context))
+            while stack:
+                child = stack.pop()
+                if child not in seen:
+                    seen.add(child)
+                    stack.extend(self._children(child))
+            reachable[context] = seen
+
+        components = []
+        assigned = set()
+        for context in self._contexts:
+            if context in assigned:
+                continue
+            component = [context] + [other for other in self._contexts
+                                     if other != context
+                                     and other in reachable[context]
+                                     and context in reachable[other]]
+            assigned.update(component)
+            components.append(component)
+        return components
+
+    def _radius(self, table, component):
+        """
+        Estimates the spectral radius of the mean matrix of the branching process on
+        the given component. Its random subtrees are finite when it is below 1.
+        """
+        members = set(component)
+        offspring = {}
+        for context in component:
+            weights = table[context]
+            total = sum(weights)
+            children = {}
+            for j, weight in zip(self._alternatives[context[1]], weights):
+                for child in self.grammar[j].rhs:
+                    if (j, child) in members:
+                        children[(j, child)] = children.get((j, child), 0.0) + weight / total
+            offspring[context] = children
+
+        # Power iteration on M + I, which has the same dominant eigenvector as the
+        # nonnegative matrix M but cannot oscillate.
+        vector = {context: 1.0 for context in component}
+        growth = 1.0
+        for _ in range(100):
+            nextvector = {
+                context: vector[context] + sum(
+                    rate * vector[child] for child, rate in offspring[context].items()
+                )
+                for context in component
+            }
+            growth = max(nextvector.values())
+            vector = {context: value / growth for context, value in nextvector.items()}
+        return growth - 1
+
+    def record(self, tree, seed=None):
+        """
+        Records the productions and production pairs used by the given parse tree,
+        which must have been generated by the tracked grammar.
+        """
+        productions = set()
+        pairs = set()
+        for node in tree.preorder(values=False):
+            if node.production is None:
+                continue
+            j = self.index(node.production)
+            productions.add(j)
+            if node.parent is not None and node.parent.production is not None:
+                pairs.add((self.index(node.parent.production), j))
+
+        self._update(productions, pairs)
+        self.log.append({
+            "seed": seed,
+            "productions": sorted(productions),
+            "pairs": sorted(pairs),
+        })
+
+    def _update(self, productions, pairs):
+        self._table = None
+        for j in productions:
+            self.production_counts[j] += 1
+        for pair in pairs:
+            self.pair_counts[pair] = self.pair_counts.get(pair, 0) + 1
+
+    def coverage(self):
+        """Summarizes how much of the grammar has been covered so far."""
+        return {
+            "programs": len(self.log),
+            "productions": sum(1 for count in self.production_counts if count > 0),
+            "total_productions": len(self.production_counts),
+            "pairs": len(self.pair_counts),
+            "total_pairs": len(self.possible_pairs),
+        }
+
+    def uncovered(self):
+        """Returns the productions which no recorded program has used."""
+        return [rule for rule, count in zip(self.grammar, self.production_counts)
+                if count == 0]
+
+    def fingerprint(self):
+        """Identifies the grammar's shape so that logs are not replayed on another."""
+        description = "\n".join(
+            f"{rule.lhs} {len(rule.rhs)} {rule.probability}" for rule in self.grammar
+        )
+        return hashlib.sha1(description.encode("utf-8")).hexdigest()
+
+    def _header(self):
+        return {
+            "grammar": self.fingerprint(),
+            "min_factor": self.min_factor,
+            "max_factor": self.max_factor,
+            "pair_boost": self.pair_boost,
+            "max_radius": self.max_radius,
+        }
+
+    def save(self, path):
+        """Writes the campaign log as JSON lines, preceded by a header line."""
+        with open(path, 'w') as f:
+            f.write(json.dumps(self._header()) + "\n")
+            for entry in self.log:
+                f.write(json.dumps(entry) + "\n")
+        self._written = len(self.log)
+
+    def append(self, path):
+        """
+        Appends the entries recorded since the log was loaded, saved or appended to
+        its file, creating the file with its header if it doesn't exist.
+
+        The new lines are written at once to the file opened for appending, so several
+        generators may record programs in the same log at the same time.
+        """
+        if not os.path.exists(path):
+            # The header is linked into place, so the log never exists without it.
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, 'w') as f:
+                f.write(json.dumps(self._header()) + "\n")
+            try:
+                os.link(temporary, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(temporary)
+        lines = "".join(json.dumps(entry) + "\n" for entry in self.log[self._written:])
+        if lines:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, lines.encode("utf-8"))
+            finally:
+                os.close(fd)
+        self._written = len(self.log)
+
+    @classmethod
+    def load(cls, grammar, path):
+        """Reconstructs a tracker by replaying a campaign log written by `save`."""
+        with open(path) as f:
+            header = json.loads(f.readline())
+            tracker = cls(
+                grammar,
+                min_factor=header["min_factor"],
+                max_factor=header["max_factor"],
+                pair_boost=header["pair_boost"],
+                max_radius=header["max_radius"],
+            )
+            if header["grammar"] != tracker.fingerprint():
+                raise ValueError(f"Coverage log '{path}' was recorded for another grammar")
+            for line in f:
+                entry = json.loads(line)
+                pairs = [tuple(pair) for pair in entry["pairs"]]
+                tracker._update(entry["productions"], pairs)
+                tracker.log.append({
+                    "seed": entry["seed"],
+                    "productions": entry["productions"],
+                    "pairs": pairs,
+                })
+        tracker._written = len(tracker.log)
+        return tracker
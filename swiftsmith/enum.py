@@ -5,6 +5,7 @@ from .modifier import AccessModifier
 from .names import identifier
 from .semantics import Token, SemanticNonterminal, SemanticParseTree, SemanticPCFG
 from .scope import Scope
+from .statistics import counters
 from .types import AccessLevel, Binding, EnumType
 
 import random
@@ -56,6 +57,7 @@ class Case(Token):
             associatedvalues = [random.choice(types) for _ in range(random.randint(0, 1))]
             associatedvalues = [scope.specialize_type(t, at_least=access) for t in associatedvalues]
         except IndexError:
+            counters.increment("fallback.case.associated_values_dropped")
             associatedvalues = []
         self.annotations["associatedvalues"] = associatedvalues
 
@@ -104,6 +106,14 @@ class EnumDeclaration(SemanticNonterminal):
     def annotate(self, scope: Scope, context: SemanticParseTree):
         pass
 
+class Initializer(SemanticNonterminal):
+    """
+    Represents an initializer of an enum. The grammar doesn't produce them, but
+    metamorphic relations add them to enum declarations once they're annotated.
+    """
+    def annotate(self, scope: Scope, context: SemanticParseTree):
+        pass
+
 case_statements = Nonterminal("ENUM_CASE_STATEMENTS")
 case_statement = Nonterminal("ENUM_CASE_STATEMENT")
 static_func_decls = Nonterminal("ENUM_STATIC_FUNC_DECLS")
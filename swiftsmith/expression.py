@@ -1,5 +1,6 @@
 from .grammar import Nonterminal, PProduction
 from .semantics import Token, SemanticNonterminal, SemanticParseTree
+from .statistics import counters
 from .scope import Scope
 from .types import CallSyntax, DataType, EnumType
 
@@ -47,14 +48,19 @@ class Variable(Token):
 
     def annotate(self, scope: Scope, context: SemanticParseTree):
         try:
-            self.annotations["value"] = scope.choose_variable(
+            variable = scope.choose_variable(
                 datatype=self.datatype,
                 mutable=self.mutable
-            ).name
+            )
+            self.annotations["value"] = variable.name
+            self.annotations["variable"] = variable
         except IndexError:
+            counters.increment("fallback.expression.variable_to_literal")
             self.annotations["value"] = self.datatype.newvalue(
                 type_inferred=self.type_inferred,
             )
+            # The value is a literal rather than the name of a variable.
+            self.annotations["variable"] = None
 
     def string(self):
         assert self.is_annotated()
@@ -104,6 +110,7 @@ class Expression(Token):
                 fname, ftype = scope.choose_function(returntype=self.datatype)
                 tree = SemanticParseTree(FunctionCall(fname, ftype), [])
             except IndexError:
+                counters.increment("fallback.expression.function_call_to_variable")
                 tree = SemanticParseTree(Variable(self.datatype))
         
         tree.annotate(scope=scope)
@@ -113,6 +120,10 @@ class Expression(Token):
         assert self.is_annotated()
         return self.annotations["subtree"].string()
 
+    def render_to(self, stream):
+        assert self.is_annotated()
+        self.annotations["subtree"].render_to(stream)
+
     def __eq__(self, other):
         # Two expression symbols must be of the same datatype to be equal.
         return self.__class__ == other.__class__ and \
@@ -176,4 +187,4 @@ class FunctionCall(SemanticNonterminal):
         else:
             raise NotImplementedError(ftype.syntax)
 
-        context.children = list(map(SemanticParseTree, children))
+        context.replace_children(map(SemanticParseTree, children))
@@ -78,6 +78,7 @@ class CFG(tuple):
                     self.nonterminals.add(symbol)
                 else:
                     self.terminals.add(symbol)
+        self._minimal = None
 
     def __add__(self, other):
         """
@@ -86,6 +87,34 @@ class CFG(tuple):
         """
         return type(self)(self.start, super().__add__(other))
 
+    def minimal_derivations(self):
+        """
+        For each nonterminal of the grammar, the production which derives the smallest
+        tree from it, and the number of nodes in that tree, as two dictionaries.
+        """
+        if self._minimal is None:
+            productions = {}
+            for rule in self:
+                productions.setdefault(rule.lhs, []).append(rule)
+
+            rules = {}
+            sizes = {}
+            changed = True
+            while changed:
+                changed = False
+                for symbol, candidates in productions.items():
+                    for rule in candidates:
+                        size = 1 + sum(
+                            sizes.get(child, float("inf")) if child in productions else 1
+                            for child in rule.rhs
+                        )
+                        if size < sizes.get(symbol, float("inf")):
+                            rules[symbol] = rule
+                            sizes[symbol] = size
+                            changed = True
+            self._minimal = (rules, sizes)
+        return self._minimal
+
     def _empty_productions(self):
         """
         Returns the productions of the grammar that produce the empty string.
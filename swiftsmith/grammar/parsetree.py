@@ -30,7 +30,16 @@ class Tree(object):
             child = type(self)(child)
         self.children.append(child)
         child.parent = self
-    
+
+    def insert_child(self, i, child):
+        """Inserts a new child of this tree before its `i`th child."""
+        if self.children is None:
+            self.children = []
+        if not isinstance(child, type(self)):
+            child = type(self)(child)
+        self.children.insert(i, child)
+        child.parent = self
+
     def ancestors(self):
         """Generate the ancestors of the current node."""
         node = self.parent
@@ -108,6 +117,9 @@ class ParseTree(Tree):
 
     def __init__(self, value, *args):
         super().__init__(value, *args)
+
+        # The production used to expand this node, if it was expanded by a grammar.
+        self.production = None
     
         if len(args) == 0:
             if isinstance(value, Nonterminal):
@@ -146,10 +158,14 @@ class ParseTree(Tree):
         """
         return isinstance(self.value, Nonterminal) and self.children is None
     
-    def expand(self, children):
+    def expand(self, children, propagate=True):
         """
         Sets the children of this tree to the given iterable, and updates the frontiers
         of of the tree.
+
+        If not `propagate`, the frontiers of this tree's ancestors are left for the
+        caller to update. Updating every ancestor takes time proportional to the depth
+        of the tree, which makes building deep trees quadratic.
         """
         assert self.isunexpanded(), "Attempted to expand an already expanded node."
 
@@ -164,6 +180,8 @@ class ParseTree(Tree):
             self.frontier.extend(child.frontier)
             child.parent = self
         
+        if not propagate:
+            return
         for node in self.ancestors():
             i = node.frontier.index(self)
             node.frontier[i:i+1] = self.frontier
@@ -175,3 +193,16 @@ class ParseTree(Tree):
         if self.isleaf():
             return str(self.value)
         return "".join(child.string() for child in self.children)
+
+    def render_to(self, stream):
+        """
+        Writes the string of terminals represented by this parse tree to a stream (any
+        object with a `write` method), in a single walk of the tree.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.isleaf():
+                stream.write(str(node.value))
+            else:
+                stack.extend(reversed(node.children))
@@ -24,33 +24,91 @@ class PCFG(CFG):
                 "PProduction instead."
 
         super().__init__(start, productions)
+        self._tables = None
+
+        # Limits on the depth and number of nodes of the trees `randomtree` samples, if
+        # any. Past either, nonterminals are expanded with their minimal derivations.
+        self.max_depth = None
+        self.max_size = None
+
+    def tables(self):
+        """
+        The productions of each nonterminal and their probabilities, as two
+        dictionaries. They're computed once, when the first tree is sampled.
+        """
+        if self._tables is None:
+            productions = {symbol: [] for symbol in self.nonterminals}
+            table = {symbol: [] for symbol in self.nonterminals}
+            for rule in self:
+                productions[rule.lhs].append(rule)
+                table[rule.lhs].append(rule.probability)
+            self._tables = (productions, table)
+        return self._tables
     
-    def randomtree(self, start=None):
+    def randomtree(self, start=None, weights=None):
         """
         Take a random walk on a parse tree using the productions of the given grammar,
         using the specified symbol as its root.
+
+        If `weights` is given, it is called with the production that expanded the
+        parent of the node being expanded (or None at the root) and the list of
+        candidate productions, and must return their weights. This overrides the
+        probabilities of the productions for this tree only.
+
+        If the grammar has a `max_depth` or `max_size`, nodes that deep, and every node
+        once the tree has that many, are expanded with the production which derives the
+        smallest tree from their symbol, so that the walk stops soon after.
         """
         if not start:
             start = self.start
 
-        productions = {symbol: [] for symbol in self.nonterminals}
-        weights = {symbol: [] for symbol in self.nonterminals}
-        for rule in self:
-            productions[rule.lhs].append(rule)
-            weights[rule.lhs].append(rule.probability)
-
+        productions, table = self.tables()
         tree = self.__class__.ParseTree(start)
+        bounded = self.max_depth is not None or self.max_size is not None
+        if bounded:
+            closing = self.minimal_derivations()[0]
+            max_depth = self.max_depth if self.max_depth is not None else float("inf")
+            max_size = self.max_size if self.max_size is not None else float("inf")
+            depths = {id(tree): 0}
+            size = 1
 
-        while tree.frontier:
+        # Only the root's frontier is maintained during the walk, since updating the
+        # frontiers of every ancestor makes generating deep trees quadratic. Once the
+        # walk is finished, every frontier in the tree is empty.
+        frontier = tree.frontier
+        while frontier:
             #print("\nFrontier: ", tree.frontier, "\n")
-            subtree = random.choice(tree.frontier)
+            subtree = random.choice(frontier)
             symbol = subtree.value
-            try:
-                rule = random.choices(productions[symbol], weights=weights[symbol])[0]
-            except IndexError:
-                raise ValueError(f"Failed to expand symbol: {symbol}")
+            if bounded:
+                depth = depths.pop(id(subtree))
+            if bounded and (depth >= max_depth or size >= max_size):
+                rule = closing[symbol]
+            else:
+                candidates = productions[symbol]
+                if weights is None:
+                    candidate_weights = table[symbol]
+                else:
+                    parent = subtree.parent.production if subtree.parent else None
+                    candidate_weights = weights(parent, candidates)
+                try:
+                    rule = random.choices(candidates, weights=candidate_weights)[0]
+                except IndexError:
+                    raise ValueError(f"Failed to expand symbol: {symbol}")
             #print("rule: ", rule)
-            subtree.expand(copy.deepcopy(rule.rhs))
+            subtree.expand(copy.deepcopy(rule.rhs), propagate=False)
+            subtree.production = rule
+            if bounded:
+                size += len(subtree.children)
+                for child in subtree.frontier:
+                    depths[id(child)] = depth + 1
+            i = frontier.index(subtree)
+            frontier[i:i+1] = subtree.frontier
 
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            node.frontier = []
+            stack.extend(node.children or ())
         return tree
     
@@ -0,0 +1,40 @@
+from .batch import Batch, BatchJob, bisect, find_culprits, generate_batch
+from .campaign import Campaign, campaign_seed
+from .cache import CompileCache
+from .distributed import Coordinator, RemoteSeeds
+from .metrics import Metrics, Shard
+from .prefetch import Prefetcher
+from .results import ResultStore, fingerprint, record
+from .runner import Job, StepResult, Toolchain, generate_sources, run_job, run_step
+from .scheduler import Scheduler, default_workers, random_seeds
+from .workspace import Workspace, is_bug_candidate
+
+__all__ = [
+    "Batch",
+    "BatchJob",
+    "bisect",
+    "Campaign",
+    "campaign_seed",
+    "CompileCache",
+    "Coordinator",
+    "default_workers",
+    "find_culprits",
+    "fingerprint",
+    "generate_batch",
+    "generate_sources",
+    "is_bug_candidate",
+    "Job",
+    "Metrics",
+    "Prefetcher",
+    "random_seeds",
+    "record",
+    "RemoteSeeds",
+    "ResultStore",
+    "run_job",
+    "run_step",
+    "Scheduler",
+    "Shard",
+    "StepResult",
+    "Toolchain",
+    "Workspace",
+]
@@ -0,0 +1,221 @@
+from .runner import Job, compile_modules, generate_sources, link_tests, run_tests, write_sources
+from ..metamorphic import failable_initializer
+from ..program import version
+
+import itertools
+import os
+import re
+import shutil
+
+
+def batches(seeds, size: int, count: int=None):
+    """
+    Groups seeds, or the first `count` of them, into tuples of `size` seeds; the last
+    may have fewer. If `seeds` is an asynchronous iterable, so are the batches.
+    """
+    if hasattr(seeds, "__aiter__"):
+        return _async_batches(seeds, size, count)
+    if count is not None:
+        seeds = itertools.islice(seeds, count)
+    return _batches(iter(seeds), size)
+
+def _batches(seeds, size):
+    while True:
+        batch = tuple(itertools.islice(seeds, size))
+        if not batch:
+            return
+        yield batch
+
+async def _async_batches(seeds, size, count):
+    batch = []
+    taken = 0
+    async for seed in seeds:
+        batch.append(seed)
+        taken += 1
+        if len(batch) == size or taken == count:
+            yield tuple(batch)
+            batch = []
+        if taken == count:
+            return
+    if batch:
+        yield tuple(batch)
+
+
+class Batch(object):
+    """
+    Several programs combined into one set of sources, so that they're built by one
+    compiler invocation per module.
+
+    Each program is wrapped in a caseless enum, `P0`, `P1` and so on, which acts as a
+    namespace: its functions become static methods of the enum, and its types are
+    nested in it. The tests of every program are combined into one test driver.
+
+    `seeds` lists the seed of each program, and `locate` maps a line of one of the
+    sources back to the seed whose code it is.
+    """
+    def __init__(self, parts, module="Batch"):
+        # The code of each program in each file, as (seed, code) pairs by filename.
+        self._parts = parts
+        self.module = module
+        self.seeds = [seed for seed, _ in next(iter(parts.values()), [])]
+        self.sources = {}
+        self._lines = {}
+        for filename, texts in parts.items():
+            source = f"\n// Generated by Swiftsmith {version}\n"
+            if filename == "test.swift":
+                source += "\n" + "".join(f"import {name}\n" for name in self._modules()) + "\n"
+            ranges = []
+            for seed, text in texts:
+                start = source.count("\n") + 1
+                source += text
+                ranges.append((start, source.count("\n"), seed))
+            self.sources[filename] = source
+            self._lines[filename] = ranges
+
+    def _modules(self):
+        return [filename[:-len(".swift")] for filename in sorted(self._parts) if filename != "test.swift"]
+
+    def locate(self, filename: str, line: int):
+        """The seed of the program at a line of one of the sources, or None."""
+        for start, end, seed in self._lines.get(os.path.basename(filename), []):
+            if start <= line <= end:
+                return seed
+        return None
+
+    def subset(self, seeds):
+        """A batch of some of this batch's programs, which keep their namespaces."""
+        parts = {
+            filename: [(seed, text) for seed, text in texts if seed in seeds]
+            for filename, texts in self._parts.items()
+        }
+        return Batch(parts, self.module)
+
+
+def generate_batch(seeds, mr=failable_initializer, oracle=False, module="Batch", configuration=None):
+    """
+    Generates a program for each seed (as `generate_sources` does) and combines them
+    into a `Batch`, whose modules are named `<module>A` and `<module>B`.
+    """
+    parts = {}
+    for i, seed in enumerate(seeds):
+        namespace = f"P{i}"
+        for filename, source in generate_sources(seed, mr, oracle, configuration=configuration).items():
+            if filename == "test.swift":
+                text = _tests(source, module, namespace)
+            else:
+                text = f"\n// {namespace}: seed {seed}\n" + _wrap(source, namespace)
+                filename = module + filename[len("Module"):]
+            parts.setdefault(filename, []).append((seed, text))
+    return Batch(parts, module)
+
+
+# Declarations at file scope, which become members of the program's namespace.
+_toplevel = re.compile(r"^(public |internal |fileprivate |private )?(func |enum )", re.MULTILINE)
+
+def _wrap(source, namespace):
+    def member(match):
+        access = match.group(1) or ""
+        # Private declarations at file scope are visible throughout the file, so they
+        # must be fileprivate to remain visible throughout the namespace.
+        if access == "private ":
+            access = "fileprivate "
+        if match.group(2) == "func ":
+            return access + "static func "
+        return access + match.group(2)
+
+    # Drop the header, which is written once for the batch.
+    source = source.split("\n", 2)[2] if source.startswith("\n// Generated by") else source
+    body = _toplevel.sub(member, source)
+    body = "\n".join("\t" + line if line.strip() else line for line in body.split("\n"))
+    return f"public enum {namespace} {{{body}\n}}\n"
+
+
+def _tests(source, module, namespace):
+    lines = []
+    for line in source.split("\n"):
+        if line.startswith("assert(") or line.startswith("// ") and not line.startswith("// Generated"):
+            line = line.replace("ModuleA.", f"{module}A.{namespace}.")
+            line = line.replace("ModuleB.", f"{module}B.{namespace}.")
+            lines.append(line + "\n")
+    return "".join(lines)
+
+
+class BatchJob(Job):
+    """
+    A job which tests a batch of programs. If it fails, `culprits` lists the seeds of
+    the programs responsible, once they're found by `find_culprits`.
+    """
+    def __init__(self, seeds, directory, mr=failable_initializer, oracle=False, module="Batch",
+                 configuration=None):
+        super().__init__(" ".join(seeds), directory, mr, oracle, module, configuration)
+        self.seeds = list(seeds)
+        self.batch = None
+        self.culprits = []
+
+    def generate_sources(self):
+        self.batch = generate_batch(self.seeds, self.mr, self.oracle, self.module, self.configuration)
+        return self.batch.sources
+
+
+# Locations in compiler diagnostics and assertion failures.
+_locations = [
+    re.compile(r"([\w./-]+\.swift):(\d+)"),
+    re.compile(r"file ([\w./-]+\.swift), line (\d+)"),
+]
+
+def locate_failure(job: BatchJob):
+    """The seeds of the programs at the locations reported by a job's failed step."""
+    step = job.failed_step
+    if step is None:
+        return []
+    seeds = []
+    for pattern in _locations:
+        for filename, line in pattern.findall(step.stdout + step.stderr):
+            seed = job.batch.locate(filename, int(line))
+            if seed is not None and seed not in seeds:
+                seeds.append(seed)
+    return seeds
+
+
+async def bisect(job: BatchJob, toolchain, cache=None):
+    """
+    Finds the programs of a failed batch which fail the same step on their own, by
+    building halves of the batch until each failing part is a single program. If
+    two halves only fail together, both are reported.
+    """
+    failure = job.failed_step.name
+    directory = os.path.join(job.directory, "bisect")
+
+    async def fails(seeds):
+        trial = BatchJob(seeds, directory, job.mr, job.oracle, job.module)
+        trial.batch = job.batch.subset(seeds)
+        shutil.rmtree(directory, ignore_errors=True)
+        write_sources(trial, trial.batch.sources, 0.0)
+        if await compile_modules(trial, toolchain, cache) and await link_tests(trial, toolchain):
+            await run_tests(trial, toolchain)
+        step = trial.failed_step
+        return step is not None and step.name == failure
+
+    async def search(seeds):
+        if len(seeds) == 1:
+            return seeds
+        half = len(seeds) // 2
+        culprits = []
+        for part in (seeds[:half], seeds[half:]):
+            if await fails(part):
+                culprits.extend(await search(part))
+        return culprits or seeds
+
+    try:
+        return await search(job.seeds)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+async def find_culprits(job: BatchJob, toolchain, cache=None):
+    """
+    Sets the culprits of a failed batch job: the programs at the locations which the
+    failure reports, or else the programs found by bisecting the batch.
+    """
+    job.culprits = locate_failure(job) or await bisect(job, toolchain, cache)
+    return job.culprits
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+
+class CompileCache(object):
+    """
+    An on-disk cache of compiled modules, addressed by the hash of their source, the
+    compiler's version, and the command which compiled them.
+
+    Each entry is a directory of the artifacts which compiling a module produced, such
+    as `libModuleA.so` and `ModuleA.swiftmodule`. When the entries take more than
+    `max_bytes`, the least recently used are evicted. Entries are written to a
+    temporary directory and renamed into place, so a partly written entry is never
+    used, even by another process sharing the cache.
+    """
+    def __init__(self, directory: str, max_bytes: int=2**30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+        # The size and last use of each entry.
+        self._entries = {}
+        for prefix in os.listdir(directory):
+            if len(prefix) != 2:
+                continue
+            for key in os.listdir(os.path.join(directory, prefix)):
+                path = self._path(key)
+                self._entries[key] = (_size(path), os.stat(path).st_mtime)
+        self.size = sum(size for size, _ in self._entries.values())
+
+    @staticmethod
+    def key(source: str, module: str, version: str, args) -> str:
+        """The key of a module compiled from `source` by the given compiler and arguments."""
+        digest = hashlib.sha256()
+        for part in [version, module, "\0".join(args), source]:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0\0")
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def fetch(self, key: str, destination: str) -> bool:
+        """Copies the artifacts of an entry into a directory, if the entry exists."""
+        path = self._path(key)
+        if key not in self._entries or not os.path.isdir(path):
+            self._entries.pop(key, None)
+            self.misses += 1
+            return False
+        for filename in os.listdir(path):
+            target = os.path.join(destination, filename)
+            if os.path.exists(target):
+                os.remove(target)
+            try:
+                os.link(os.path.join(path, filename), target)
+            except OSError:
+                shutil.copy2(os.path.join(path, filename), target)
+        now = time.time()
+        os.utime(path, (now, now))
+        self._entries[key] = (self._entries[key][0], now)
+        self.hits += 1
+        return True
+
+    def store(self, key: str, source: str, filenames):
+        """Adds the named artifacts in the directory `source` as an entry."""
+        if key in self._entries:
+            return
+        os.makedirs(os.path.dirname(self._path(key)), exist_ok=True)
+        temporary = tempfile.mkdtemp(dir=self.directory, prefix=".entry-")
+        try:
+            for filename in filenames:
+                shutil.copy2(os.path.join(source, filename), os.path.join(temporary, filename))
+            size = _size(temporary)
+            os.rename(temporary, self._path(key))
+        except OSError:
+            # Another process stored the entry first, or an artifact is missing.
+            shutil.rmtree(temporary, ignore_errors=True)
+            return
+        self._entries[key] = (size, time.time())
+        self.size += size
+        self._evict()
+
+    def _evict(self):
+        if self.size <= self.max_bytes:
+            return
+        for key in sorted(self._entries, key=lambda k: self._entries[k][1]):
+            if self.size <= self.max_bytes:
+                break
+            size, _ = self._entries.pop(key)
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            self.size -= size
+            self.evictions += 1
+
+    def statistics(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def artifacts(directory: str, module: str):
+    """The files in a directory which compiling `module` produced."""
+    return [
+        filename for filename in os.listdir(directory)
+        if (filename.startswith(module + ".") or filename.startswith(f"lib{module}."))
+        and filename != module + ".swift"
+    ]
+
+
+def _size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, filename))
+        for root, _, filenames in os.walk(path)
+        for filename in filenames
+    )
@@ -0,0 +1,156 @@
+import base64
+import bisect
+import hashlib
+import json
+import os
+import time
+
+
+def campaign_seed(campaign: str, position: int):
+    """The seed at a position of a campaign: a 256-bit hash of both, base64-encoded."""
+    digest = hashlib.sha256(f"{campaign}:{position}".encode("utf-8")).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+class Campaign(object):
+    """
+    A reproducible sequence of seeds, which can be tested in several sessions without
+    testing a seed twice or skipping one.
+
+    The seeds are derived from the campaign's `seed` and their position in the
+    sequence, so the campaign is defined by its seed and a cursor: the position of the
+    next seed that hasn't been handed out. `seeds` hands out seeds, which are in flight
+    until they're marked with `complete`. The completed positions are kept as ranges.
+
+    The state of the campaign is saved to `path` every `interval` seconds, as
+    completions are reported, and by `save`. When a saved campaign is loaded, the
+    seeds which were in flight, or handed out and not completed before the last save,
+    are handed out again before the cursor moves on. Testing a seed is deterministic,
+    so testing one of them again is harmless.
+
+    If the results of completed seeds are held by a `ResultStore`, it should be given
+    as `results`. It's flushed before every save, so that a checkpoint never marks a
+    seed as completed while its result is still waiting to be written.
+    """
+    def __init__(self, path: str, seed: str=None, interval: float=30.0, results=None):
+        self.path = path
+        self.interval = interval
+        self.results = results
+        self.seed = seed
+        self.cursor = 0
+        # Sorted, disjoint, half-open ranges of completed positions.
+        self.completed = []
+        self.in_flight = set()
+        self._positions = {}
+        self._saved = time.monotonic()
+
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if seed is not None and seed != state["seed"]:
+                raise ValueError(f"{path} is a checkpoint of campaign {state['seed']!r}, not {seed!r}")
+            self.seed = state["seed"]
+            self.cursor = state["cursor"]
+            self.completed = [tuple(r) for r in state["completed"]]
+        elif self.seed is None:
+            self.seed = base64.b64encode(os.urandom(16)).decode("ascii")
+
+    def pending(self):
+        """The ranges of positions before the cursor which haven't been completed."""
+        ranges = []
+        start = 0
+        for begin, end in self.completed + [(self.cursor, self.cursor)]:
+            if start < begin:
+                ranges.append((start, begin))
+            start = max(start, end)
+        return ranges
+
+    def is_completed(self, position: int):
+        i = bisect.bisect_right(self.completed, (position, float("inf")))
+        return i > 0 and self.completed[i - 1][0] <= position < self.completed[i - 1][1]
+
+    def seeds(self):
+        """
+        Hands out the seeds which haven't been completed: first those before the
+        cursor, from an earlier session, then the seeds after it.
+        """
+        for start, end in self.pending():
+            for position in range(start, end):
+                if position not in self.in_flight and not self.is_completed(position):
+                    yield self._hand_out(position)
+        while True:
+            position = self.cursor
+            self.cursor += 1
+            yield self._hand_out(position)
+
+    def _hand_out(self, position):
+        seed = campaign_seed(self.seed, position)
+        self.in_flight.add(position)
+        self._positions[seed] = position
+        return seed
+
+    def outstanding(self, seed: str):
+        """Whether a seed has been handed out and not completed."""
+        return seed in self._positions
+
+    def complete(self, seed: str, save: bool=True):
+        """
+        Marks a seed which was handed out as tested, saving the campaign if it's due,
+        unless not `save`, e.g. if its owner saves it with the state it depends on.
+        Returns False if the seed wasn't outstanding, e.g. if it was already completed.
+        """
+        position = self._positions.pop(seed, None)
+        if position is None:
+            return False
+        self.in_flight.discard(position)
+        self._add_completed(position)
+        if save and time.monotonic() - self._saved >= self.interval:
+            self.save()
+        return True
+
+    def _add_completed(self, position):
+        i = bisect.bisect_right(self.completed, (position, float("inf")))
+        start, end = position, position + 1
+        # Merge with the ranges which end at or contain this position, or start after it.
+        if i > 0 and self.completed[i - 1][1] >= start:
+            i -= 1
+            start = self.completed[i][0]
+            end = max(end, self.completed[i][1])
+            del self.completed[i]
+        if i < len(self.completed) and self.completed[i][0] <= end:
+            end = max(end, self.completed[i][1])
+            del self.completed[i]
+        self.completed.insert(i, (start, end))
+
+    def progress(self):
+        """The campaign's seed and cursor, and the number of seeds in each state."""
+        completed = sum(end - start for start, end in self.completed)
+        return {
+            "seed": self.seed,
+            "cursor": self.cursor,
+            "completed": completed,
+            "in_flight": len(self.in_flight),
+            "pending": self.cursor - completed - len(self.in_flight),
+        }
+
+    def save(self):
+        """
+        Writes the state of the campaign to its path, replacing the previous state,
+        once the results of the completed seeds are written.
+        """
+        if self.results is not None:
+            self.results.flush()
+        state = {
+            "seed": self.seed,
+            "cursor": self.cursor,
+            "completed": [list(r) for r in self.completed],
+            "in_flight": sorted(self.in_flight),
+            "pending": [list(r) for r in self.pending()],
+        }
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        self._saved = time.monotonic()
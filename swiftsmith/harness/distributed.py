@@ -0,0 +1,327 @@
+from .campaign import Campaign
+from .results import ResultStore, record
+
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import itertools
+import json
+import sys
+import threading
+import time
+import urllib.request
+
+
+class Lease(object):
+    """
+    Seeds which are assigned to a worker until `expires`, unless the worker renews it.
+    The seeds which haven't been reported are kept in the order of the campaign.
+    """
+    def __init__(self, id: int, worker: str, seeds, expires: float):
+        self.id = id
+        self.worker = worker
+        self.seeds = list(seeds)
+        self.expires = expires
+
+
+class Coordinator(object):
+    """
+    Hands out the seeds of a `Campaign` to workers on other machines, in leases of
+    `lease_size` seeds, and adds the results which they report to a `ResultStore`.
+
+    A lease expires if its worker reports nothing for `lease_duration` seconds; its
+    seeds which haven't been reported are then leased to other workers. A seed's
+    results are only added once, the first time they're reported, so a seed is never
+    lost to a worker which stopped, nor recorded twice if a slow worker reports after
+    its lease expired. If `count` is given, the coordinator hands out that many seeds
+    in all. When every seed is leased, workers are told to ask again after at most
+    `poll` seconds, in case a lease expires or a worker releases its seeds.
+
+    The campaign is only saved by `flush`, after the store is written, so that its
+    checkpoint never marks a seed as completed before the seed's results are stored.
+    `flush` is called when results are reported at least `interval` seconds after
+    the last flush, and should be called once more when the coordinator stops.
+
+    The coordinator is thread-safe, and `serve` makes it available over HTTP.
+    """
+    def __init__(self, campaign: Campaign, store: ResultStore=None, lease_size: int=16,
+                 lease_duration: float=300.0, count: int=None, poll: float=5.0,
+                 interval: float=30.0, clock=time.monotonic):
+        self.campaign = campaign
+        self.store = store
+        self.lease_size = lease_size
+        self.lease_duration = lease_duration
+        self.poll = poll
+        self.interval = interval
+        self.clock = clock
+        self._flushed = clock()
+        self.leases = {}
+        self.reported = 0
+        self.duplicates = 0
+        self.expired = 0
+        self._seeds = campaign.seeds()
+        if count is not None:
+            self._seeds = itertools.islice(self._seeds, count)
+        self._requeued = deque()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        now = self.clock()
+        for lease in [lease for lease in self.leases.values() if lease.expires <= now]:
+            del self.leases[lease.id]
+            self._requeued.extend(lease.seeds)
+            self.expired += 1
+
+    def lease(self, worker: str):
+        """
+        Leases seeds to a worker, as a dictionary with the lease's `id`, its `seeds`
+        and its `duration`. If there are no seeds to lease but leased seeds may expire,
+        the seeds are empty and `wait` is the time to wait before asking again; when
+        every seed has been tested, `done` is true.
+        """
+        with self._lock:
+            self._expire()
+            self._renew(worker)
+            seeds = []
+            while self._requeued and len(seeds) < self.lease_size:
+                seed = self._requeued.popleft()
+                if self.campaign.outstanding(seed):
+                    seeds.append(seed)
+            seeds.extend(itertools.islice(self._seeds, self.lease_size - len(seeds)))
+            if not seeds:
+                if not self.leases:
+                    return {"done": True}
+                wait = min(lease.expires for lease in self.leases.values()) - self.clock()
+                return {"seeds": [], "wait": min(max(wait, 0.0), self.poll)}
+            lease = Lease(next(self._ids), worker, seeds, self.clock() + self.lease_duration)
+            self.leases[lease.id] = lease
+            return {"id": lease.id, "seeds": seeds, "duration": self.lease_duration}
+
+    def _renew(self, worker):
+        expires = self.clock() + self.lease_duration
+        for lease in self.leases.values():
+            if lease.worker == worker:
+                lease.expires = expires
+
+    def report(self, worker: str, records):
+        """
+        Adds the results of jobs, as given by `record`, and renews the worker's leases.
+        Returns the number of records which were added, rather than duplicates.
+        """
+        with self._lock:
+            self._expire()
+            self._renew(worker)
+            added = 0
+            for result in records:
+                completed = [seed for seed in result["seeds"] if self.campaign.complete(seed, save=False)]
+                self._release(result["seeds"])
+                if not completed:
+                    self.duplicates += 1
+                    continue
+                if self.store is not None:
+                    self.store.add_record(result)
+                added += 1
+            self.reported += added
+            if self.clock() - self._flushed >= self.interval:
+                self._flush()
+            return added
+
+    def release(self, worker: str, seeds):
+        """Returns seeds which a worker won't test to the coordinator, to be leased again."""
+        with self._lock:
+            self._release(seeds)
+            self._requeued.extend(seed for seed in seeds if self.campaign.outstanding(seed))
+
+    def _release(self, seeds):
+        seeds = set(seeds)
+        for lease in list(self.leases.values()):
+            lease.seeds = [seed for seed in lease.seeds if seed not in seeds]
+            if not lease.seeds:
+                del self.leases[lease.id]
+
+    def status(self):
+        with self._lock:
+            return {
+                "campaign": self.campaign.progress(),
+                "leases": len(self.leases),
+                "requeued": len(self._requeued),
+                "reported": self.reported,
+                "duplicates": self.duplicates,
+                "expired": self.expired,
+            }
+
+    def flush(self):
+        """Writes the results which have been reported, and then saves the campaign."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self.store is not None:
+            self.store.flush()
+        self.campaign.save()
+        self._flushed = self.clock()
+
+    def serve(self, host: str="localhost", port: int=8470):
+        """An HTTP server for the coordinator; call its `serve_forever` to start it."""
+        coordinator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/status":
+                    self._respond(200, coordinator.status())
+                else:
+                    self._respond(404, {"error": f"no such path: {self.path}"})
+
+            def do_POST(self):
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                    if self.path == "/lease":
+                        response = coordinator.lease(body["worker"])
+                    elif self.path == "/report":
+                        response = {"added": coordinator.report(body["worker"], body["records"])}
+                    elif self.path == "/release":
+                        coordinator.release(body["worker"], body["seeds"])
+                        response = {}
+                    else:
+                        self._respond(404, {"error": f"no such path: {self.path}"})
+                        return
+                except (ValueError, KeyError, TypeError) as e:
+                    self._respond(400, {"error": repr(e)})
+                    return
+                self._respond(200, response)
+
+            def _respond(self, code, response):
+                body = json.dumps(response).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return ThreadingHTTPServer((host, port), Handler)
+
+
+class RemoteSeeds(object):
+    """
+    The client of a `Coordinator`, for a worker named `worker`: `seeds` leases seeds
+    from the coordinator, and `add` reports the results of jobs to it, `batch_size`
+    at a time, or when `interval` seconds have passed since the last report. Seeds
+    which were leased but not tested, when the worker stops taking seeds, should be
+    given back with `release`.
+
+    Requests to the coordinator are made in threads, so the event loop which runs the
+    worker's jobs isn't blocked while they're answered. If the coordinator can't be
+    reached, results are held and reported with the next report, and `seeds` stops
+    until the worker asks again; the worker's leases expire if it never reaches the
+    coordinator again, and its seeds are leased to other workers.
+    """
+    def __init__(self, url: str, worker: str, batch_size: int=16, interval: float=10.0,
+                 timeout: float=30.0):
+        self.url = url.rstrip("/")
+        self.worker = worker
+        self.batch_size = batch_size
+        self.interval = interval
+        self.timeout = timeout
+        self.done = False
+        self.wait = 0.0
+        self.errors = 0
+        # Seeds which have been leased and not reported, in the order of the campaign.
+        self.leased = {}
+        self._pending = []
+        self._reports = set()
+        self._reported = time.monotonic()
+
+    def _post(self, path, body):
+        request = urllib.request.Request(
+            self.url + path,
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    async def _request(self, path, body):
+        """The coordinator's response to a request, or None if it can't be reached."""
+        try:
+            return await asyncio.to_thread(self._post, path, body)
+        except (OSError, ValueError) as e:
+            # URLError, and HTTPError for a response which isn't valid, are OSErrors.
+            self.errors += 1
+            print(f"SwiftSmith: request to {self.url}{path} failed: {e}", file=sys.stderr)
+            return None
+
+    async def seeds(self):
+        """
+        Leases seeds until the coordinator has none to lease. Then `done` is true if
+        every seed has been tested, or else `wait` is the time before asking again.
+        """
+        self.wait = 0.0
+        while True:
+            lease = await self._request("/lease", {"worker": self.worker})
+            if lease is None:
+                self.wait = self.interval
+                return
+            if lease.get("done"):
+                self.done = True
+                return
+            if not lease["seeds"]:
+                self.wait = min(lease["wait"], self.interval)
+                return
+            self.leased.update(dict.fromkeys(lease["seeds"]))
+            for seed in lease["seeds"]:
+                yield seed
+
+    def add(self, job):
+        """
+        Adds the results of a finished job, reporting them in the background if enough
+        are held. This must be called from the event loop.
+        """
+        self._pending.append(record(job))
+        if len(self._pending) >= self.batch_size or time.monotonic() - self._reported >= self.interval:
+            self._report()
+
+    def _report(self):
+        pending, self._pending = self._pending, []
+        self._reported = time.monotonic()
+        if pending:
+            task = asyncio.ensure_future(self._send(pending))
+            self._reports.add(task)
+            task.add_done_callback(self._reports.discard)
+
+    async def _send(self, records):
+        response = await self._request("/report", {"worker": self.worker, "records": records})
+        if response is None:
+            # Report them again with the next report.
+            self._pending[:0] = records
+            return
+        for result in records:
+            for seed in result["seeds"]:
+                self.leased.pop(seed, None)
+
+    async def flush(self):
+        """Reports the results which are held, and waits for every report to finish."""
+        self._report()
+        while self._reports:
+            await asyncio.gather(*self._reports)
+
+    async def release(self):
+        """
+        Releases the seeds which were leased and haven't been tested, e.g. because the
+        worker stopped, so that the coordinator can lease them to other workers.
+        """
+        unreported = {seed for result in self._pending for seed in result["seeds"]}
+        released = [seed for seed in self.leased if seed not in unreported]
+        if not released:
+            return
+        if await self._request("/release", {"worker": self.worker, "seeds": released}) is not None:
+            for seed in released:
+                del self.leased[seed]
+
+    async def close(self):
+        """Reports the results which are held, and releases the seeds which weren't tested."""
+        await self.flush()
+        await self.release()
@@ -0,0 +1,186 @@
+from ..statistics import Histogram
+
+import json
+import os
+import time
+
+
+# Upper bounds of the histogram buckets: seconds from 1ms to about a minute, and bytes
+# from 256B to 16MiB.
+_seconds = [0.001 * 2**k for k in range(17)]
+_bytes = [2**k for k in range(8, 25)]
+
+# The histograms which are kept, with their buckets, the step whose durations they
+# hold (or None for the size of the program), and a description.
+histograms = {
+    "generate_seconds": (_seconds, "generate", "Time taken to generate a program."),
+    "compile_seconds": (_seconds, "compile", "Time taken to compile a module."),
+    "link_seconds": (_seconds, "link", "Time taken to compile and link the tests."),
+    "run_seconds": (_seconds, "run", "Time taken to run the tests."),
+    "program_bytes": (_bytes, None, "Size of the generated sources of a program."),
+}
+
+
+class Shard(object):
+    """The measurements of the jobs finished by one worker, which only it updates."""
+    def __init__(self):
+        self.statuses = {}
+        self.histograms = {name: Histogram(buckets) for name, (buckets, _, _) in histograms.items()}
+
+    def record(self, job):
+        status = job.status()
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        for name, (_, step, _) in histograms.items():
+            if step is None:
+                if job.sources:
+                    size = sum(len(source.encode("utf-8")) for source in job.sources.values())
+                    self.histograms[name].add(size)
+                continue
+            for result in job.steps:
+                # Modules taken from the cache weren't compiled.
+                if result.name == step and not result.cached:
+                    self.histograms[name].add(result.duration)
+
+
+class Metrics(object):
+    """
+    Live measurements of the jobs which a scheduler has finished: the number with each
+    status, and histograms of the time taken by each step and of the size of programs.
+
+    Each worker records the jobs it finishes in a `Shard` of its own, so recording
+    takes no locks, and the shards are combined when the metrics are read. `export`
+    writes them, with the gauges of a scheduler's `report` such as the depth of its
+    queues, to a Prometheus textfile at `prometheus` and as JSON to `status`, and a
+    one-line summary to `log`; a scheduler exports them every `interval` seconds.
+    """
+    def __init__(self, prometheus: str=None, status: str=None, interval: float=10.0, log=None):
+        self.prometheus = prometheus
+        self.status = status
+        self.interval = interval
+        self.log = log
+        self._shards = {}
+        self._last = (time.monotonic(), 0)
+
+    def shard(self, name: str):
+        """The shard of the named worker."""
+        if name not in self._shards:
+            self._shards[name] = Shard()
+        return self._shards[name]
+
+    def statuses(self):
+        statuses = {}
+        for shard in list(self._shards.values()):
+            for status, count in list(shard.statuses.items()):
+                statuses[status] = statuses.get(status, 0) + count
+        return statuses
+
+    def histograms(self):
+        merged = {name: Histogram(buckets) for name, (buckets, _, _) in histograms.items()}
+        for shard in list(self._shards.values()):
+            for name, histogram in shard.histograms.items():
+                merged[name].merge(histogram.summary())
+        return merged
+
+    def snapshot(self, report: dict=None):
+        """
+        The metrics, and those of a scheduler's report if one is given, as a dictionary
+        which can be serialized as JSON. The recent rate is measured since the last
+        snapshot.
+        """
+        statuses = self.statuses()
+        programs = sum(statuses.values())
+        now = time.monotonic()
+        then, before = self._last
+        self._last = (now, programs)
+        elapsed = report["elapsed"] if report else None
+        snapshot = {
+            "time": time.time(),
+            "programs": programs,
+            "programs_per_second": programs / elapsed if elapsed else None,
+            "recent_per_second": (programs - before) / (now - then) if now > then else None,
+            "statuses": statuses,
+            "failures": {status: count for status, count in statuses.items() if status != "passed"},
+            "histograms": {name: h.summary() for name, h in self.histograms().items()},
+        }
+        if report is not None:
+            for key in ["elapsed", "queues", "stages", "prefetch", "cache", "workspace", "swarm"]:
+                snapshot[key] = report.get(key)
+        return snapshot
+
+    def export(self, report: dict=None):
+        """Writes the metrics to the files and log which were given."""
+        snapshot = self.snapshot(report)
+        if self.status is not None:
+            _replace(self.status, json.dumps(snapshot, indent=4))
+        if self.prometheus is not None:
+            _replace(self.prometheus, prometheus(snapshot))
+        if self.log is not None:
+            rate = snapshot["recent_per_second"]
+            queues = " ".join(f"{name}={depth}" for name, depth in (snapshot.get("queues") or {}).items())
+            print(
+                f"{snapshot['programs']} programs, {rate or 0.0:.2f}/s, "
+                f"{sum(snapshot['failures'].values())} failed; queues: {queues}",
+                file=self.log,
+                flush=True,
+            )
+        return snapshot
+
+
+def prometheus(snapshot: dict):
+    """The metrics of a snapshot in the Prometheus text format."""
+    lines = []
+
+    def metric(name, kind, help, samples):
+        lines.append(f"# HELP swiftsmith_{name} {help}")
+        lines.append(f"# TYPE swiftsmith_{name} {kind}")
+        for labels, value in samples:
+            labels = ",".join(f'{key}="{_escape(text)}"' for key, text in labels.items())
+            lines.append(f"swiftsmith_{name}{{{labels}}} {_number(value)}" if labels
+                         else f"swiftsmith_{name} {_number(value)}")
+
+    metric("programs_total", "counter", "Programs tested, by status.",
+           [({"status": status}, count) for status, count in sorted(snapshot["statuses"].items())])
+    metric("programs_per_second", "gauge", "Programs tested per second since the last export.",
+           [({}, snapshot["recent_per_second"] or 0.0)])
+    for name, summary in snapshot["histograms"].items():
+        lines.append(f"# HELP swiftsmith_{name} {histograms[name][2]}")
+        lines.append(f"# TYPE swiftsmith_{name} histogram")
+        cumulative = 0
+        bounds = summary["histogram"]["buckets"] + ["+Inf"]
+        for bound, count in zip(bounds, summary["histogram"]["counts"]):
+            cumulative += count
+            lines.append(f'swiftsmith_{name}_bucket{{le="{_number(bound)}"}} {cumulative}')
+        lines.append(f"swiftsmith_{name}_sum {_number(summary['total'])}")
+        lines.append(f"swiftsmith_{name}_count {summary['count']}")
+    if snapshot.get("queues") is not None:
+        metric("queue_depth", "gauge", "Jobs waiting in each queue.",
+               [({"queue": name}, depth) for name, depth in snapshot["queues"].items()])
+    if snapshot.get("stages") is not None:
+        metric("stage_busy_seconds_total", "counter", "Time spent working by each stage's workers.",
+               [({"stage": name}, stage["busy"]) for name, stage in snapshot["stages"].items()])
+        metric("stage_utilization", "gauge", "The fraction of the time each stage's workers were busy.",
+               [({"stage": name}, stage["utilization"]) for name, stage in snapshot["stages"].items()])
+    if snapshot.get("prefetch") is not None:
+        metric("prefetch_stalls_total", "counter", "Times the compiler waited for a program.",
+               [({}, snapshot["prefetch"]["stalls"])])
+        metric("prefetch_timeouts_total", "counter", "Programs whose generation timed out.",
+               [({}, snapshot["prefetch"].get("timeouts", 0))])
+    return "\n".join(lines) + "\n"
+
+
+def _number(value):
+    if isinstance(value, str):
+        return value
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _replace(path, text):
+    # Readers such as node_exporter must never see a partly written file.
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        f.write(text)
+    os.replace(temporary, path)
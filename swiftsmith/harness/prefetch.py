@@ -0,0 +1,270 @@
+from ..program import Program
+from .runner import generate_sources
+
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import asyncio
+import io
+import math
+import os
+import signal
+import time
+import traceback
+
+
+# A generated program, or the traceback of the error which generating it raised, the
+# swarm configuration it was generated with, if any, what generating it printed, and
+# whether it was abandoned for taking longer than the prefetcher's timeout.
+Generated = namedtuple(
+    "Generated",
+    ["seed", "sources", "duration", "error", "configuration", "stdout", "timedout"],
+    defaults=(None, "", False),
+)
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _expire(signum, frame):
+    raise _Timeout()
+
+
+def _warm():
+    # The harness handles ctrl+C, and shuts down the pool itself.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Generating a program imports and initializes everything that generation uses.
+    # Metamorphic relations aren't applied, since some of them print.
+    program = Program("AA==")
+    program.generate()
+    program.annotate()
+
+
+def _generate(function, seed, options, timeout=None):
+    start = time.perf_counter()
+    configuration = options.get("configuration")
+    # Metamorphic relations may print, so what they print is kept with the program.
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output):
+            if timeout:
+                signal.signal(signal.SIGALRM, _expire)
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+            try:
+                sources = function(seed, **options)
+            finally:
+                if timeout:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+        return Generated(seed, sources, time.perf_counter() - start, None, configuration, output.getvalue())
+    except _Timeout:
+        # The traceback shows where generation was when it was interrupted.
+        return Generated(seed, None, time.perf_counter() - start, traceback.format_exc(),
+                         configuration, output.getvalue(), True)
+    except Exception:
+        return Generated(seed, None, time.perf_counter() - start, traceback.format_exc(),
+                         configuration, output.getvalue())
+
+
+class Prefetcher(object):
+    """
+    Generates programs ahead of the compiler, in a pool of `processes` processes,
+    keeping a buffer of generated programs that are ready to be compiled.
+
+    The number of programs that are generated or being generated ahead of the
+    consumer is tuned to the rates at which they're generated and consumed: enough to
+    cover the programs consumed while one is generated, twice over, between `minimum`
+    (by default, the number of processes) and `maximum`.
+
+    Programs are generated by calling `function` (by default, `generate_sources`)
+    with each seed and `options`; it must be picklable, as must its result. `seeds`
+    may be an asynchronous iterable, such as seeds leased from a coordinator, in which
+    case more seeds are taken in the background while programs are consumed. With a
+    `Swarm`, each seed is generated with the next of its configurations; since only
+    the configuration is sent with the seed, and each process builds its grammar
+    once, switching configurations is cheap.
+
+    Generating a program which takes longer than `timeout` seconds is interrupted,
+    and it's returned as timed out. Since a process which ran away may be left with a
+    bloated heap, the pool's processes are then replaced. If no program is generated
+    for twice the timeout, as when a process is stuck where it can't be interrupted,
+    the pool's processes are killed, and the seeds they hadn't generated are sent to
+    a new pool.
+    """
+    def __init__(self, seeds, processes: int=None, options=None, minimum: int=None,
+                 maximum: int=256, smoothing: float=0.2, function=generate_sources,
+                 swarm=None, timeout: float=None):
+        self._async = hasattr(seeds, "__aiter__")
+        self.seeds = seeds.__aiter__() if self._async else iter(seeds)
+        self.processes = processes or max(1, (os.cpu_count() or 1) // 4)
+        self.options = options or {}
+        self.function = function
+        self.swarm = swarm
+        self.timeout = timeout
+        self.minimum = minimum or self.processes
+        self.maximum = max(maximum, self.minimum)
+        self.smoothing = smoothing
+        self.target = self.minimum
+
+        # Moving averages of the time taken to generate a program, and the time
+        # between requests for programs.
+        self.latency = None
+        self.interval = None
+        self.busy = 0.0
+        self.generated = 0
+        self.stalls = 0
+        self.waited = 0.0
+        self.timeouts = 0
+        self.recycled = 0
+
+        self._pool = None
+        # The seed, options, time of submission and process pool future of each program
+        # that is being generated.
+        self._pending = {}
+        self._ready = deque()
+        self._exhausted = False
+        self._last = None
+        self._filling = None
+
+    def start(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.processes, initializer=_warm)
+
+    def _recycle(self, kill=False):
+        """
+        Replaces the pool. The old pool finishes the programs it was given, unless
+        `kill`, in which case its processes are killed, the programs they were
+        generating are returned as timed out, and the rest are sent to the new pool.
+        """
+        pool = self._pool
+        self.start()
+        self.recycled += 1
+        if not kill:
+            pool.shutdown(wait=False)
+            return
+        pending, self._pending = self._pending, {}
+        for future, (seed, options, submitted, running) in pending.items():
+            future.cancel()
+            if running.running():
+                self.timeouts += 1
+                self._ready.append(Generated(
+                    seed, None, time.perf_counter() - submitted,
+                    f"The generator stopped responding after {2 * self.timeout:g} seconds\n",
+                    options.get("configuration"), "", True,
+                ))
+            else:
+                self._submit(seed, options)
+        # There's no public way to stop a process that's running a task.
+        for process in list(pool._processes.values()):
+            process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        """Stops generating, abandoning programs which haven't been consumed."""
+        self._exhausted = True
+        if self._filling is not None:
+            self._filling.cancel()
+        for future in self._pending:
+            future.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def buffered(self):
+        """The number of programs that are ready to be consumed."""
+        return len(self._ready)
+
+    def _average(self, average, value):
+        if average is None:
+            return value
+        return average + self.smoothing * (value - average)
+
+    def _tune(self):
+        if self.latency is None or not self.interval:
+            return
+        needed = math.ceil(2 * self.latency / self.interval)
+        self.target = min(self.maximum, max(self.minimum, needed))
+
+    async def _next(self):
+        """The next seed, or None when there are no more."""
+        if self._async:
+            try:
+                return await self.seeds.__anext__()
+            except StopAsyncIteration:
+                return None
+        return next(self.seeds, None)
+
+    async def _fill(self):
+        while not self._exhausted and len(self._pending) + len(self._ready) < self.target:
+            seed = await self._next()
+            if seed is None:
+                self._exhausted = True
+                break
+            if self._pool is None:
+                # The prefetcher was closed while waiting for a seed.
+                break
+            options = self.options
+            if self.swarm is not None:
+                options = dict(options, configuration=self.swarm.next())
+            self._submit(seed, options)
+
+    def _submit(self, seed, options):
+        running = self._pool.submit(_generate, self.function, seed, options, self.timeout)
+        future = asyncio.wrap_future(running, loop=asyncio.get_running_loop())
+        future.add_done_callback(self._done)
+        self._pending[future] = (seed, options, time.perf_counter(), running)
+
+    def _done(self, future):
+        if self._pending.pop(future, None) is None or future.cancelled():
+            return
+        generated = future.result()
+        self.generated += 1
+        self.busy += generated.duration
+        self.latency = self._average(self.latency, generated.duration)
+        self._ready.append(generated)
+        if generated.timedout:
+            self.timeouts += 1
+            if self._pool is not None:
+                self._recycle()
+
+    async def get(self):
+        """The next generated program, or None when there are no more seeds."""
+        now = time.perf_counter()
+        if self._last is not None:
+            self.interval = self._average(self.interval, now - self._last)
+        self._tune()
+        if self._filling is None or self._filling.done():
+            if self._filling is not None:
+                # Raises any exception which taking seeds in the background raised.
+                self._filling.result()
+                self._filling = None
+            await self._fill()
+
+        if not self._ready:
+            if not self._pending and self._filling is not None:
+                await self._filling
+                self._filling = None
+            if not self._pending:
+                return None
+            self.stalls += 1
+            while not self._ready and self._pending:
+                done, _ = await asyncio.wait(
+                    list(self._pending),
+                    timeout=2 * self.timeout if self.timeout else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    self._recycle(kill=True)
+                # Let the callbacks of the finished futures run.
+                await asyncio.sleep(0)
+            self.waited += time.perf_counter() - now
+            if not self._ready:
+                return None
+
+        generated = self._ready.popleft()
+        if self._async:
+            if self._filling is None:
+                self._filling = asyncio.ensure_future(self._fill())
+        else:
+            await self._fill()
+        self._last = time.perf_counter()
+        return generated
@@ -0,0 +1,223 @@
+from ..program import version
+
+import hashlib
+import json
+import sqlite3
+import time
+
+
+_schema = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    seed TEXT NOT NULL,
+    version TEXT NOT NULL,
+    mr TEXT,
+    fingerprint TEXT,
+    status TEXT NOT NULL,
+    culprits TEXT,
+    finished REAL NOT NULL,
+    configuration TEXT
+);
+CREATE TABLE IF NOT EXISTS steps (
+    result INTEGER NOT NULL REFERENCES results(id),
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    returncode INTEGER,
+    duration REAL NOT NULL,
+    timedout INTEGER NOT NULL,
+    cached INTEGER NOT NULL,
+    stdout TEXT NOT NULL,
+    stderr TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_status ON results(status);
+CREATE INDEX IF NOT EXISTS results_seed ON results(seed);
+CREATE INDEX IF NOT EXISTS steps_result ON steps(result);
+"""
+
+
+def fingerprint(sources: dict):
+    """A hash of a program's generated files, which identifies the program."""
+    digest = hashlib.sha256()
+    for filename in sorted(sources):
+        digest.update(filename.encode("utf-8") + b"\0")
+        digest.update(sources[filename].encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+def record(job):
+    """The results of a finished job, as a dictionary which can be serialized as JSON."""
+    culprits = getattr(job, "culprits", None)
+    configuration = getattr(job, "configuration", None)
+    return {
+        "seed": job.seed,
+        "seeds": list(getattr(job, "seeds", [job.seed])),
+        "version": version,
+        "mr": getattr(job.mr, "__name__", None),
+        "fingerprint": fingerprint(job.sources) if job.sources else None,
+        "status": job.status(),
+        "culprits": list(culprits) if culprits else None,
+        "finished": time.time(),
+        "configuration": configuration.to_dict() if configuration is not None else None,
+        "steps": [
+            {
+                "name": step.name,
+                "returncode": step.returncode,
+                "duration": step.duration,
+                "timedout": step.timedout,
+                "cached": step.cached,
+                "stdout": step.stdout,
+                "stderr": step.stderr,
+            }
+            for step in job.steps
+        ],
+    }
+
+
+class ResultStore(object):
+    """
+    A SQLite database of the outcomes of jobs: for each job, its seed, the version of
+    Swiftsmith, the metamorphic relation and the swarm configuration (as JSON) which
+    generated it, a fingerprint of its sources and its status, and for each of its
+    steps, the exit code, duration and output.
+
+    Results are added in batches: `add` holds a job's results until `batch_size` are
+    held or `interval` seconds have passed since the last write, and `flush` writes
+    them in one transaction. The database is in WAL mode, so several processes may
+    add results to it while others query it. A store may be used by any thread, but
+    only by one at a time.
+    """
+    def __init__(self, path: str, batch_size: int=64, interval: float=5.0, timeout: float=30.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.interval = interval
+        self.connection = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_schema)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(results)")}
+        if "configuration" not in columns:
+            # Databases written before swarm testing.
+            self.connection.execute("ALTER TABLE results ADD COLUMN configuration TEXT")
+        self._pending = []
+        self._flushed = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, job):
+        """Adds the results of a finished job, writing them if enough are held."""
+        self.add_record(record(job))
+
+    def add_record(self, record: dict):
+        """Adds the results of a job as they're given by `record`, perhaps by another process."""
+        self._pending.append((
+            (
+                record["seed"],
+                record["version"],
+                record["mr"],
+                record["fingerprint"],
+                record["status"],
+                " ".join(record["culprits"]) if record["culprits"] else None,
+                record["finished"],
+                # Workers of earlier versions don't send a configuration.
+                json.dumps(record["configuration"]) if record.get("configuration") else None,
+            ),
+            [
+                (i, step["name"], step["returncode"], step["duration"], step["timedout"],
+                 step["cached"], step["stdout"], step["stderr"])
+                for i, step in enumerate(record["steps"])
+            ],
+        ))
+        if len(self._pending) >= self.batch_size or time.monotonic() - self._flushed >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Writes the results which are held."""
+        pending, self._pending = self._pending, []
+        self._flushed = time.monotonic()
+        if not pending:
+            return
+        with self.connection:
+            for result, steps in pending:
+                cursor = self.connection.execute(
+                    "INSERT INTO results (seed, version, mr, fingerprint, status, culprits, finished, "
+                    "configuration) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    result,
+                )
+                self.connection.executemany(
+                    "INSERT INTO steps (result, position, name, returncode, duration, timedout, "
+                    "cached, stdout, stderr) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid,) + step for step in steps],
+                )
+
+    def close(self):
+        """Writes the results which are held, and closes the database."""
+        self.flush()
+        self.connection.close()
+
+    def throughput(self, since: float=None):
+        """
+        The number of jobs which finished since a time (by default, since the first),
+        the time between the first and last of them, and the jobs finished per second.
+        """
+        count, first, last = self.connection.execute(
+            "SELECT COUNT(*), MIN(finished), MAX(finished) FROM results WHERE finished >= ?",
+            (since or 0.0,),
+        ).fetchone()
+        elapsed = (last - first) if count else 0.0
+        return {
+            "jobs": count,
+            "elapsed": elapsed,
+            "per_second": count / elapsed if elapsed > 0 else None,
+        }
+
+    def stages(self):
+        """The number of times each step ran, and its mean, maximum and total duration."""
+        rows = self.connection.execute(
+            "SELECT name, COUNT(*), AVG(duration), MAX(duration), SUM(duration), SUM(cached) "
+            "FROM steps GROUP BY name ORDER BY MIN(position)"
+        )
+        return {
+            name: {"count": count, "mean": mean, "max": maximum, "total": total, "cached": cached}
+            for name, count, mean, maximum, total, cached in rows
+        }
+
+    def failures(self):
+        """The number of jobs with each status other than "passed", most common first."""
+        rows = self.connection.execute(
+            "SELECT status, COUNT(*) FROM results WHERE status != 'passed' "
+            "GROUP BY status ORDER BY COUNT(*) DESC, status"
+        )
+        return dict(rows.fetchall())
+
+    def failed(self, status: str=None, limit: int=None):
+        """
+        The jobs which didn't pass, or which have a given status, most recent first,
+        with the output of the step which failed, and their swarm configuration.
+        """
+        query = (
+            "SELECT r.seed, r.mr, r.fingerprint, r.status, r.culprits, r.configuration, s.name, "
+            "s.returncode, s.stdout, s.stderr FROM results r LEFT JOIN steps s ON s.result = r.id "
+            "AND s.position = (SELECT MIN(position) FROM steps WHERE result = r.id "
+            "AND (timedout OR returncode IS NULL OR returncode != 0)) "
+        )
+        if status is None:
+            query += "WHERE r.status != 'passed' "
+            parameters = []
+        else:
+            query += "WHERE r.status = ? "
+            parameters = [status]
+        query += "ORDER BY r.finished DESC, r.id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+        keys = ["seed", "mr", "fingerprint", "status", "culprits", "configuration", "step",
+                "returncode", "stdout", "stderr"]
+        jobs = [dict(zip(keys, row)) for row in self.connection.execute(query, parameters)]
+        for job in jobs:
+            if job["configuration"] is not None:
+                job["configuration"] = json.loads(job["configuration"])
+        return jobs
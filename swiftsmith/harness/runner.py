@@ -0,0 +1,314 @@
+from .cache import CompileCache, artifacts
+from ..metamorphic import failable_initializer
+from ..program import Program, version
+
+from collections import namedtuple
+from contextlib import nullcontext, redirect_stdout
+import asyncio
+import io
+import os
+import signal
+import time
+import traceback
+
+
+# The outcome of one step of a test: a command, or generating the program. A step is
+# `cached` if its results were taken from a `CompileCache` instead of running it.
+StepResult = namedtuple(
+    "StepResult",
+    ["name", "args", "returncode", "stdout", "stderr", "duration", "timedout", "cached"],
+    defaults=(False,),
+)
+
+
+class Toolchain(object):
+    """
+    The commands used to build and run tests, and the time that each step may take.
+
+    `swiftc` is the command which runs the compiler, as a list of arguments (so that a
+    stub compiler can be run with an interpreter), and `flags` are passed to every
+    compilation. `timeouts` maps the names of steps, "generate", "compile", "link" and
+    "run", to their timeouts in seconds; steps without one may run indefinitely. The
+    timeout of "generate" only applies to programs generated by a `Prefetcher`.
+    """
+    default_timeouts = {"generate": 60.0, "compile": 60.0, "link": 60.0, "run": 10.0}
+
+    def __init__(self, swiftc=("swiftc",), flags=("-suppress-warnings",), timeouts=None):
+        self.swiftc = [swiftc] if isinstance(swiftc, str) else list(swiftc)
+        self.flags = list(flags)
+        self.timeouts = dict(Toolchain.default_timeouts)
+        if timeouts is not None:
+            self.timeouts.update(timeouts)
+        self.version = None
+
+    async def compiler_version(self):
+        """The output of `swiftc --version`, which is only run once."""
+        if self.version is None:
+            step = await run_step("version", self.swiftc + ["--version"], timeout=60.0)
+            if step.timedout or step.returncode != 0:
+                raise RuntimeError(f"{' '.join(self.swiftc)} --version failed: {step.stderr}")
+            self.version = step.stdout
+        return self.version
+
+
+class Job(object):
+    """
+    A test of one seed, which is generated, compiled, linked and run in `directory`.
+
+    `sources` maps the names of the generated files to their contents, and `steps`
+    collects the result of each step in the order that they ran. If `oracle`, only the
+    transformed module is built, and the tests check it against the interpreter. The
+    program is generated with the swarm `configuration`, if one is given.
+    """
+    def __init__(self, seed, directory, mr=failable_initializer, oracle=False, module="Module",
+                 configuration=None):
+        self.seed = seed
+        self.directory = directory
+        self.mr = mr
+        self.oracle = oracle
+        self.module = module
+        self.configuration = configuration
+        self.sources = {}
+        self.steps = []
+
+    def generate_sources(self):
+        """Generates the job's modules and tests (see `generate_sources`)."""
+        return generate_sources(self.seed, self.mr, self.oracle, self.module, self.configuration)
+
+    def record_error(self, name, exception):
+        """Records an exception raised by a step as that step's failure."""
+        message = "".join(traceback.format_exception(type(exception), exception, exception.__traceback__))
+        self.steps.append(StepResult(name, [], None, "", message, 0.0, False))
+
+    @property
+    def modules(self):
+        """The names of the modules which the test links against."""
+        if self.oracle:
+            return [self.module + "B"]
+        return [self.module + "A", self.module + "B"]
+
+    @property
+    def failed_step(self):
+        """The first step which failed or timed out, if any."""
+        for step in self.steps:
+            if step.timedout or step.returncode != 0:
+                return step
+        return None
+
+    @property
+    def passed(self):
+        return self.failed_step is None and any(step.name == "run" for step in self.steps)
+
+    def status(self):
+        """A summary of the outcome: "passed", or the failed step and how it failed."""
+        step = self.failed_step
+        if step is None:
+            return "passed" if self.passed else "incomplete"
+        if step.timedout:
+            return f"{step.name} timeout"
+        return f"{step.name} failed"
+
+
+async def run_step(name, args, cwd=None, timeout=None, stdin=None, env=None):
+    """
+    Runs a command as a subprocess, capturing its output, exit code and duration. A
+    command which outlives its timeout is killed, and its exit code is None.
+
+    The command runs in a session of its own, so that ctrl+C interrupts the harness
+    rather than the commands that it's waiting for, and it's killed along with any
+    processes that it started.
+    """
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=cwd,
+        env=env,
+        stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+    timedout = False
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(stdin), timeout)
+    except asyncio.TimeoutError:
+        timedout = True
+        _kill(process)
+        stdout, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        _kill(process)
+        await process.wait()
+        raise
+    return StepResult(
+        name,
+        list(args),
+        None if timedout else process.returncode,
+        stdout.decode("utf-8", errors="replace"),
+        stderr.decode("utf-8", errors="replace"),
+        time.perf_counter() - start,
+        timedout,
+    )
+
+
+def _kill(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (AttributeError, ProcessLookupError, PermissionError):
+        process.kill()
+
+########################################
+#   Stages                             #
+########################################
+
+def generate(job: Job):
+    """
+    Generates the modules and tests of a job in this process, and writes them. If
+    generating them raises an exception, its traceback is recorded as the failure of
+    the "generate" step, and False is returned.
+    """
+    start = time.perf_counter()
+    # Metamorphic relations may print, so what they print is kept with the step.
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output):
+            sources = job.generate_sources()
+    except Exception:
+        job.steps.append(StepResult(
+            "generate", [], None, output.getvalue(), traceback.format_exc(),
+            time.perf_counter() - start, False,
+        ))
+        return False
+    write_sources(job, sources, time.perf_counter() - start, output.getvalue())
+    return True
+
+
+def write_sources(job: Job, sources: dict, duration: float, stdout: str=""):
+    """
+    Writes the sources generated for a job, perhaps by another process, to its
+    directory, and records the time that generating them took and what it printed.
+    """
+    job.sources = sources
+    os.makedirs(job.directory, exist_ok=True)
+    for filename, source in sources.items():
+        with open(os.path.join(job.directory, filename), "w") as f:
+            f.write(source)
+    job.steps.append(StepResult("generate", [], 0, stdout, "", duration, False))
+
+
+def generate_sources(seed, mr=failable_initializer, oracle=False, module="Module", configuration=None):
+    """
+    The files which `python -m swiftsmith <seed> -mr <mr> -o <module> --tests test.swift`
+    writes (with `--oracle`, if `oracle`), as a dictionary of names to contents. With a
+    swarm `configuration`, the program is generated from its grammar, and annotated
+    while it's applied.
+    """
+    if configuration is None:
+        program = Program(seed)
+    else:
+        program = Program(seed, grammar=configuration.grammar())
+    with configuration.applied() if configuration is not None else nullcontext():
+        program.generate()
+        return program_sources(program, mr, oracle, module)
+
+
+def program_sources(program, mr=failable_initializer, oracle=False, module="Module", validate=False):
+    """
+    The files of `generate_sources` for a program which has been generated but not
+    annotated, e.g. because its parse tree is changed first. If `validate`, the
+    annotated program is checked first, raising `InvalidProgram` if it isn't valid.
+    """
+    program.annotate()
+    if validate:
+        program.validate()
+
+    header = f"\n// Generated by Swiftsmith {version}"
+    sources = {}
+    if oracle:
+        variant, = program.variants([mr], 1, compose=False)
+        sources[module + "B.swift"] = header + program.render(variant)
+    else:
+        sources[module + "A.swift"] = header + program.render()
+        program.apply(mr)
+        sources[module + "B.swift"] = header + program.render()
+
+    tests = _StringWriter()
+    if oracle:
+        program.write_oracle_tests(tests, module, variants=["B"])
+    else:
+        program.write_tests(tests, module)
+    sources["test.swift"] = "".join(tests)
+    return sources
+
+
+class _StringWriter(list):
+    def write(self, text):
+        self.append(text)
+
+
+async def compile_modules(job: Job, toolchain: Toolchain, cache: CompileCache=None):
+    """
+    Compiles each module of a job into a library, stopping at the first failure.
+    Modules in the cache, if one is given, are copied from it instead, and modules
+    which compile successfully are added to it.
+    """
+    for module in job.modules:
+        args = toolchain.swiftc + ["-emit-module", "-emit-library", f"{module}.swift"] + toolchain.flags
+        if cache is not None:
+            start = time.perf_counter()
+            key = CompileCache.key(
+                job.sources[f"{module}.swift"], module, await toolchain.compiler_version(), args,
+            )
+            if cache.fetch(key, job.directory):
+                job.steps.append(StepResult(
+                    "compile", args, 0, "", "", time.perf_counter() - start, False, True,
+                ))
+                continue
+
+        step = await run_step(
+            "compile",
+            args,
+            cwd=job.directory,
+            timeout=toolchain.timeouts.get("compile"),
+        )
+        job.steps.append(step)
+        if step.timedout or step.returncode != 0:
+            return False
+        if cache is not None:
+            cache.store(key, job.directory, artifacts(job.directory, module))
+    return True
+
+
+async def link_tests(job: Job, toolchain: Toolchain):
+    """Compiles a job's tests, linking them against its modules."""
+    libraries = [f"-l{module}" for module in job.modules]
+    step = await run_step(
+        "link",
+        toolchain.swiftc + ["test.swift", "-I", ".", "-L", "."] + libraries + ["-o", "test"],
+        cwd=job.directory,
+        timeout=toolchain.timeouts.get("link"),
+    )
+    job.steps.append(step)
+    return not step.timedout and step.returncode == 0
+
+
+async def run_tests(job: Job, toolchain: Toolchain):
+    """Runs a job's tests, with its libraries loaded from the working directory."""
+    env = dict(os.environ)
+    env["LD_LIBRARY_PATH"] = "."
+    step = await run_step(
+        "run",
+        [os.path.join(".", "test")],
+        cwd=job.directory,
+        timeout=toolchain.timeouts.get("run"),
+        env=env,
+    )
+    job.steps.append(step)
+    return not step.timedout and step.returncode == 0
+
+
+async def run_job(job: Job, toolchain: Toolchain, cache: CompileCache=None):
+    """Runs every stage of a job in order, until one fails, and returns the job."""
+    if (generate(job) and await compile_modules(job, toolchain, cache)
+            and await link_tests(job, toolchain)):
+        await run_tests(job, toolchain)
+    return job
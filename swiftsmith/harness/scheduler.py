@@ -0,0 +1,373 @@
+from .batch import BatchJob, batches, find_culprits, generate_batch
+from .cache import CompileCache
+from .metrics import Metrics
+from .prefetch import Prefetcher
+from .runner import Job, StepResult, Toolchain, compile_modules, link_tests, run_tests, write_sources
+from .workspace import Workspace, is_bug_candidate
+from ..swarm import Swarm
+
+from contextlib import contextmanager
+from functools import partial
+import asyncio
+import base64
+import os
+import random
+import signal
+import sys
+import time
+
+
+def random_seeds(rng: random.Random=None):
+    """Generates random 256-bit seeds, base64-encoded, from `rng` or from os.urandom."""
+    if rng is None:
+        rng = random.Random(os.urandom(64))
+    while True:
+        yield base64.b64encode(rng.getrandbits(256).to_bytes(32, 'big')).decode("ascii")
+
+
+def available_memory():
+    """The bytes of physical memory that are available, or None if it's unknown."""
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def default_workers(memory_per_job: int=512 * 2**20):
+    """
+    The number of compiler processes to run at once: one per CPU, but no more than
+    fit in the available memory if each takes `memory_per_job` bytes.
+    """
+    workers = os.cpu_count() or 1
+    memory = available_memory()
+    if memory is not None:
+        workers = min(workers, memory // memory_per_job)
+    return max(1, workers)
+
+
+class Stage(object):
+    """The workers of one stage of the pipeline, and the time they spent working."""
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.busy = 0.0
+        self.jobs = 0
+
+    @contextmanager
+    def measure(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.busy += time.perf_counter() - start
+            self.jobs += 1
+
+    def utilization(self, elapsed: float):
+        """The fraction of the time that this stage's workers were busy."""
+        if elapsed <= 0:
+            return 0.0
+        return self.busy / (self.workers * elapsed)
+
+
+class Scheduler(object):
+    """
+    Runs tests of many seeds concurrently, as a pipeline of stages: generate, compile,
+    link and run.
+
+    Programs are generated ahead of the compiler by a `Prefetcher`, in a pool of
+    `generators` processes. The other stages run subprocesses, at most `workers` at
+    once, which defaults to what the CPUs and memory allow. Modules in the `cache`,
+    if one is given, aren't compiled again. With a `batch_size` greater than one,
+    that many programs are tested by each job, as a `Batch`; when a batch fails, the
+    programs responsible are found, and listed in the job's `culprits`. Stages are
+    connected by queues of at most `queue_size` jobs, so a slow stage holds back the
+    stages before it instead of letting jobs pile up.
+
+    Each job has a working directory of its own, taken from a pool under `directory`
+    (by default, a new directory on a RAM-backed filesystem if there is one), which
+    is emptied before the job starts and when it's finished, and removed when the
+    run ends (see `Workspace`). If `artifacts` is given, the directories of jobs which
+    `keep`, by default those which failed, are moved there instead of being emptied,
+    up to `quota` bytes. `on_result` is called with each finished job before its
+    directory is reclaimed.
+
+    With a `swarm`, each group of `swarm.size` programs (or batches, with a
+    `batch_size`) is generated with a different configuration of the generator, which
+    is recorded in each job's `configuration`.
+
+    The finished jobs are measured by `metrics`, which are exported every
+    `metrics.interval` seconds while the scheduler runs, and when it stops.
+
+    When the scheduler receives SIGINT it stops starting new jobs, and finishes the
+    jobs in progress; a second SIGINT cancels them.
+    """
+    def __init__(
+        self,
+        toolchain: Toolchain=None,
+        workers: int=None,
+        directory: str=None,
+        queue_size: int=None,
+        on_result=None,
+        job_options=None,
+        generators: int=None,
+        cache: CompileCache=None,
+        batch_size: int=1,
+        artifacts: str=None,
+        quota: int=2**30,
+        keep=is_bug_candidate,
+        metrics: Metrics=None,
+        swarm: Swarm=None,
+    ):
+        self.toolchain = toolchain or Toolchain()
+        self.workers = workers or default_workers()
+        self.directory = directory
+        self.queue_size = queue_size or self.workers
+        self.on_result = on_result
+        self.job_options = job_options or {}
+        self.generators = generators or max(1, self.workers // 4)
+        self.prefetcher = None
+        self.cache = cache
+        self.batch_size = batch_size
+        self.artifacts = artifacts
+        self.quota = quota
+        self.keep = keep
+        self.workspace = None
+        self.metrics = metrics or Metrics()
+        self.swarm = swarm
+        self.stages = [
+            Stage("generate", self.generators),
+            Stage("compile", self.workers),
+            Stage("link", self.workers),
+            Stage("run", self.workers),
+        ]
+        self.elapsed = 0.0
+        self._start = None
+        self._queues = []
+        self._stopping = None
+        self._tasks = []
+
+    @property
+    def stopped(self):
+        """Whether the last run was stopped, by `stop` or SIGINT."""
+        return self._stopping is not None and self._stopping.is_set()
+
+    def stop(self):
+        """Stops starting new jobs; jobs in progress are finished."""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    def cancel(self):
+        """Cancels the jobs in progress as well."""
+        self.stop()
+        for task in self._tasks:
+            task.cancel()
+
+    def _interrupt(self):
+        if self._stopping.is_set():
+            self.cancel()
+        else:
+            self.stop()
+
+    async def run(self, seeds, count: int=None):
+        """Tests seeds from an iterable until it's exhausted, `count` are tested, or it's stopped."""
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.workers)
+        options = {k: v for k, v in self.job_options.items() if k in ("mr", "oracle", "module", "configuration")}
+        if self.batch_size > 1:
+            # Count seeds rather than batches.
+            self.prefetcher = Prefetcher(
+                batches(seeds, self.batch_size, count),
+                processes=self.generators,
+                options=options,
+                function=generate_batch,
+                swarm=self.swarm,
+                timeout=self.toolchain.timeouts.get("generate"),
+            )
+            count = None
+        else:
+            self.prefetcher = Prefetcher(
+                seeds,
+                processes=self.generators,
+                options=options,
+                swarm=self.swarm,
+                timeout=self.toolchain.timeouts.get("generate"),
+            )
+        self.prefetcher.start()
+        self._start = time.perf_counter()
+
+        # Enough directories for every job that can be in a queue or a worker.
+        self.workspace = Workspace(
+            self.workers * 3 + self.queue_size * 3 + 1,
+            self.directory,
+            self.artifacts,
+            self.quota,
+            self.keep,
+        )
+
+        queues = self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(3)]
+        steps = [partial(compile_modules, cache=self.cache), link_tests, run_tests]
+        self._tasks = [asyncio.ensure_future(self._generate(count, queues[0]))]
+        workers = []
+        for stage, step, queue, following in zip(self.stages[1:], steps, queues, queues[1:] + [None]):
+            for i in range(stage.workers):
+                shard = self.metrics.shard(f"{stage.name}{i}")
+                workers.append(asyncio.ensure_future(self._work(stage, step, queue, following, shard)))
+        self._tasks.extend(workers)
+        exporting = asyncio.ensure_future(self._export())
+        # Waits for the jobs in progress; it's one of the tasks so `cancel` stops it too.
+        drain = asyncio.ensure_future(self._drain(queues))
+        self._tasks.append(drain)
+
+        try:
+            loop.add_signal_handler(signal.SIGINT, self._interrupt)
+        except (NotImplementedError, RuntimeError):
+            # Signals can only be handled in the main thread.
+            pass
+        try:
+            await drain
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            exporting.cancel()
+            await asyncio.gather(exporting, return_exceptions=True)
+            try:
+                loop.remove_signal_handler(signal.SIGINT)
+            except (NotImplementedError, RuntimeError):
+                pass
+            self.prefetcher.close()
+            self.workspace.close()
+            self.elapsed = time.perf_counter() - self._start
+            self._start = None
+        report = self.report()
+        self._export_now(report)
+        return report
+
+    async def _export(self):
+        while True:
+            await asyncio.sleep(self.metrics.interval)
+            self._export_now(self.report())
+
+    def _export_now(self, report):
+        try:
+            self.metrics.export(report)
+        except OSError as e:
+            print(f"SwiftSmith: couldn't export metrics: {e}", file=sys.stderr)
+
+    async def _drain(self, queues):
+        await self._tasks[0]
+        for queue in queues:
+            await queue.join()
+
+    async def _generate(self, count, queue):
+        stage = self.stages[0]
+        shard = self.metrics.shard(stage.name)
+        started = 0
+        while not self._stopping.is_set() and (count is None or started < count):
+            generated = await self.prefetcher.get()
+            if generated is None:
+                break
+            stage.busy += generated.duration
+            stage.jobs += 1
+            directory = await self.workspace.acquire()
+            options = dict(self.job_options, configuration=generated.configuration)
+            if self.batch_size > 1:
+                job = BatchJob(generated.seed, directory, **options)
+            else:
+                job = Job(generated.seed, directory, **options)
+            if generated.error is not None:
+                job.steps.append(StepResult(
+                    "generate", [], None, generated.stdout, generated.error, generated.duration,
+                    generated.timedout,
+                ))
+                self._finish(job, shard)
+                continue
+            if self.batch_size > 1:
+                job.batch = generated.sources
+                write_sources(job, job.batch.sources, generated.duration, generated.stdout)
+            else:
+                write_sources(job, generated.sources, generated.duration, generated.stdout)
+            started += 1
+            try:
+                await queue.put(job)
+            except asyncio.CancelledError:
+                self._finish(job, shard)
+                raise
+
+    async def _work(self, stage, step, queue, following, shard):
+        while True:
+            job = await queue.get()
+            try:
+                try:
+                    async with self._slots:
+                        with stage.measure():
+                            passed = await step(job, self.toolchain)
+                except Exception as e:
+                    job.record_error(stage.name, e)
+                    passed = False
+                if not passed and isinstance(job, BatchJob):
+                    await self._find_culprits(job)
+                if passed and following is not None:
+                    await following.put(job)
+                    job = None
+            finally:
+                if job is not None:
+                    self._finish(job, shard)
+                queue.task_done()
+
+    async def _find_culprits(self, job):
+        try:
+            async with self._slots:
+                await find_culprits(job, self.toolchain, self.cache)
+        except Exception:
+            # The failure can't be narrowed down, so all of the batch's seeds are suspects.
+            job.culprits = list(job.seeds)
+
+    def _finish(self, job, shard):
+        shard.record(job)
+        try:
+            if self.on_result is not None:
+                self.on_result(job)
+        finally:
+            self.workspace.release(job)
+
+    def report(self):
+        """
+        The number of jobs with each status, the utilization of each stage, the jobs
+        waiting in each queue, and how often the compiler waited for programs to be
+        generated. While the scheduler runs, the times are those of the run so far.
+        """
+        prefetcher = self.prefetcher
+        elapsed = self.elapsed if self._start is None else time.perf_counter() - self._start
+        statuses = self.metrics.statuses()
+        return {
+            "elapsed": elapsed,
+            "jobs": sum(statuses.values()),
+            "statuses": statuses,
+            "stages": {
+                stage.name: {
+                    "workers": stage.workers,
+                    "jobs": stage.jobs,
+                    "busy": stage.busy,
+                    "utilization": stage.utilization(elapsed),
+                }
+                for stage in self.stages
+            },
+            "queues": {
+                stage.name: queue.qsize() for stage, queue in zip(self.stages[1:], self._queues)
+            },
+            "prefetch": {
+                "target": prefetcher.target if prefetcher else 0,
+                "buffered": prefetcher.buffered() if prefetcher else 0,
+                "stalls": prefetcher.stalls if prefetcher else 0,
+                "waited": prefetcher.waited if prefetcher else 0.0,
+                "timeouts": prefetcher.timeouts if prefetcher else 0,
+                "recycled": prefetcher.recycled if prefetcher else 0,
+            },
+            "cache": self.cache.statistics() if self.cache else None,
+            "workspace": self.workspace.statistics() if self.workspace else None,
+            "swarm": self.swarm.statistics() if self.swarm else None,
+        }
@@ -0,0 +1,137 @@
+from .cache import _size
+from .results import record
+
+from collections import OrderedDict
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+
+def tmpfs():
+    """The directory of a RAM-backed filesystem in which files can be written, or None."""
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK | os.X_OK):
+        return "/dev/shm"
+    return None
+
+
+def is_bug_candidate(job):
+    """Whether a job found a possible bug: a step failed or timed out."""
+    return job.status() not in ("passed", "incomplete")
+
+
+class Workspace(object):
+    """
+    The working directories of a scheduler's jobs, and the artifacts kept from them.
+
+    The working directories are a pool of `size` directories under `directory`, or if
+    it's None, under a new directory on a RAM-backed filesystem (`tmpfs`), if there is
+    one, so that compiling doesn't wait for the disk. A job takes a directory with
+    `acquire`, which is empty, and gives it back with `release`, which empties it.
+    `close` removes the directories, and the directory which held them if it was made
+    by the workspace.
+
+    If `artifacts` is given, the working directories of jobs which `keep` (by
+    default, bug candidates) are moved there when they're released, with the job's
+    results in `result.json`, rather than emptied. When the kept artifacts take more
+    than `quota` bytes, the oldest are removed.
+    """
+    def __init__(self, size: int, directory: str=None, artifacts: str=None, quota: int=2**30,
+                 keep=is_bug_candidate):
+        self.artifacts = artifacts
+        self.quota = quota
+        self.keep = keep
+        self.kept = 0
+        self.evictions = 0
+        self._made = directory is None
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix="swiftsmith-", dir=tmpfs())
+        self.directory = directory
+
+        self._directories = asyncio.Queue()
+        self._paths = [os.path.join(directory, f"generated{i}") for i in range(size)]
+        for path in self._paths:
+            self._directories.put_nowait(path)
+
+        # The size of each kept job's artifacts, oldest first.
+        self._entries = OrderedDict()
+        if artifacts is not None:
+            os.makedirs(artifacts, exist_ok=True)
+            paths = [os.path.join(artifacts, name) for name in os.listdir(artifacts)]
+            for path in sorted(paths, key=os.path.getmtime):
+                self._entries[path] = _size(path)
+        self.size = sum(self._entries.values())
+
+    async def acquire(self):
+        """Takes an empty working directory, waiting for one to be released if need be."""
+        path = await self._directories.get()
+        _reclaim(path)
+        return path
+
+    def release(self, job):
+        """
+        Gives back a job's working directory, first keeping its artifacts if the job is
+        one to keep. Returns the directory to which they were moved, or None.
+        """
+        kept = None
+        try:
+            if self.artifacts is not None and self.keep(job):
+                kept = self._keep(job)
+        finally:
+            _reclaim(job.directory)
+            self._directories.put_nowait(job.directory)
+        return kept
+
+    def _keep(self, job):
+        path = os.path.join(self.artifacts, _name(job.seed))
+        shutil.rmtree(path, ignore_errors=True)
+        self._entries.pop(path, None)
+        try:
+            shutil.move(job.directory, path)
+            with open(os.path.join(path, "result.json"), "w") as f:
+                json.dump(record(job), f, indent=4)
+        except OSError as e:
+            print(f"SwiftSmith: couldn't keep the artifacts of {job.seed}: {e}", file=sys.stderr)
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        size = _size(path)
+        self._entries[path] = size
+        self.size += size
+        self.kept += 1
+        self._evict()
+        return path if path in self._entries else None
+
+    def _evict(self):
+        while self.size > self.quota and self._entries:
+            path, size = self._entries.popitem(last=False)
+            shutil.rmtree(path, ignore_errors=True)
+            self.size -= size
+            self.evictions += 1
+
+    def close(self):
+        """Removes the working directories."""
+        for path in self._paths:
+            shutil.rmtree(path, ignore_errors=True)
+        if self._made:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def statistics(self):
+        return {
+            "directory": self.directory,
+            "kept": self.kept,
+            "bytes": self.size,
+            "evictions": self.evictions,
+        }
+
+
+def _name(seed):
+    # Seeds are base64, and a batch's seed lists several.
+    return seed.replace("/", "_").replace("+", "-").replace("=", "").replace(" ", ".")[:200]
+
+
+def _reclaim(path):
+    """Empties a working directory, creating it if it doesn't exist."""
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
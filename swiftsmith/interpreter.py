@@ -0,0 +1,277 @@
+from .branch import block as branch_block, branch_statement, conditionlist, else_clause
+from .enum import Enum, EnumDeclaration
+from .expression import Expression, FunctionCall, Value
+from .expression import Variable as ExpressionVariable
+from .formatting import Block
+from .function import Function, FuncDeclaration
+from .semantics import SemanticParseTree
+from .standard_library import Bool, Int, Optional
+from .statement import Assignment, Declaration
+from .statement import Variable as StatementVariable
+from .types import Binding, DataType, EnumType
+
+from collections import namedtuple
+import re
+
+
+class InterpreterError(Exception):
+    """Raised when a program can't be evaluated, or traps as it would in Swift."""
+    pass
+
+
+# The value of an enum case, with the values associated with it.
+EnumValue = namedtuple("EnumValue", ["datatype", "case", "values"])
+
+
+def wrap(value: int) -> int:
+    """Wraps an integer to the range of a 64-bit `Int`, as `&+` and `&*` do."""
+    value &= (1 << 64) - 1
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def parse_literal(text: str, datatype: DataType):
+    """Evaluates a literal generated by `DataType.newvalue`, such as `E.a(1)`."""
+    if datatype == Int:
+        return int(text)
+    if datatype == Bool:
+        if text not in ("true", "false"):
+            raise InterpreterError(f"{text} is not a Bool")
+        return text == "true"
+    if isinstance(datatype, EnumType):
+        for prefix in (datatype.full_name() + ".", "."):
+            if text.startswith(prefix):
+                text = text[len(prefix):]
+                break
+        match = re.match(r"([A-Za-z_][A-Za-z0-9_]*)(?:\((.*)\))?$", text)
+        if match is None or match.group(1) not in datatype.cases:
+            raise InterpreterError(f"{text} is not a case of {datatype.full_name()}")
+        case = datatype.cases[match.group(1)]
+        types = [datatype.generic_types.get(t, t) for t in case.associatedvalues]
+        arguments = _split_arguments(match.group(2)) if match.group(2) else []
+        if len(arguments) != len(types):
+            raise InterpreterError(f"wrong number of associated values for {case.name}")
+        values = tuple(parse_literal(a, t) for a, t in zip(arguments, types))
+        return EnumValue(datatype, case.name, values)
+    raise InterpreterError(f"can't evaluate literals of type {datatype.full_name()}")
+
+
+def _split_arguments(text):
+    """Splits a comma-separated list at the top level of parentheses and generics."""
+    arguments = []
+    depth = 0
+    start = 0
+    for i, c in enumerate(text):
+        if c in "(<":
+            depth += 1
+        elif c in ")>":
+            depth -= 1
+        elif c == "," and depth == 0:
+            arguments.append(text[start:i].strip())
+            start = i + 1
+    arguments.append(text[start:].strip())
+    return arguments
+
+
+def swift_literal(value, datatype: DataType, module: str=None) -> str:
+    """
+    Writes a value as a Swift literal. Types declared in the program are qualified by
+    the name of `module`, if given, so that the literal can be used in tests.
+    """
+    if datatype == Int:
+        return str(value)
+    if datatype == Bool:
+        return "true" if value else "false"
+    case = datatype.cases[value.case]
+    types = [datatype.generic_types.get(t, t) for t in case.associatedvalues]
+    values = ""
+    if types:
+        values = "(" + ", ".join(swift_literal(v, t, module) for v, t in zip(value.values, types)) + ")"
+    return f"{_type_name(datatype, module)}.{value.case}{values}"
+
+
+def _type_name(datatype, module):
+    if datatype.name == Optional.name:
+        wrapped = [t for t in datatype.generic_types.values()][0]
+        return f"Optional<{_type_name(wrapped, module)}>"
+    if module is None or datatype in (Int, Bool):
+        return datatype.full_name()
+    return f"{module}.{datatype.full_name()}"
+
+
+class _Return(Exception):
+    def __init__(self, value):
+        self.value = value
+
+
+class Interpreter(object):
+    """
+    Evaluates the functions of an annotated parse tree, as a reference for the results
+    that the compiled program should produce.
+
+    This supports the subset of Swift which SwiftSmith generates: functions and static
+    methods, enums with associated values, `Optional`, `if`/`else`, wrapping arithmetic
+    (`&+`, `&*`) and comparisons (`==`, `>`). Expressions rewritten by the arithmetic
+    MRs are evaluated too, but code inserted as plain strings is not.
+
+    Function calls may be nested at most `max_depth` deep.
+    """
+    def __init__(self, parsetree: SemanticParseTree, max_depth: int=200):
+        self.max_depth = max_depth
+        self.functions = {}
+        for node in parsetree.index().nodes(FuncDeclaration):
+            function = node.childwhere(lambda n: isinstance(n.value, Function)).value
+            name = function.annotations["name"]
+            if function.annotations["binding"] == Binding.static:
+                for ancestor in node.ancestors():
+                    if isinstance(ancestor.value, EnumDeclaration):
+                        enum = ancestor.childwhere(lambda n: isinstance(n.value, Enum)).value
+                        name = f"{enum.annotations['name']}.{name}"
+                        break
+            self.functions[name] = (function, node)
+        self._depth = 0
+
+    def call(self, name: str, arguments: list):
+        """Calls the named function (`E.f` for a static method) with argument values."""
+        if name not in self.functions:
+            raise InterpreterError(f"no function named {name}")
+        function, node = self.functions[name]
+        parameters = function.annotations["arguments"]
+        if len(arguments) != len(parameters):
+            raise InterpreterError(f"{name} takes {len(parameters)} arguments")
+
+        self._depth += 1
+        try:
+            if self._depth > self.max_depth:
+                raise InterpreterError(f"calls nested more than {self.max_depth} deep")
+            frames = [dict(zip(parameters, arguments))]
+            try:
+                self._execute(node, frames)
+            except _Return as result:
+                return result.value
+            raise InterpreterError(f"{name} did not return")
+        finally:
+            self._depth -= 1
+
+    def evaluate_call(self, tree: SemanticParseTree):
+        """Evaluates an annotated `FunctionCall` tree, such as those in tests."""
+        return self._evaluate(tree, [{}])
+
+    ########################################
+    #   Statements                         #
+    ########################################
+
+    def _execute(self, node, frames):
+        pushed = False
+        children = node.children or []
+        try:
+            for i, child in enumerate(children):
+                value = child.value
+                if isinstance(value, Block):
+                    # The rest of this node's children are in the block's scope.
+                    frames.append({})
+                    pushed = True
+                elif isinstance(value, Assignment):
+                    self._assign(child, frames)
+                elif value == branch_statement:
+                    self._branch(child, frames)
+                elif value == "return " and child.isleaf():
+                    raise _Return(self._expression(children[i + 1], frames))
+                elif child.children and not isinstance(value, (FuncDeclaration, EnumDeclaration)):
+                    self._execute(child, frames)
+        finally:
+            if pushed:
+                frames.pop()
+
+    def _assign(self, node, frames):
+        if len(node.children) == 1:
+            return self._assign(node.children[0], frames)
+        target = next(c.value for c in node.children
+                      if isinstance(c.value, (Declaration, StatementVariable)))
+        expression = next(c for c in node.children if isinstance(c.value, Expression))
+        value = self._expression(expression, frames)
+
+        if isinstance(target, StatementVariable) and target.annotations.get("variable") is None:
+            target = target.annotations["declaration"]
+        name = target.annotations["name"]
+        if isinstance(target, Declaration):
+            frames[-1][name] = value
+            return
+        for frame in reversed(frames):
+            if name in frame:
+                frame[name] = value
+                return
+        raise InterpreterError(f"assignment to undeclared variable {name}")
+
+    def _branch(self, node, frames):
+        if_statement = node.children[0]
+        conditions = if_statement.childwhere(lambda n: n.value == conditionlist)
+        if self._conditions(conditions, frames):
+            self._execute(if_statement.childwhere(lambda n: n.value == branch_block), frames)
+            return
+        for child in if_statement.children:
+            if child.value == else_clause:
+                self._execute(child.childwhere(lambda n: n.value == branch_block), frames)
+
+    def _conditions(self, node, frames):
+        """Evaluates a list of conditions in order, until one of them is false."""
+        for child in node.children:
+            if child.value == conditionlist:
+                return self._conditions(child, frames)
+            for condition in child.preorder(values=False):
+                if isinstance(condition.value, Expression) and condition.isleaf():
+                    if not self._expression(condition, frames):
+                        return False
+        return True
+
+    ########################################
+    #   Expressions                        #
+    ########################################
+
+    def _expression(self, node, frames):
+        expression = node.value
+        return self._evaluate(expression.annotations["subtree"], frames)
+
+    def _evaluate(self, tree, frames):
+        value = tree.value
+        if isinstance(value, Expression) and tree.children is not None:
+            return self._rewritten(tree, frames)
+        if isinstance(value, ExpressionVariable):
+            variable = value.annotations.get("variable")
+            if variable is None:
+                return parse_literal(value.annotations["value"], value.datatype)
+            for frame in reversed(frames):
+                if variable.name in frame:
+                    return frame[variable.name]
+            raise InterpreterError(f"use of undeclared variable {variable.name}")
+        if isinstance(value, Value):
+            return parse_literal(value.annotations["value"], value.datatype)
+        if isinstance(value, FunctionCall):
+            arguments = [self._evaluate(child, frames) for child in tree.children
+                         if isinstance(child.value, ExpressionVariable)]
+            return self._call(value.name, arguments)
+        raise InterpreterError(f"can't evaluate {tree.string()!r}")
+
+    def _rewritten(self, tree, frames):
+        """Evaluates an expression rewritten as `(e) + 0` or `(e) * 1`."""
+        inner = [child for child in tree.children if type(child.value) is not str]
+        suffix = tree.children[-1].value
+        match = re.fullmatch(r"\) ([+*]) (-?[0-9]+)", suffix) if isinstance(suffix, str) else None
+        if len(inner) != 1 or match is None:
+            raise InterpreterError(f"can't evaluate {tree.string()!r}")
+        value = self._evaluate(inner[0], frames)
+        operand = int(match.group(2))
+        result = value + operand if match.group(1) == "+" else value * operand
+        if wrap(result) != result:
+            raise InterpreterError("arithmetic overflow")
+        return result
+
+    def _call(self, name, arguments):
+        if name == "&+":
+            return wrap(arguments[0] + arguments[1])
+        if name == "&*":
+            return wrap(arguments[0] * arguments[1])
+        if name == "==":
+            return arguments[0] == arguments[1]
+        if name == ">":
+            return arguments[0] > arguments[1]
+        return self.call(name, arguments)
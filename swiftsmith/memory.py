@@ -0,0 +1,165 @@
+from .grammar import ParseTree
+from .profiling import PhaseHook
+from .scope import Scope
+from .semantics import Annotatable
+from .types import DataType
+
+import _thread
+import gc
+import sys
+import threading
+import tracemalloc
+
+
+class MemoryBudgetExceeded(Exception):
+    """Raised when generating a program allocates more memory than its budget."""
+    def __init__(self, phase, peak, budget):
+        super().__init__(
+            f"Memory budget of {budget} bytes exceeded during {phase} (peak {peak} bytes)"
+        )
+        self.phase = phase
+        self.peak = peak
+        self.budget = budget
+
+
+def census():
+    """
+    Counts the objects of the classes that make up most of a program's memory, and
+    estimates the bytes they use (excluding the objects that they refer to).
+    """
+    totals = {}
+    # Otherwise garbage left by earlier work may be collected between two censuses.
+    gc.collect()
+
+    def add(name, obj):
+        count, size = totals.get(name, (0, 0))
+        totals[name] = (count + 1, size + sys.getsizeof(obj))
+
+    for obj in gc.get_objects():
+        if isinstance(obj, ParseTree):
+            add("ParseTree", obj)
+            add("ParseTree.__dict__", obj.__dict__)
+            add("frontier list", obj.frontier)
+            if obj.children is not None:
+                add("children list", obj.children)
+        elif isinstance(obj, Scope):
+            add("Scope", obj)
+            add("Scope.__dict__", obj.__dict__)
+        elif isinstance(obj, DataType):
+            add("DataType", obj)
+            add("DataType.__dict__", obj.__dict__)
+        elif isinstance(obj, Annotatable):
+            add("Annotatable", obj)
+            if hasattr(obj, "annotations"):
+                add("annotations dict", obj.annotations)
+    return totals
+
+
+class MemoryProfiler(PhaseHook):
+    """
+    Measures the memory allocated by each phase of program generation with
+    tracemalloc, for use as a hook of a `Profiler`.
+
+    Each phase's record gains a "memory" entry with the net bytes it allocated and its
+    peak traced memory. If `detailed`, it also lists the source lines which allocated
+    the most memory, and the change in the number and size of parse tree nodes,
+    frontier lists, scopes, datatypes and annotations.
+
+    If `budget` (in bytes) is given, `MemoryBudgetExceeded` is raised from the phase
+    in which traced memory exceeds it. A background thread polls traced memory every
+    `interval` seconds, so that a phase which never finishes is interrupted too.
+    """
+    def __init__(self, budget: int=None, detailed: bool=True, top: int=10, frames: int=1,
+                 interval: float=0.01):
+        self.budget = budget
+        self.detailed = detailed
+        self.top = top
+        self.frames = frames
+        self.interval = interval
+        self._exceeded = None
+        self._in_phase = False
+        # Held while the watchdog decides to interrupt a phase, and while a phase ends,
+        # so that the main thread is never interrupted after a phase has ended.
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watchdog = None
+        self._tracing = False
+
+    def start(self):
+        """Starts tracing allocations, and watching the budget if there is one."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._tracing = True
+        if self.budget is not None:
+            self._stopped.clear()
+            self._watchdog = threading.Thread(target=self._watch, daemon=True)
+            self._watchdog.start()
+
+    def stop(self):
+        """Stops watching the budget, and tracing allocations if `start` began it."""
+        self._stopped.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            _, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                if self._in_phase and peak > self.budget:
+                    self._exceeded = peak
+                    # Interrupts the phase in progress, which `end_phase` then reports.
+                    _thread.interrupt_main()
+                    return
+
+    def start_phase(self, name):
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self._current, _ = tracemalloc.get_traced_memory()
+        if self.detailed:
+            self._snapshot = tracemalloc.take_snapshot()
+            self._census = census()
+        with self._lock:
+            self._in_phase = True
+
+    def end_phase(self, name, record):
+        try:
+            with self._lock:
+                self._in_phase = False
+        except KeyboardInterrupt:
+            # The watchdog interrupted the phase just as it finished, and the interrupt
+            # arrived here. It's reported as the budget being exceeded below.
+            if self._exceeded is None:
+                raise
+        current, peak = tracemalloc.get_traced_memory()
+        memory = {"allocated": current - self._current, "peak": peak}
+
+        if self.detailed:
+            snapshot = tracemalloc.take_snapshot()
+            memory["sites"] = [
+                {
+                    "site": str(stat.traceback),
+                    "size": stat.size_diff,
+                    "count": stat.count_diff,
+                }
+                for stat in snapshot.compare_to(self._snapshot, "lineno")[:self.top]
+            ]
+            before = self._census
+            after = census()
+            memory["types"] = {}
+            for kind in sorted(set(before) | set(after)):
+                count, size = after.get(kind, (0, 0))
+                oldcount, oldsize = before.get(kind, (0, 0))
+                memory["types"][kind] = {"count": count - oldcount, "size": size - oldsize}
+            self._snapshot = None
+            self._census = None
+
+        record["memory"] = memory
+
+        if self.budget is not None:
+            if self._exceeded is not None or peak > self.budget:
+                self._stopped.set()
+                raise MemoryBudgetExceeded(name, max(peak, self._exceeded or 0), self.budget)
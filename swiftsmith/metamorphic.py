@@ -1,4 +1,4 @@
-from .enum import case_statements, Enum, EnumDeclaration
+from .enum import case_statements, Enum, EnumDeclaration, Initializer
 from .expression import Expression
 from .semantics import SemanticParseTree
 from .standard_library import Int
@@ -10,6 +10,9 @@ import random
 # should be (the oracle problem), or can be used to create new tests from existing
 # ones.
 
+# Each MR takes either a parse tree, which it modifies, or a `Variant` of one. It finds
+# nodes using `parsetree.index()`, and gets the node to modify from `parsetree.edit`.
+
 # In SwiftSmith, a metamorphic relation is a semantics-preserving transformation on
 # a Swift program. That is, given one Swift program, it produces another one with
 # slightly different source code that should behave identically. In this way, we're
@@ -22,15 +25,16 @@ def unnecessary_addition(parsetree: SemanticParseTree):
 
     `e` can be replaced in a program with `(e) + 0`
     
-    Note: this function mutates the given parse tree.
+    Note: this function mutates the given parse tree, unless it is a `Variant`.
     """
-    intexpr = Expression(Int)
-    candidates = [node for node in parsetree if node == intexpr]
+    candidates = parsetree.index().nodes(Expression, datatype=Int)
     if len(candidates) == 0:
         return
-    target = random.choice(candidates)
+    target = parsetree.edit(random.choice(candidates)).value
     tree = target.annotations["subtree"]
-    newtree = SemanticParseTree(intexpr, ["(", tree, ") + 0"])
+    newtree = SemanticParseTree(Expression(Int), ["(", ") + 0"])
+    # `tree` is not reparented, since it may be shared with other variants.
+    newtree.children.insert(1, tree)
     target.annotations["subtree"] = newtree
 
 
@@ -40,15 +44,16 @@ def unnecessary_multiplication(parsetree: SemanticParseTree):
 
     `e` can be replaced in a program with `(e) * 1`
 
-    Note: this function mutates the given parse tree.
+    Note: this function mutates the given parse tree, unless it is a `Variant`.
     """
-    intexpr = Expression(Int)
-    candidates = [node for node in parsetree if node == intexpr]
+    candidates = parsetree.index().nodes(Expression, datatype=Int)
     if len(candidates) == 0:
         return
-    target = random.choice(candidates)
+    target = parsetree.edit(random.choice(candidates)).value
     tree = target.annotations["subtree"]
-    newtree = SemanticParseTree(intexpr, ["(", tree, ") * 1"])
+    newtree = SemanticParseTree(Expression(Int), ["(", ") * 1"])
+    # `tree` is not reparented, since it may be shared with other variants.
+    newtree.children.insert(1, tree)
     target.annotations["subtree"] = newtree
 
 def failable_initializer(parsetree: SemanticParseTree):
@@ -63,23 +68,34 @@ def failable_initializer(parsetree: SemanticParseTree):
     ```
     and `e` can be replaced with `.init()!`
     """
-    enum_declarations = [n for n in parsetree.preorder(values=False)
-                         if isinstance(n.value, EnumDeclaration)]
+    index = parsetree.index()
+    enum_declarations = index.nodes(EnumDeclaration)
     if len(enum_declarations) == 0:
         print("uh oh 1")
         return
     enum_declaration = random.choice(enum_declarations)
     enum = enum_declaration.childwhere(lambda n: isinstance(n.value, Enum))
     A = enum.value.annotations["type"]
-    exprA = Expression(A)
-    expressions = [n for n in parsetree if n == exprA]
+    # The expressions of initializers added before would become `self = .init()!`.
+    expressions = [
+        node for node in index.nodes(Expression, datatype=A)
+        if not any(isinstance(ancestor.value, Initializer) for ancestor in node.ancestors())
+    ]
     if len(expressions) == 0:
         print("uh oh 2")
         return
-    expression = random.choice(expressions)
+    expression = parsetree.edit(random.choice(expressions)).value
 
+    # The initializer is built from nodes, rather than a string, so that its
+    # expression can be checked in the scope of the enum. The expression's subtree is
+    # not reparented, since it may be shared with other variants.
+    initial = SemanticParseTree(Expression(A), [])
+    initial.children.append(expression.annotations["subtree"])
+    value = Expression(A)
+    value.annotations["subtree"] = initial
     enum_body = enum_declaration.childwhere(lambda n: n.value == case_statements)
-    enum_body.children = [
-        SemanticParseTree(f"init?() {{ self = {expression.string()} }}\n\n\t"),
-    ] + enum_body.children
+    parsetree.edit(enum_body).insert_child(
+        0,
+        SemanticParseTree(Initializer(), ["init?() { self = ", value, " }\n\n\t"]),
+    )
     expression.annotations["subtree"] = SemanticParseTree(".init()!")
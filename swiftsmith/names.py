@@ -1,3 +1,5 @@
+from .statistics import counters
+
 from itertools import product
 
 def _identifiers():
@@ -25,4 +27,24 @@ def _identifiers():
                 yield "".join(i)
         length += 1
 
-identifier = _identifiers()
\ No newline at end of file
+class _Identifiers(object):
+    """
+    An iterator over identifiers for use in generated code, which may be restarted so
+    that several programs generated in one process use the same names.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Restarts the enumeration from the first identifier."""
+        self._identifiers = _identifiers()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        name = next(self._identifiers)
+        counters.observe("identifier.length", len(name))
+        return name
+
+identifier = _Identifiers()
\ No newline at end of file
@@ -0,0 +1,198 @@
+from contextlib import contextmanager
+import cProfile
+import fcntl
+import json
+import os
+import pstats
+import time
+
+
+class PhaseHook(object):
+    """
+    Observes the phases of program generation measured by a `Profiler`.
+
+    Subclasses may override either method. `end_phase` receives the record for the
+    phase, which it may extend with its own measurements.
+    """
+    def start_phase(self, name: str):
+        pass
+
+    def end_phase(self, name: str, record: dict):
+        pass
+
+
+class Profiler(object):
+    """
+    Measures the wall and CPU time of each phase of generating one or more programs.
+
+    Phases are measured with the `phase` context manager between calls to
+    `start_program` and `end_program`. If a phase runs several times for a program,
+    as rendering does for metamorphic testing, its times are summed. When programs
+    are profiled in a batch, `summary` aggregates the times into histograms.
+
+    If `pstats_dir` is given, each phase also runs under cProfile, and `write_pstats`
+    writes the combined statistics for every phase to that directory.
+    """
+
+    # Upper bounds of the histogram buckets, in seconds.
+    buckets = [0.0001 * 2**k for k in range(20)]
+
+    # Upper bounds of the histogram buckets for memory, in bytes.
+    memory_buckets = [1024 * 2**k for k in range(24)]
+
+    def __init__(self, pstats_dir: str=None):
+        self.hooks = []
+        self.pstats_dir = pstats_dir
+        self.programs = []
+        self._current = None
+        self._stats = {}
+
+    def add_hook(self, hook: PhaseHook):
+        self.hooks.append(hook)
+
+    def start_program(self, seed=None):
+        self._current = {"seed": seed, "phases": {}}
+
+    def end_program(self):
+        self.programs.append(self._current)
+        self._current = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Measures the enclosed code as the given phase of the current program."""
+        for hook in self.hooks:
+            hook.start_phase(name)
+
+        profile = cProfile.Profile() if self.pstats_dir is not None else None
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            record = {
+                "wall": time.perf_counter() - wall,
+                "cpu": time.process_time() - cpu,
+            }
+            if profile is not None:
+                self._add_stats(name, profile)
+
+            for hook in self.hooks:
+                hook.end_phase(name, record)
+            self._record(name, record)
+
+    def _record(self, name, record):
+        if self._current is None:
+            self.start_program()
+        phases = self._current["phases"]
+        if name in phases:
+            for key, value in record.items():
+                if isinstance(value, (int, float)) and key in phases[name]:
+                    phases[name][key] += value
+                else:
+                    phases[name][key] = value
+        else:
+            phases[name] = record
+
+    def _add_stats(self, name, profile):
+        if name in self._stats:
+            self._stats[name].add(profile)
+        else:
+            self._stats[name] = pstats.Stats(profile)
+
+    def write_pstats(self):
+        """Writes the cProfile statistics of each phase to `<pstats_dir>/<phase>.pstats`."""
+        os.makedirs(self.pstats_dir, exist_ok=True)
+        for name, stats in self._stats.items():
+            path = os.path.join(self.pstats_dir, f"{name}.pstats")
+            # Runs writing to the same directory at once replace each other's files
+            # whole, rather than writing into them.
+            temporary = f"{path}.{os.getpid()}.tmp"
+            stats.dump_stats(temporary)
+            os.replace(temporary, path)
+
+    def summary(self, programs=None):
+        """
+        Summarizes the profiled programs, or `programs` if given, with histograms of
+        each phase's times.
+        """
+        if programs is None:
+            programs = self.programs
+        phases = {}
+        for program in programs:
+            for name, record in program["phases"].items():
+                for key in ("wall", "cpu"):
+                    phases.setdefault(name, {}).setdefault(key, []).append(record[key])
+                # Added by `MemoryProfiler`
+                for key in ("allocated", "peak"):
+                    if key in record.get("memory", {}):
+                        phases[name].setdefault(f"memory.{key}", []).append(record["memory"][key])
+
+        return {
+            "programs": programs,
+            "phases": {
+                name: {
+                    key: distribution(
+                        values,
+                        Profiler.memory_buckets if key.startswith("memory.") else Profiler.buckets
+                    )
+                    for key, values in measurements.items()
+                }
+                for name, measurements in phases.items()
+            },
+        }
+
+    def save(self, path):
+        """
+        Writes the summary as JSON. If the file already holds a summary, the programs
+        in it are included, so that separate runs aggregate into one batch.
+        """
+        save_summary(path, self.programs, self.summary)
+
+
+def save_summary(path, programs, summary):
+    """
+    Writes `summary(programs)` as JSON, including the programs of the summary that the
+    file already holds. Runs which save to the same file at once take turns, holding
+    a lock on `<path>.lock`, and the file is replaced whole, so that a reader never
+    sees it partly written.
+    """
+    with open(path + ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.exists(path):
+            with open(path) as f:
+                programs = json.load(f)["programs"] + programs
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(summary(programs), f, indent=2)
+        os.replace(temporary, path)
+
+
+def distribution(values, buckets):
+    """Summarizes a list of numbers with percentiles and a histogram."""
+    values = sorted(values)
+
+    def percentile(p):
+        return values[min(len(values) - 1, int(p * len(values)))]
+
+    counts = [0] * (len(buckets) + 1)
+    for value in values:
+        i = 0
+        while i < len(buckets) and value > buckets[i]:
+            i += 1
+        counts[i] += 1
+
+    return {
+        "count": len(values),
+        "total": sum(values),
+        "mean": sum(values) / len(values),
+        "min": values[0],
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "p99": percentile(0.99),
+        "max": values[-1],
+        "histogram": {"buckets": buckets, "counts": counts},
+    }
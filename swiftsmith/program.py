@@ -0,0 +1,166 @@
+from .expression import FunctionCall
+from .interpreter import Interpreter, InterpreterError, swift_literal
+from .names import identifier
+from .scope import Scope
+from .semantics import SemanticParseTree
+from .statistics import counters
+from .swift import swift
+from .types import AccessLevel
+from .validation import validate
+from .variants import variants
+
+from contextlib import nullcontext
+import base64
+import random
+
+version = "v0.0.2"
+
+
+def decode_seed(b64str: str):
+    """Converts a base64-encoded seed to the integer used to seed the generator."""
+    binarystr = base64.b64decode(b64str)
+    return int.from_bytes(binarystr, 'big', signed=False)
+
+
+class Program(object):
+    """
+    A random Swift program, which is determined by its seed.
+
+    A program is generated in phases, which are run by calling these methods in order:
+    * `generate` takes a random walk on the grammar to produce a parse tree.
+    * `annotate` annotates the parse tree with context-dependent information.
+    * `apply` applies a metamorphic relation to the parse tree, or `variants` derives
+      several transformed variants of it (optional).
+    * `validate` checks the program without compiling it (optional).
+    * `render` produces the text of the program, or `render_to` writes it to a stream.
+    * `write_tests` writes tests which compare two modules built from the program, or
+      `write_oracle_tests` writes tests which check modules against the results of the
+      reference interpreter.
+
+    If a `Profiler` is given, each phase is measured by it.
+    """
+    def __init__(self, seed: str, grammar=swift, weights=None, profiler=None):
+        self.seed = seed
+        self.grammar = grammar
+        self.weights = weights
+        self.profiler = profiler
+        self.parsetree = None
+        self.rootscope = None
+
+    def _phase(self, name):
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.phase(name)
+
+    def generate(self):
+        with self._phase("generate"):
+            random.seed(decode_seed(self.seed))
+            identifier.reset()
+            counters.reset()
+            self.parsetree = self.grammar.randomtree(weights=self.weights)
+        return self.parsetree
+
+    def annotate(self):
+        with self._phase("annotate"):
+            # We play a game of musical chairs to ensure that the generated main
+            # function uses a function defined in the generated code instead of one
+            # imported from the standard library. Public symbols are visible from
+            # anywhere in the scope tree, so when the program is generated then the
+            # file scope and standard library scope must be in the same tree. When
+            # main is generated, they must be in different trees.
+            self.rootscope = Scope()
+            self.rootscope.import_standard_library()
+            self.parsetree.annotate(scope=self.rootscope)
+
+            # break the link between rootscope and the standard library scopes
+            self.rootscope.children = [self.rootscope.children[-1]]
+
+    def apply(self, mr):
+        """Applies the given metamorphic relation to the program's parse tree."""
+        with self._phase("mr"):
+            mr(self.parsetree)
+
+    def validate(self, variant=None):
+        """
+        Checks that the program, or the given variant of it, is valid Swift, raising
+        `InvalidProgram` with the reason if it isn't.
+        """
+        with self._phase("validate"):
+            validate(self.parsetree if variant is None else variant.root)
+
+    def variants(self, mrs, count, compose=True):
+        """
+        Derives `count` variants of the program from the metamorphic relations `mrs`,
+        leaving the program's own parse tree unchanged (see `variants.variants`).
+        """
+        with self._phase("mr"):
+            return list(variants(self.parsetree, mrs, count, compose=compose))
+
+    def render(self, variant=None):
+        """Renders the program, or the given variant of it."""
+        with self._phase("render"):
+            if variant is not None:
+                return variant.string()
+            return self.parsetree.string()
+
+    def render_to(self, stream, variant=None):
+        """Writes the program, or the given variant of it, to a stream."""
+        with self._phase("render"):
+            if variant is not None:
+                variant.render_to(stream)
+            else:
+                self.parsetree.render_to(stream)
+
+    def write_tests(self, f, modulename, count=50, variants=("B",)):
+        """
+        Writes a Swift file which asserts that public functions of the module
+        `<modulename>A` and each module `<modulename><variant>` return equal results.
+        """
+        with self._phase("tests"):
+            f.write(f"\n// Generated by Swiftsmith {version}\n\n")
+            f.write(f"import {modulename}A\n")
+            for variant in variants:
+                f.write(f"import {modulename}{variant}\n")
+            f.write("\n")
+
+            for _ in range(count):
+                fname, ftype = self.rootscope.choose_function(at_least=AccessLevel.public)
+                call = SemanticParseTree(FunctionCall(fname, ftype), [])
+                call.annotate()
+                # TODO: handle prefix, infix, and postfix functions
+                for variant in variants:
+                    f.write("assert(ModuleA.")
+                    call.render_to(f)
+                    f.write(f".hashValue == Module{variant}.")
+                    call.render_to(f)
+                    f.write(".hashValue)\n")
+
+    def write_oracle_tests(self, f, modulename, count=50, variants=("",)):
+        """
+        Writes a Swift file which asserts that public functions of each module
+        `<modulename><variant>` return the results computed by interpreting the
+        program. Calls which can't be interpreted are written as comments.
+        """
+        with self._phase("tests"):
+            f.write(f"\n// Generated by Swiftsmith {version}\n\n")
+            for variant in variants:
+                f.write(f"import {modulename}{variant}\n")
+            f.write("\n")
+
+            interpreter = Interpreter(self.parsetree)
+            for _ in range(count):
+                fname, ftype = self.rootscope.choose_function(at_least=AccessLevel.public)
+                call = SemanticParseTree(FunctionCall(fname, ftype), [])
+                call.annotate()
+                try:
+                    result = interpreter.evaluate_call(call)
+                except InterpreterError as e:
+                    f.write("// ")
+                    call.render_to(f)
+                    f.write(f": {e}\n")
+                    continue
+                for variant in variants:
+                    expected = swift_literal(result, ftype.returntype, f"{modulename}{variant}")
+                    f.write(f"assert({modulename}{variant}.")
+                    call.render_to(f)
+                    f.write(f" == {expected})\n")
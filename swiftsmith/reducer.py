@@ -0,0 +1,262 @@
+from .grammar import Nonterminal
+from .harness.runner import Job, Toolchain, compile_modules, link_tests, program_sources, run_tests, write_sources
+from .metamorphic import failable_initializer
+from .program import Program
+from .swift import swift
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import asyncio
+import copy
+import os
+import tempfile
+
+
+def minimal_derivations(grammar):
+    """
+    For each nonterminal of a grammar, the production which derives the smallest tree
+    from it, and the number of nodes in that tree, as two dictionaries.
+    """
+    return grammar.minimal_derivations()
+
+
+def minimize(node, rules):
+    """Replaces the subtree of a node with the smallest tree derived from its symbol."""
+    node.replace_children(None)
+    stack = [node]
+    while stack:
+        tree = stack.pop()
+        rule = rules.get(tree.value) if isinstance(tree.value, Nonterminal) else None
+        if rule is None:
+            continue
+        tree.expand(copy.deepcopy(rule.rhs), propagate=False)
+        tree.production = rule
+        tree.frontier = []
+        stack.extend(tree.children)
+
+
+def apply_edits(tree, edits, rules):
+    """
+    Edits a tree, returning its root, which changes if the root is replaced. Each edit
+    is a pair of paths, a path being the indexes of children from the root: the node
+    at the first path is replaced by the node at the second, one of its descendants,
+    or if that's None, by the smallest tree derived from its symbol (see `minimize`).
+    """
+    def find(path):
+        node = tree
+        for i in path:
+            node = node.children[i]
+        return node
+
+    # Paths are of the unedited tree, so they're followed before any edit is made.
+    edits = [(find(path), target and find(target)) for path, target in sorted(edits, key=lambda e: e[0])]
+    for node, replacement in edits:
+        if replacement is None:
+            minimize(node, rules)
+            continue
+        parent = node.parent
+        if parent is None:
+            replacement.parent = None
+            tree = replacement
+        else:
+            parent.replace_children(replacement if child is node else child for child in parent.children)
+    return tree
+
+
+def size(tree):
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children or ())
+    return count
+
+
+def _descendant(path, node):
+    """The path of the closest descendant of a node with the same symbol, and the descendant."""
+    queue = [(path + (i,), child) for i, child in enumerate(node.children or ())]
+    for path, descendant in queue:
+        if descendant.value == node.value:
+            return path, descendant
+        queue.extend((path + (i,), child) for i, child in enumerate(descendant.children or ()))
+    return None
+
+
+def reduced_program(seed, edits, configuration=None):
+    """
+    The generated, unannotated program of a seed with the given edits, generated with
+    a swarm configuration if one is given.
+    """
+    grammar = configuration.grammar() if configuration is not None else swift
+    program = Program(seed, grammar=grammar)
+    program.generate()
+    program.parsetree = apply_edits(program.parsetree, edits, minimal_derivations(grammar)[0])
+    return program
+
+
+def _test(seed, edits, options, toolchain, configuration=None):
+    """The status of testing a seed's program with some edits, or None if it isn't valid."""
+    try:
+        with configuration.applied() if configuration is not None else nullcontext():
+            sources = program_sources(reduced_program(seed, edits, configuration), validate=True, **options)
+    except Exception:
+        return None
+    with tempfile.TemporaryDirectory() as directory:
+        job = Job(seed, directory, **options)
+        write_sources(job, sources, 0.0)
+        asyncio.run(_build(job, toolchain))
+    return job.status()
+
+
+async def _build(job, toolchain):
+    if await compile_modules(job, toolchain) and await link_tests(job, toolchain):
+        await run_tests(job, toolchain)
+
+
+class Reducer(object):
+    """
+    Reduces the program of a seed which fails a test, by hierarchical delta debugging
+    on its parse tree.
+
+    The tree is reduced a level at a time, from the root down. At each level, delta
+    debugging finds a minimal set of nodes to keep, such that the test still fails
+    with the same `status` (by default, that of the unreduced program) when every
+    other node is replaced by the smallest tree which the grammar derives from its
+    symbol. Then it finds a minimal set of the nodes which are left to keep, such that
+    the test fails when every other node is replaced by its closest descendant with
+    the same symbol, which removes an element of a list such as a function's
+    statements. The next level is the children of the nodes which were kept, and the
+    descendants which replaced nodes. A candidate is the program generated from the
+    seed with a set of edits, which is annotated and validated again, and compiled,
+    linked and run like a `Job` with `toolchain`. Candidates which aren't valid never count as failing.
+
+    The candidates of each step of delta debugging are tested in parallel, in a pool
+    of `processes` processes, and the status of each candidate is remembered, so that
+    none is tested twice. A seed which was tested with a swarm `configuration` is
+    reduced with the same one.
+    """
+    def __init__(self, seed: str, toolchain: Toolchain=None, mr=failable_initializer,
+                 oracle: bool=False, module: str="Module", processes: int=None,
+                 status: str=None, configuration=None):
+        self.seed = seed
+        self.configuration = configuration
+        self.toolchain = toolchain or Toolchain()
+        self.options = {"mr": mr, "oracle": oracle, "module": module}
+        self.processes = processes or os.cpu_count() or 1
+        self.status = status
+        self.edits = frozenset()
+        self.tested = 0
+        self.hits = 0
+        self._statuses = {}
+        self._pool = None
+
+    def test(self, candidates):
+        """The status of the program with each set of edits, testing those not yet tested."""
+        untested = list({edits for edits in candidates if edits not in self._statuses})
+        self.hits += len(candidates) - len(untested)
+        if untested:
+            statuses = self._pool.map(
+                _test,
+                [self.seed] * len(untested),
+                untested,
+                [self.options] * len(untested),
+                [self.toolchain] * len(untested),
+                [self.configuration] * len(untested),
+            )
+            self._statuses.update(zip(untested, statuses))
+            self.tested += len(untested)
+        return [self._statuses[edits] for edits in candidates]
+
+    def reduce(self):
+        """
+        Reduces the program, and returns its sources. `edits` is then the edits which
+        reduced it (see `apply_edits`).
+        """
+        grammar = self.configuration.grammar() if self.configuration is not None else swift
+        tree = Program(self.seed, grammar=grammar).generate()
+        rules, sizes = minimal_derivations(grammar)
+        subtrees = {}
+        for node in tree.postorder(values=False):
+            subtrees[node] = 1 + sum(subtrees[child] for child in node.children or ())
+        self.original_size = subtrees[tree]
+
+        with ProcessPoolExecutor(self.processes) as self._pool:
+            if self.status is None:
+                self.status, = self.test([frozenset()])
+            if self.status in (None, "passed", "incomplete"):
+                raise ValueError(f"the program of {self.seed} doesn't fail ({self.status})")
+
+            edits = frozenset()
+            level = [((), tree)]
+            while level:
+                minimized = self._ddmin([
+                    (path, None) for path, node in level
+                    if node.children and node.value in rules and subtrees[node] > sizes[node.value]
+                ], edits)
+                edits |= minimized
+                minimized = {path for path, _ in minimized}
+
+                descendants = {}
+                for path, node in level:
+                    if path not in minimized:
+                        descendant = _descendant(path, node)
+                        if descendant is not None:
+                            descendants[path] = descendant
+                hoisted = self._ddmin([(path, target) for path, (target, _) in descendants.items()], edits)
+                edits |= hoisted
+                hoisted = dict(hoisted)
+
+                following = []
+                for path, node in level:
+                    if path in hoisted:
+                        following.append(descendants[path])
+                    elif path not in minimized:
+                        following.extend((path + (i,), child) for i, child in enumerate(node.children or ()))
+                level = following
+            self.edits = edits
+        self._pool = None
+
+        program = reduced_program(self.seed, self.edits, self.configuration)
+        self.reduced_size = size(program.parsetree)
+        with self.configuration.applied() if self.configuration is not None else nullcontext():
+            return program_sources(program, **self.options)
+
+    def _ddmin(self, changes, edits):
+        """
+        The edits of `changes` which are made, in addition to `edits`, such that the
+        program still fails, where the set of changes which aren't made is minimal.
+        """
+        def candidate(kept):
+            return edits | (set(changes) - set(kept))
+
+        if not changes or self.test([candidate([])]) == [self.status]:
+            return frozenset(changes)
+        kept = list(changes)
+        n = 2
+        while len(kept) >= 2:
+            chunks = [kept[len(kept) * i // n:len(kept) * (i + 1) // n] for i in range(n)]
+            subsets = chunks
+            if n > 2:
+                subsets = subsets + [[change for change in kept if change not in chunk] for chunk in chunks]
+            statuses = self.test([candidate(subset) for subset in subsets])
+            failing = [subset for subset, status in zip(subsets, statuses) if status == self.status]
+            if failing:
+                n = 2 if failing[0] in chunks else max(n - 1, 2)
+                kept = failing[0]
+            elif n >= len(kept):
+                break
+            else:
+                n = min(2 * n, len(kept))
+        return frozenset(changes) - set(kept)
+
+    def report(self):
+        return {
+            "seed": self.seed,
+            "status": self.status,
+            "edits": len(self.edits),
+            "original_size": getattr(self, "original_size", None),
+            "reduced_size": getattr(self, "reduced_size", None),
+            "tested": self.tested,
+            "hits": self.hits,
+        }
@@ -2,6 +2,7 @@ from swiftsmith.grammar.parsetree import Tree, ParseTree
 from swiftsmith.grammar.pcfg import PCFG
 from swiftsmith.types import AccessLevel, Binding, CallSyntax, DataType, FunctionType
 from swiftsmith.standard_library import Bool, Int, Optional
+from swiftsmith.statistics import counters
 
 from collections import namedtuple
 import random
@@ -78,6 +79,8 @@ class Scope(Tree):
         Note: throws an `IndexError` if no variables meet the criteria.
         """
         candidates = list(self.accessible_variables(name=name, datatype=datatype, mutable=mutable))
+        counters.increment("scope.choose_variable")
+        counters.observe("scope.choose_variable.candidates", len(candidates))
         return random.choice(candidates)
     
     def accessible_functions(self, name=None, returntype=None, at_least: AccessLevel=None):
@@ -112,6 +115,8 @@ class Scope(Tree):
 
     def choose_function(self, name=None, returntype=None, at_least: AccessLevel=None):
         candidates = self.accessible_functions(name=name, returntype=returntype, at_least=at_least)
+        counters.increment("scope.choose_function")
+        counters.observe("scope.choose_function.candidates", len(candidates))
         return random.choice(list(candidates.items()))
     
     def accessible_types(self, at_least: AccessLevel=None, include_self=False):
@@ -147,6 +152,8 @@ class Scope(Tree):
     def choose_type(self):
         """Returns a random Swift type that is available in this lexical scope."""
         candidates = self.accessible_types()
+        counters.increment("scope.choose_type")
+        counters.observe("scope.choose_type.candidates", len(candidates))
         return random.choice(candidates)
     
     def specialize_type(self, datatype: DataType, at_least: AccessLevel=None):
@@ -1,8 +1,64 @@
+from bisect import bisect_left
 from collections import deque
+import heapq
 
 from .grammar import ParseTree, PCFG, Nonterminal
 from .scope import Scope
 
+class Annotations(dict):
+    """
+    The annotations of a value in a semantic parse tree. Changing them invalidates the
+    rendered strings of the tree node which holds the value and of its ancestors.
+
+    A parse tree stored as an annotation (such as an expression's subtree) is owned by
+    that node, so that changes to it are propagated in the same way.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tree = None
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if isinstance(value, SemanticParseTree):
+            value._owner = self.tree
+        if self.tree is not None:
+            self.tree.invalidate()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        if self.tree is not None:
+            self.tree.invalidate()
+
+    # The other methods which change a dict don't call `__setitem__` or `__delitem__`.
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key not in self:
+            return super().pop(key, *default)
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        if self.tree is not None:
+            self.tree.invalidate()
+        return item
+
+    def clear(self):
+        super().clear()
+        if self.tree is not None:
+            self.tree.invalidate()
+
+
 class Annotatable(object):
     """
     Represents a value which may have annotations as would appear in a semantic parse
@@ -11,7 +67,7 @@ class Annotatable(object):
     required_annotations: set = set([])
 
     def __init__(self, *args, **kwargs):
-        self.annotations = {}
+        self.annotations = Annotations()
     
     def is_annotated(self) -> bool:
         return self.__class__.required_annotations.issubset(self.annotations)
@@ -46,7 +102,142 @@ class Token(Annotatable):
     `SemanticParseTree`. The string value of the token is then given by the `string`
     method, which is called by the `string` method of the `SemanticParseTree`.
     """
-    pass
+    def render_to(self, stream):
+        """Writes the string of the token to a stream."""
+        stream.write(self.string())
+
+
+class NodeIndex(object):
+    """
+    An index of the nodes of a parse tree by the class of their values, and also by
+    datatype for values which have one (such as expressions). Each list of nodes is in
+    preorder, so that choosing from it is deterministic.
+
+    Every node is given a key which orders it in the preorder traversal. When a subtree
+    is added, its nodes are given keys between those of its neighbors, so the index is
+    updated without traversing the rest of the tree.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.rebuild()
+
+    def rebuild(self):
+        self._keys = keys = {}
+        self._classes = classes = {}
+        self._datatypes = datatypes = {}
+        key = 0.0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            keys[node] = key
+            value = node.value
+            cls = type(value)
+            group = classes.get(cls)
+            if group is None:
+                group = classes[cls] = ([], [])
+            group[0].append(key)
+            group[1].append(node)
+            datatype = getattr(value, "datatype", None)
+            if datatype is not None:
+                group = datatypes.get((cls, datatype))
+                if group is None:
+                    group = datatypes[(cls, datatype)] = ([], [])
+                group[0].append(key)
+                group[1].append(node)
+            if node.children:
+                stack.extend(reversed(node.children))
+            key += 1.0
+
+    def nodes(self, cls=object, datatype=None):
+        """
+        The nodes whose values are instances of `cls`, in preorder. If `datatype` is
+        given, only values of that datatype are included.
+        """
+        if datatype is None:
+            groups = [group for c, group in self._classes.items() if issubclass(c, cls)]
+        else:
+            groups = [group for (c, d), group in self._datatypes.items()
+                      if d == datatype and issubclass(c, cls)]
+        if len(groups) == 1:
+            return list(groups[0][1])
+        merged = heapq.merge(*(zip(*group) for group in groups), key=lambda pair: pair[0])
+        return [node for _, node in merged]
+
+    def __contains__(self, value):
+        for c, (_, nodes) in self._classes.items():
+            # Values of unrelated classes are never equal.
+            if issubclass(c, type(value)) or issubclass(type(value), c):
+                if any(node.value == value for node in nodes):
+                    return True
+        return False
+
+    def add(self, subtree):
+        """Indexes a subtree which has been attached to the indexed tree."""
+        before = self._last(self._previous(subtree))
+        after = self._next(subtree)
+        low = self._keys[before]
+        high = self._keys[after] if after is not None else low + 1.0
+        nodes = list(subtree.preorder(values=False))
+        step = (high - low) / (len(nodes) + 1)
+        if not (low < low + step and low + len(nodes) * step < high):
+            # The keys between these neighbors are exhausted.
+            self.rebuild()
+            return
+        for i, node in enumerate(nodes):
+            self._insert(node, low + (i + 1) * step)
+
+    def remove(self, subtree):
+        """Removes a subtree which has been detached from the indexed tree."""
+        for node in subtree.preorder(values=False):
+            key = self._keys.pop(node)
+            for keys, nodes in self._groups(node):
+                i = bisect_left(keys, key)
+                if i == len(nodes) or nodes[i] is not node:
+                    # The node's datatype has changed since it was indexed.
+                    self.rebuild()
+                    return
+                del keys[i]
+                del nodes[i]
+
+    def _insert(self, node, key):
+        self._keys[node] = key
+        for keys, nodes in self._groups(node, create=True):
+            i = bisect_left(keys, key)
+            keys.insert(i, key)
+            nodes.insert(i, node)
+
+    def _groups(self, node, create=False):
+        cls = type(node.value)
+        datatype = getattr(node.value, "datatype", None)
+        table = [(self._classes, cls)]
+        if datatype is not None:
+            table.append((self._datatypes, (cls, datatype)))
+        for groups, key in table:
+            if create and key not in groups:
+                groups[key] = ([], [])
+            yield groups[key]
+
+    def _previous(self, node):
+        """The previous sibling of a node, or its parent if it is the first child."""
+        i = next(i for i, child in enumerate(node.parent.children) if child is node)
+        return node.parent.children[i - 1] if i > 0 else node.parent
+
+    def _last(self, node):
+        """The last node of a subtree in preorder, if it has been indexed."""
+        while node.children and node.children[-1] in self._keys:
+            node = node.children[-1]
+        return node
+
+    def _next(self, node):
+        """The first indexed node after a subtree in preorder."""
+        while node is not self.root:
+            siblings = node.parent.children
+            i = next(i for i, child in enumerate(siblings) if child is node)
+            for sibling in siblings[i + 1:]:
+                if sibling in self._keys:
+                    return sibling
+            node = node.parent
+        return None
 
 
 class SemanticParseTree(ParseTree):
@@ -55,11 +246,114 @@ class SemanticParseTree(ParseTree):
     
     Changes in traversal state may also be deferred until later using the `defer`
     method. Deferred methods are run immediately after the tree has been annotated.
+
+    The nodes of the tree can be looked up by the class and datatype of their values
+    with `index`. Changes made with `expand`, `add_child`, `insert_child`,
+    `remove_child` and `replace_children` keep the index up to date.
+
+    The string of each subtree is cached when it is rendered. The same methods, and
+    changes to annotations, invalidate the strings of the changed node and its
+    ancestors, so rendering a tree again only renders the parts that have changed.
     """
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._deferred_actions = deque()
-    
+        self._index = None
+        self._string = None
+
+        # The node whose annotations hold this tree, if this tree is an annotation.
+        self._owner = None
+        annotations = getattr(self.value, "annotations", None)
+        if isinstance(annotations, Annotations):
+            annotations.tree = self
+
+    def invalidate(self):
+        """Discards the cached strings of this node and its ancestors."""
+        node = self
+        # A node's string is only cached if its descendants' strings are, so the
+        # ancestors of a node without a cached string have none either. While a tree is
+        # copied by `copy.deepcopy`, its annotations are filled before its nodes have
+        # every attribute; those nodes have nothing cached yet.
+        while node is not None and getattr(node, "_string", None) is not None:
+            node._string = None
+            node = node.parent if node.parent is not None else node._owner
+
+    def index(self) -> NodeIndex:
+        """The index of this tree's nodes, which is built when it is first used."""
+        if self._index is None:
+            self._index = NodeIndex(self)
+        return self._index
+
+    def _indexes(self):
+        """The indexes of this tree and its ancestors, which include this tree."""
+        node = self
+        while node is not None:
+            if node._index is not None:
+                yield node._index
+            node = node.parent
+
+    def expand(self, children, propagate=True):
+        """
+        Sets the children of this tree, as `ParseTree.expand` does. The new children
+        are added to the indexes of this tree's ancestors only if `propagate`.
+        """
+        super().expand(children, propagate=propagate)
+        self.invalidate()
+        if propagate:
+            for index in self._indexes():
+                for child in self.children:
+                    index.add(child)
+
+    def add_child(self, child):
+        super().add_child(child)
+        self.invalidate()
+        for index in self._indexes():
+            index.add(self.children[-1])
+
+    def insert_child(self, i, child):
+        super().insert_child(i, child)
+        self.invalidate()
+        for index in self._indexes():
+            index.add(self.children[i])
+
+    def remove_child(self, child):
+        """Removes the given child from this tree."""
+        self.replace_children([c for c in self.children if c is not child])
+
+    def replace_children(self, children):
+        """
+        Replaces the children of this tree with the given trees (or values, as with
+        `expand`), or leaves it unexpanded if `children` is None. Children which aren't kept are detached.
+        """
+        indexes = list(self._indexes())
+        previous = self.children or []
+        if children is not None:
+            children = [c if isinstance(c, SemanticParseTree) else type(self)(c) for c in children]
+        self.children = children
+        kept = {id(child) for child in self.children or ()}
+        added = {id(child) for child in self.children or ()} - {id(child) for child in previous}
+        for child in previous:
+            if id(child) not in kept:
+                child.parent = None
+                for index in indexes:
+                    index.remove(child)
+        for child in self.children or ():
+            child.parent = self
+            if id(child) in added:
+                for index in indexes:
+                    index.add(child)
+        self.invalidate()
+
+    def __contains__(self, value):
+        return value in self.index()
+
+    def edit(self, node):
+        """
+        Returns the node to modify in order to change the given node of this tree,
+        which is the node itself. (See `Variant.edit`, which copies it instead.)
+        """
+        return node
+
     def annotate(self, scope=Scope()):
         """
         Add annotations with semantic information to nodes of this tree.
@@ -67,6 +361,11 @@ class SemanticParseTree(ParseTree):
         Performs a preorder, depth-first traversal of the tree, annotating nodes with
         any required semantic (context-dependent) information from their neighbors.
         """
+        # Annotation infers datatypes and rewrites function calls, so the index is
+        # rebuilt when it is next used.
+        self._index = None
+        self.invalidate()
+
         # TODO: check only for strings once `Nonterminals` are `Annotatable`.
         if isinstance(self.value, Annotatable):
             self.value.annotate(scope.next_scope, self)
@@ -79,13 +378,37 @@ class SemanticParseTree(ParseTree):
     
     def string(self):
         """Get the string of terminals represented by this parse tree."""
+        if self._string is not None:
+            return self._string
+
         if self.isleaf():
             if isinstance(self.value, Token):
-                return self.value.string()
-            return str(self.value)
-        
-        children = [child.string() for child in self.children]
-        return "".join(children)
+                self._string = self.value.string()
+            else:
+                self._string = str(self.value)
+        else:
+            self._string = "".join([child.string() for child in self.children])
+        return self._string
+
+    def render_to(self, stream):
+        """
+        Writes the string of terminals represented by this parse tree to a stream, in
+        a single walk of the tree. Unlike `string`, this doesn't build the strings of
+        subtrees, but it does write the strings already cached for them.
+        """
+        write = stream.write
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node._string is not None:
+                write(node._string)
+            elif node.children is None:
+                if isinstance(node.value, Token):
+                    node.value.render_to(stream)
+                else:
+                    write(str(node.value))
+            else:
+                stack.extend(reversed(node.children))
     
     def defer(self, closure):
         """
@@ -4,6 +4,7 @@ from .formatting import EOL
 from .scope import Scope
 from .semantics import Token, SemanticPCFG, SemanticParseTree, SemanticNonterminal
 from .names import identifier
+from .statistics import counters
 from .types import DataType
 from .standard_library import Int
 
@@ -66,9 +67,12 @@ class Variable(Token):
             variable = scope.choose_variable(datatype=self.datatype, mutable=True)
         except IndexError:
             # fall back to declaring a new variable
+            counters.increment("fallback.statement.variable_to_declaration")
             declaration = Declaration(self.datatype, mutable=True)
             declaration.annotate(scope, context)
             self.annotations["name"] = declaration.string()
+            self.annotations["variable"] = None
+            self.annotations["declaration"] = declaration
             return
         
         # pass the type along to the parent assignment, so that the expression on the
@@ -76,6 +80,7 @@ class Variable(Token):
         context.parent.value.datatype = variable.datatype
 
         self.annotations["name"] = variable.name
+        self.annotations["variable"] = variable
 
     def string(self):
         assert self.is_annotated()
@@ -0,0 +1,171 @@
+from .profiling import save_summary
+
+
+class Counters(object):
+    """
+    Lightweight counters of events during program generation, such as scope lookups
+    and fallbacks taken when the preferred choice is impossible.
+
+    Counting is disabled by default, in which case `increment` and `observe` return
+    immediately. A single instance, `counters`, is shared by the generator.
+    """
+
+    # Upper bounds of the histogram buckets for observed values.
+    buckets = [0] + [2**k for k in range(16)]
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        """Discards everything counted so far, e.g. before generating a new program."""
+        self.counts = {}
+        self.observations = {}
+
+    def increment(self, name: str, amount: int=1):
+        """Counts an occurrence of the named event."""
+        if self.enabled:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def observe(self, name: str, value):
+        """Records a value of the named quantity, such as the length of a list."""
+        if self.enabled:
+            if name not in self.observations:
+                self.observations[name] = Histogram(Counters.buckets)
+            self.observations[name].add(value)
+
+    def snapshot(self):
+        """Returns the current counts and histograms as JSON-compatible values."""
+        return {
+            "counts": dict(self.counts),
+            "observations": {name: h.summary() for name, h in self.observations.items()},
+        }
+
+
+counters = Counters()
+
+
+class Histogram(object):
+    """A histogram over fixed buckets, which also tracks the count, sum and extrema."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, summary):
+        """Adds the values described by another histogram's summary to this one."""
+        for i, count in enumerate(summary["histogram"]["counts"]):
+            self.counts[i] += count
+        self.count += summary["count"]
+        self.total += summary["total"]
+        for key, pick in (("min", min), ("max", max)):
+            if summary[key] is not None:
+                current = getattr(self, key)
+                setattr(self, key, summary[key] if current is None else pick(current, summary[key]))
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "histogram": {"buckets": self.buckets, "counts": self.counts},
+        }
+
+
+def tree_statistics(tree):
+    """
+    Measures a parse tree: its size, its depth, and the number of times each
+    nonterminal was expanded by a production of the grammar.
+    """
+    size = 0
+    depth = 0
+    expansions = {}
+    stack = [(tree, 1)]
+    while stack:
+        node, level = stack.pop()
+        size += 1
+        depth = max(depth, level)
+        if node.production is not None:
+            # Semantic nonterminals may override __str__, but their value is unique.
+            symbol = str.__str__(node.production.lhs)
+            expansions[symbol] = expansions.get(symbol, 0) + 1
+        if node.children:
+            stack.extend((child, level + 1) for child in node.children)
+    return {"size": size, "depth": depth, "expansions": expansions}
+
+
+class StatisticsLog(object):
+    """
+    Collects the statistics of a batch of programs, and aggregates them.
+
+    Each program's statistics combine a snapshot of `counters` with the measurements
+    of `tree_statistics`.
+    """
+
+    def __init__(self):
+        self.programs = []
+
+    def record(self, tree, seed=None):
+        """Records the statistics of a generated program and its counters."""
+        statistics = {"seed": seed}
+        statistics.update(counters.snapshot())
+        statistics["tree"] = tree_statistics(tree)
+        self.programs.append(statistics)
+        return statistics
+
+    def summary(self, programs=None):
+        """Aggregates the statistics of every recorded program, or of `programs` if given."""
+        if programs is None:
+            programs = self.programs
+        counts = {}
+        observations = {}
+        expansions = {}
+        sizes = Histogram([2**k for k in range(20)])
+        depths = Histogram([2**k for k in range(12)])
+
+        for program in programs:
+            for name, count in program["counts"].items():
+                counts[name] = counts.get(name, 0) + count
+            for name, summary in program["observations"].items():
+                if name not in observations:
+                    observations[name] = Histogram(summary["histogram"]["buckets"])
+                observations[name].merge(summary)
+            for symbol, count in program["tree"]["expansions"].items():
+                expansions[symbol] = expansions.get(symbol, 0) + count
+            sizes.add(program["tree"]["size"])
+            depths.add(program["tree"]["depth"])
+
+        return {
+            "programs": programs,
+            "batch": {
+                "programs": len(programs),
+                "counts": counts,
+                "observations": {name: h.summary() for name, h in observations.items()},
+                "expansions": expansions,
+                "size": sizes.summary(),
+                "depth": depths.summary(),
+            },
+        }
+
+    def save(self, path):
+        """
+        Writes the summary as JSON. If the file already holds a summary, the programs
+        in it are included, so that separate runs aggregate into one batch.
+        """
+        save_summary(path, self.programs, self.summary)
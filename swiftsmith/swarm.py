@@ -0,0 +1,210 @@
+from . import types
+from .grammar import PProduction
+from .semantics import SemanticPCFG
+from .swift import swift
+
+from contextlib import contextmanager
+from functools import lru_cache
+import random
+
+# The limits on the parse trees of configurations, well above those of the default
+# grammar. Reweighted grammars have heavy tails, so their expected size alone doesn't
+# keep an unlucky tree from nesting hundreds of statements deep.
+max_tree_depth = 150
+max_tree_size = 10000
+
+
+def expected_size(grammar, weights=None, limit: float=float("inf"), iterations: int=1000):
+    """
+    The expected number of nodes in a random tree of a grammar, whose productions are
+    picked with `weights` (by default, their probabilities), or infinity if it isn't
+    finite, such as when a nonterminal can't derive a finite tree, or exceeds `limit`.
+    """
+    if weights is None:
+        weights = [rule.probability for rule in grammar]
+    totals = {}
+    for rule, weight in zip(grammar, weights):
+        totals[rule.lhs] = totals.get(rule.lhs, 0.0) + weight
+
+    # The least fixed point of E(A) = 1 + the expected size of A's children, which
+    # diverges if the branching process of the grammar doesn't die out.
+    sizes = {symbol: 0.0 for symbol in totals}
+    for _ in range(iterations):
+        following = {symbol: 1.0 for symbol in totals}
+        for rule, weight in zip(grammar, weights):
+            if weight > 0:
+                following[rule.lhs] += weight / totals[rule.lhs] * sum(
+                    sizes[child] if child in sizes else 1.0 for child in rule.rhs
+                )
+        converged = all(abs(following[symbol] - sizes[symbol]) < 1e-6 for symbol in sizes)
+        sizes = following
+        if sizes[grammar.start] > limit:
+            # The sizes only grow, so it can't come back under the limit.
+            break
+        if converged:
+            return sizes[grammar.start]
+    return float("inf")
+
+
+class Configuration(object):
+    """
+    A configuration of the generator for swarm testing: the productions of `swift`
+    which are `disabled`, by index, the `weights` of the productions in place of their
+    probabilities, and the weights with which `AccessLevel.random` picks each access
+    level (see `types.access_weights`).
+
+    Programs are generated with a configuration by sampling its `grammar`, while it's
+    `applied`. Configurations are small, and can be pickled or saved as JSON with
+    `to_dict`; the grammar of each is only built once in a process.
+    """
+    def __init__(self, disabled=(), weights=None, access=None):
+        self.disabled = tuple(sorted(disabled))
+        self.weights = tuple(weights) if weights is not None else tuple(rule.probability for rule in swift)
+        self.access = tuple(access) if access is not None else tuple(types.access_weights)
+
+    def _key(self):
+        return (self.disabled, self.weights, self.access)
+
+    def __eq__(self, other):
+        return isinstance(other, Configuration) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Configuration({self.disabled!r}, {self.weights!r}, {self.access!r})"
+
+    def to_dict(self):
+        return {"disabled": list(self.disabled), "weights": list(self.weights), "access": list(self.access)}
+
+    @classmethod
+    def from_dict(cls, dictionary: dict):
+        return cls(dictionary["disabled"], dictionary["weights"], dictionary["access"])
+
+    def grammar(self):
+        """
+        The grammar of the productions which aren't disabled, with their weights, whose
+        trees are no deeper than about `max_tree_depth` and no larger than about
+        `max_tree_size`.
+        """
+        return _grammar(self.disabled, self.weights)
+
+    def expected_size(self, limit: float=float("inf")):
+        """The expected number of nodes in a parse tree generated with the configuration."""
+        disabled = set(self.disabled)
+        weights = [0.0 if i in disabled else weight for i, weight in enumerate(self.weights)]
+        return expected_size(swift, weights, limit)
+
+    @contextmanager
+    def applied(self):
+        """Picks access levels with the configuration's weights until the context exits."""
+        previous = types.access_weights
+        types.access_weights = self.access
+        try:
+            yield self
+        finally:
+            types.access_weights = previous
+
+
+@lru_cache(maxsize=256)
+def _grammar(disabled, weights):
+    # Built once per configuration in each process, with tables which are computed the
+    # first time it's sampled, so returning to a configuration costs nothing.
+    disabled = set(disabled)
+    grammar = SemanticPCFG(swift.start, [
+        PProduction(rule.lhs, rule.rhs, weight)
+        for i, (rule, weight) in enumerate(zip(swift, weights))
+        if i not in disabled
+    ])
+    grammar.max_depth = max_tree_depth
+    grammar.max_size = max_tree_size
+    return grammar
+
+
+class Swarm(object):
+    """
+    Samples configurations for swarm testing, so that each batch of programs exercises
+    a different part of the generator, rather than every program being drawn from the
+    same probabilities.
+
+    `next` returns the configuration of the next program, and samples a new one after
+    every `size` programs. In a configuration, each production of a nonterminal which
+    has several is disabled with probability `disable`, as long as every nonterminal
+    can still derive a finite tree, and the weight of each production and access level
+    is its default scaled by a random factor of up to `skew` in either direction.
+    Configurations whose programs would be more than `max_growth` times larger than
+    usual on average, or infinite, are rejected and sampled again, and the trees of
+    every configuration are bounded by `max_tree_depth` and `max_tree_size`. The
+    sequence of configurations is determined by `seed`.
+    """
+    def __init__(self, seed=None, size: int=16, disable: float=0.25, skew: float=4.0,
+                 max_growth: float=4.0):
+        assert skew >= 1, "skew must be at least 1"
+        self.random = random.Random(seed)
+        self.size = size
+        self.disable = disable
+        self.skew = skew
+        self.max_size = max_growth * expected_size(swift)
+        self.configuration = None
+        self.sampled = 0
+        self.rejected = 0
+        self._remaining = 0
+
+        self._alternatives = {}
+        for i, rule in enumerate(swift):
+            self._alternatives.setdefault(rule.lhs, []).append(i)
+
+    def next(self):
+        """The configuration with which to generate the next program."""
+        if self._remaining == 0:
+            self.configuration = self.sample()
+            self._remaining = self.size
+        self._remaining -= 1
+        return self.configuration
+
+    def sample(self):
+        """A random configuration whose programs are finite and not too large."""
+        while True:
+            configuration = self._candidate()
+            if configuration.expected_size(self.max_size) <= self.max_size:
+                self.sampled += 1
+                return configuration
+            self.rejected += 1
+
+    def _scale(self, weight):
+        return round(weight * self.skew ** self.random.uniform(-1.0, 1.0), 4)
+
+    def _candidate(self):
+        disabled = {
+            i for alternatives in self._alternatives.values() if len(alternatives) > 1
+            for i in alternatives if self.random.random() < self.disable
+        }
+        while True:
+            # Re-enables productions of the nonterminals which can't derive a finite tree.
+            stuck = set(self._alternatives) - self._finite(disabled)
+            if not stuck:
+                break
+            disabled.remove(self.random.choice(sorted(
+                i for symbol in stuck for i in self._alternatives[symbol] if i in disabled
+            )))
+        weights = [self._scale(rule.probability) for rule in swift]
+        # Scaling leaves the weight of local at 0, so it's still never picked.
+        access = [self._scale(weight) for weight in types.access_weights]
+        return Configuration(disabled, weights, access)
+
+    def _finite(self, disabled):
+        """The nonterminals which derive a finite tree without the disabled productions."""
+        finite = set()
+        changed = True
+        while changed:
+            changed = False
+            for i, rule in enumerate(swift):
+                if i in disabled or rule.lhs in finite:
+                    continue
+                if all(child in finite or child not in self._alternatives for child in rule.rhs):
+                    finite.add(rule.lhs)
+                    changed = True
+        return finite
+
+    def statistics(self):
+        return {"sampled": self.sampled, "rejected": self.rejected}
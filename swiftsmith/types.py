@@ -3,6 +3,11 @@ import copy
 import random
 from enum import Enum, IntEnum, auto
 
+# The weights with which `AccessLevel.random` picks each access level, from local to
+# public. A swarm configuration replaces them while its programs are generated.
+access_weights = (0.0, 0.3, 0.1, 0.2, 0.4)
+
+
 class AccessLevel(IntEnum):
     """Represents the possible access control levels."""
     # Hidden to all other scopes (e.g. symbol declared inside a function)
@@ -31,7 +36,7 @@ class AccessLevel(IntEnum):
         If at_most is specified, the chosen access level will be at most as broad as
         the given access level.
         """
-        candidates = zip(list(cls), [0.0, 0.3, 0.1, 0.2, 0.4])
+        candidates = zip(list(cls), access_weights)
 
         if at_least is not None:
             candidates = filter(lambda a: a[0] >= at_least, candidates)
@@ -108,6 +113,10 @@ class DataType(object):
     
     def specialize(self, **kwargs):
         """Creates a copy of this type with the given generics specialized."""
+        if not kwargs:
+            # There's nothing to specialize, and copying a type copies its methods and
+            # every type in their signatures, which may include earlier copies of it.
+            return self
         datatype = copy.deepcopy(self)
         generics = {t.name: t for t in self.generic_types.keys()}
         for gtname, ct in kwargs.items():
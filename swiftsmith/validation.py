@@ -0,0 +1,355 @@
+from .branch import branch_statement
+from .enum import Case, Enum, EnumDeclaration, Initializer
+from .expression import Expression, FunctionCall, Value
+from .expression import Variable as ExpressionVariable
+from .formatting import Block
+from .function import Function, FuncDeclaration
+from .scope import Scope
+from .semantics import SemanticParseTree
+from .standard_library import Bool, Int
+from .statement import Assignment, Declaration
+from .statement import Variable as StatementVariable
+from .types import AccessLevel, Binding, CallSyntax, EnumType, FunctionType
+
+import re
+
+
+class InvalidProgram(Exception):
+    """Raised when a program is not valid Swift, with the reason and the node at fault."""
+    def __init__(self, reason: str, node: SemanticParseTree=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.node = node
+
+
+def validate(parsetree: SemanticParseTree):
+    """Raises `InvalidProgram` for the first problem found in an annotated parse tree."""
+    problems = Validator().check(parsetree)
+    if problems:
+        raise problems[0]
+
+
+class Validator(object):
+    """
+    Checks that an annotated parse tree is a valid Swift program, without compiling it.
+
+    The validator checks that:
+    * variables are declared in an enclosing scope before they are used, and are only
+      assigned to if they are mutable;
+    * functions and enum cases are no more visible than the types in their signatures,
+      and private static methods are only called from within their type;
+    * the types of expressions agree with the variables, literals and function calls
+      that they consist of, and with the assignments, conditions and returns that use
+      them;
+    * every function ends with a return statement, and no code follows it.
+
+    The expressions of initializers which MRs add to enums are checked in the scope
+    of the enum, but code inserted into the tree as plain strings, as some MRs do, is
+    not checked.
+    """
+    def check(self, parsetree: SemanticParseTree):
+        """Returns a list of `InvalidProgram` exceptions, which is empty if it's valid."""
+        self.problems = []
+        self.filescope = Scope()
+        self.typescopes = {}
+        self.static_methods = {}
+        signatures = []
+
+        for node in parsetree.index().nodes(EnumDeclaration):
+            self._declare_enum(node)
+        for node in parsetree.index().nodes(FuncDeclaration):
+            signatures.append((node, self._declare_function(node)))
+        for node, signature in signatures:
+            if signature is not None:
+                self._function_body(node, *signature)
+        for node in parsetree.index().nodes(Initializer):
+            self._initializer(node)
+        return self.problems
+
+    def _problem(self, reason, node):
+        self.problems.append(InvalidProgram(reason, node))
+
+    ########################################
+    #   Declarations                       #
+    ########################################
+
+    def _declare_enum(self, node):
+        enum = node.childwhere(lambda n: isinstance(n.value, Enum)).value
+        datatype = enum.annotations["type"]
+        if datatype.name in self.typescopes:
+            self._problem(f"invalid redeclaration of enum {datatype.name}", node)
+        self.typescopes[datatype.name] = Scope(parent=self.filescope, datatype=datatype)
+        self.static_methods[datatype.name] = {}
+
+        access = _file_access(datatype.access)
+        cases = set()
+        for case in node.preorder(values=False):
+            if not isinstance(case.value, Case):
+                continue
+            name = case.value.annotations["name"]
+            if name in cases:
+                self._problem(f"invalid redeclaration of case {name} of {datatype.name}", case)
+            cases.add(name)
+            for associatedvalue in case.value.annotations["associatedvalues"]:
+                if self._access(associatedvalue) < access:
+                    self._problem(
+                        f"case {name} of {datatype.name} uses the less visible type "
+                        f"{associatedvalue.full_name()}",
+                        case,
+                    )
+
+    def _declare_function(self, node):
+        """Declares a function, returning its name, type and enclosing type."""
+        try:
+            function = node.childwhere(lambda n: isinstance(n.value, Function)).value
+        except StopIteration:
+            self._problem("function declaration has no signature", node)
+            return None
+        name = function.annotations["name"]
+        access = node.value.annotations["access"]
+        ftype = FunctionType(access, function.annotations["arguments"], function.annotations["returntype"])
+
+        enclosing = None
+        for ancestor in node.ancestors():
+            if isinstance(ancestor.value, EnumDeclaration):
+                enclosing = ancestor.childwhere(lambda n: isinstance(n.value, Enum)).value.annotations["type"]
+                break
+
+        if function.annotations["binding"] == Binding.static and enclosing is not None:
+            methods = self.static_methods[enclosing.name]
+            effective = min(access, _file_access(enclosing.access))
+        else:
+            methods = self.filescope.functions
+            effective = _file_access(access)
+        if name in methods:
+            self._problem(f"invalid redeclaration of function {name}", node)
+        methods[name] = ftype
+
+        for datatype in list(ftype.arguments.values()) + [ftype.returntype]:
+            if self._access(datatype) < effective:
+                self._problem(
+                    f"function {name} uses the less visible type {datatype.full_name()}",
+                    node,
+                )
+        return name, ftype, enclosing
+
+    def _access(self, datatype):
+        """The access level of a type, including the types that specialize it."""
+        access = _file_access(datatype.access)
+        for specialization in datatype.generic_types.values():
+            if specialization is not None:
+                access = min(access, self._access(specialization))
+        return access
+
+    def _initializer(self, node):
+        """Checks that an enum's initializer assigns it a value which is in its scope."""
+        declaration = next(a for a in node.ancestors() if isinstance(a.value, EnumDeclaration))
+        datatype = declaration.childwhere(lambda n: isinstance(n.value, Enum)).value.annotations["type"]
+        self.function = ("init", None, datatype)
+        scope = Scope(parent=self.typescopes[datatype.name])
+        for child in node.children:
+            if isinstance(child.value, Expression):
+                self._expression(child, scope, datatype)
+
+    ########################################
+    #   Statements                         #
+    ########################################
+
+    def _function_body(self, node, name, ftype, enclosing):
+        parent = self.filescope if enclosing is None else self.typescopes[enclosing.name]
+        scope = Scope(parent=parent)
+        for argument, datatype in ftype.arguments.items():
+            scope.declare(argument, datatype, False)
+
+        self.function = (name, ftype, enclosing)
+        returned = self._statements(node, scope)
+        if not returned:
+            self._problem(f"missing return in function {name}", node)
+
+    def _statements(self, node, scope):
+        """
+        Checks the statements in a subtree, returning whether they end with a return
+        statement. A block's statements are checked in a nested scope.
+        """
+        returned = False
+        for child in node.children or []:
+            value = child.value
+            if isinstance(value, Block):
+                # The rest of this node's children are in the block's scope.
+                scope = Scope(parent=scope)
+            elif isinstance(value, Assignment) or value == branch_statement:
+                if returned:
+                    self._problem(f"code after return in function {self.function[0]}", child)
+                if isinstance(value, Assignment):
+                    self._assignment(child, scope)
+                else:
+                    self._statements(child, scope)
+            elif value == "return " and child.isleaf():
+                if returned:
+                    self._problem(f"code after return in function {self.function[0]}", child)
+                returned = True
+            elif isinstance(value, Expression) and child.isleaf():
+                expected = self.function[1].returntype if returned else None
+                self._expression(child, scope, expected)
+            elif child.children and not isinstance(value, (FuncDeclaration, EnumDeclaration)):
+                if self._statements(child, scope):
+                    returned = True
+        return returned
+
+    def _assignment(self, node, scope):
+        if node.children and len(node.children) == 1:
+            # A declaration alone as an assignment statement.
+            return self._assignment(node.children[0], scope)
+        target = next((c for c in node.children
+                       if isinstance(c.value, (Declaration, StatementVariable))), None)
+        expression = next((c for c in node.children if isinstance(c.value, Expression)), None)
+        if target is None or expression is None:
+            self._problem("malformed assignment", node)
+            return
+
+        variable = target.value
+        if isinstance(variable, StatementVariable) and variable.annotations.get("variable") is None:
+            declaration = variable.annotations.get("declaration")
+            if declaration is None:
+                self._problem("assignment to an unknown variable", target)
+                return
+            variable = declaration
+
+        if isinstance(variable, Declaration):
+            datatype = variable.annotations["datatype"]
+            # A variable isn't in scope in its own initial value.
+            self._expression(expression, scope, datatype)
+            name = variable.annotations["name"]
+            if any(v.name == name for v in scope.variables):
+                self._problem(f"invalid redeclaration of {name}", target)
+            scope.declare(name, datatype, variable.mutable)
+        else:
+            name = variable.annotations["name"]
+            matches = scope.accessible_variables(name=name)
+            if len(matches) == 0:
+                self._problem(f"assignment to undeclared variable {name}", target)
+                return
+            if not matches[0].mutable:
+                self._problem(f"assignment to constant {name}", target)
+            self._expression(expression, scope, matches[0].datatype)
+
+    ########################################
+    #   Expressions                        #
+    ########################################
+
+    def _expression(self, node, scope, expected):
+        """Checks an expression leaf, which should have the expected type if given."""
+        expression = node.value
+        datatype = expression.annotations.get("datatype")
+        subtree = expression.annotations.get("subtree")
+        if datatype is None or subtree is None:
+            self._problem("unannotated expression", node)
+            return
+        if expected is not None and datatype != expected:
+            self._problem(
+                f"expression of type {datatype.full_name()} used as {expected.full_name()}",
+                node,
+            )
+        if node.parent is not None and node.parent.value == "CONDITION" and datatype != Bool:
+            self._problem(f"condition of type {datatype.full_name()}", node)
+        self._subexpression(subtree, scope, datatype)
+
+    def _subexpression(self, tree, scope, datatype):
+        value = tree.value
+        if isinstance(value, Expression) and tree.children is not None:
+            # An expression rewritten by an MR, such as `(e) + 0`.
+            for child in tree.children:
+                if type(child.value) is not str:
+                    self._subexpression(child, scope, datatype)
+        elif isinstance(value, ExpressionVariable):
+            if value.datatype != datatype:
+                self._problem(
+                    f"{value.datatype.full_name()} variable used as {datatype.full_name()}",
+                    tree,
+                )
+            variable = value.annotations.get("variable")
+            if variable is None:
+                self._literal(tree, value.annotations["value"], datatype)
+                return
+            matches = scope.accessible_variables(name=variable.name)
+            if len(matches) == 0:
+                self._problem(f"use of undeclared variable {variable.name}", tree)
+            elif matches[0].datatype != datatype:
+                self._problem(
+                    f"variable {variable.name} of type {matches[0].datatype.full_name()} "
+                    f"used as {datatype.full_name()}",
+                    tree,
+                )
+        elif isinstance(value, Value):
+            self._literal(tree, value.annotations["value"], datatype)
+        elif isinstance(value, FunctionCall):
+            self._call(tree, scope, datatype)
+        elif type(value) is not str:
+            self._problem(f"unexpected {value} in expression", tree)
+
+    def _call(self, tree, scope, datatype):
+        call = tree.value
+        ftype = self._resolve(call, tree)
+        if ftype is None:
+            return
+        if ftype.returntype != datatype:
+            self._problem(
+                f"{call.name} returns {ftype.returntype.full_name()}, not {datatype.full_name()}",
+                tree,
+            )
+        arguments = [c for c in tree.children or [] if isinstance(c.value, ExpressionVariable)]
+        if len(arguments) != len(ftype.arguments):
+            self._problem(
+                f"{call.name} takes {len(ftype.arguments)} arguments, not {len(arguments)}",
+                tree,
+            )
+        for argument, argtype in zip(arguments, ftype.arguments.values()):
+            self._subexpression(argument, scope, argtype)
+
+    def _resolve(self, call, tree):
+        """Finds the declaration of a called function, checking that it's visible."""
+        name = call.name
+        if call.functiontype.syntax != CallSyntax.normal:
+            for datatype in (Bool, Int):
+                if name in datatype.static_methods:
+                    return datatype.static_methods[name]
+        elif "." in name:
+            typename, method = name.split(".", 1)
+            methods = self.static_methods.get(typename, {})
+            if method in methods:
+                enclosing = self.function[2]
+                inside = enclosing is not None and enclosing.name == typename
+                if methods[method].access <= AccessLevel.private and not inside:
+                    self._problem(f"{name} is private to {typename}", tree)
+                return methods[method]
+        elif name in self.filescope.functions:
+            return self.filescope.functions[name]
+        self._problem(f"call to undeclared function {name}", tree)
+        return None
+
+    def _literal(self, tree, text, datatype):
+        if datatype == Int:
+            valid = re.fullmatch(r"-?[0-9]+", text) is not None
+        elif datatype == Bool:
+            valid = text in ("true", "false")
+        elif isinstance(datatype, EnumType):
+            # An enum case, such as `.a` or `E.b(1)`, if its type can be inferred.
+            for prefix in (datatype.full_name() + ".", "."):
+                if text.startswith(prefix):
+                    match = re.match(r"([A-Za-z_][A-Za-z0-9_]*)(\(.*\))?$", text[len(prefix):])
+                    break
+            else:
+                match = None
+            valid = match is not None \
+                and match.group(1) in datatype.cases \
+                and (match.group(2) is not None) == \
+                    (len(datatype.cases[match.group(1)].associatedvalues) > 0)
+        else:
+            valid = True
+        if not valid:
+            self._problem(f"{text} is not a value of type {datatype.full_name()}", tree)
+
+
+def _file_access(access):
+    """Private declarations at file scope are visible throughout the file."""
+    return max(access, AccessLevel.fileprivate)
@@ -0,0 +1,106 @@
+from .semantics import Annotatable, Annotations, SemanticParseTree
+
+from collections import deque
+import copy
+import random
+
+
+class Variant(object):
+    """
+    A version of an annotated parse tree which has been transformed by metamorphic
+    relations, without modifying the original (base) tree.
+
+    A variant is edited by path copying: `edit` copies a node of the base tree along
+    with its ancestors, and the copies share every other subtree with the base. A
+    variant can therefore be passed to an MR in place of the tree itself, and many
+    variants of one program cost little more memory than the program.
+
+    `index` is the index of the base tree, so nodes added to the variant by MRs are
+    not included in it.
+    """
+    def __init__(self, base: SemanticParseTree):
+        self.base = base
+        self.root = base
+        self.relations = []
+        self.edits = 0
+        self._copies = {}
+
+    def index(self):
+        return self.base.index()
+
+    def edit(self, node: SemanticParseTree) -> SemanticParseTree:
+        """
+        Returns this variant's copy of a node of the base tree, which may be modified.
+        The node and its ancestors are copied the first time that it is edited.
+        """
+        self.edits += 1
+        path = []
+        while node is not None and node not in self._copies:
+            path.append(node)
+            node = node.parent
+
+        parent = self._copies.get(node)
+        for original in reversed(path):
+            duplicate = _copy_node(original)
+            self._copies[original] = duplicate
+            self._copies[duplicate] = duplicate
+            if parent is None:
+                self.root = duplicate
+            else:
+                i = next(i for i, c in enumerate(parent.children) if c is original)
+                parent.children[i] = duplicate
+                duplicate.parent = parent
+            parent = duplicate
+        return parent
+
+    def apply(self, mr):
+        """
+        Applies a metamorphic relation to this variant, returning whether the MR
+        changed it. (MRs which are not applicable to a program leave it unchanged.)
+        """
+        edits = self.edits
+        mr(self)
+        if self.edits == edits:
+            return False
+        self.relations.append(mr)
+        return True
+
+    def string(self):
+        return self.root.string()
+
+    def render_to(self, stream):
+        self.root.render_to(stream)
+
+
+def _copy_node(node):
+    """A copy of a node which shares its children, and has its own annotations."""
+    duplicate = copy.copy(node)
+    duplicate.parent = None
+    duplicate._index = None
+    duplicate._deferred_actions = deque()
+    if node.children is not None:
+        duplicate.children = list(node.children)
+    if isinstance(node.value, Annotatable):
+        duplicate.value = copy.copy(node.value)
+        duplicate.value.annotations = Annotations(node.value.annotations)
+        duplicate.value.annotations.tree = duplicate
+    return duplicate
+
+
+def variants(base: SemanticParseTree, mrs, count: int, compose: bool=True):
+    """
+    Generates `count` variants of an annotated parse tree.
+
+    If `compose`, each variant applies a random nonempty sequence of distinct MRs from
+    `mrs`; otherwise each applies one MR, chosen at random. Variants which no MR
+    could change are included, so that the variants correspond to their numbers.
+    """
+    for _ in range(count):
+        if compose:
+            relations = random.sample(mrs, random.randint(1, len(mrs)))
+        else:
+            relations = [random.choice(mrs)]
+        variant = Variant(base)
+        for mr in relations:
+            variant.apply(mr)
+        yield variant
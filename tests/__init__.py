@@ -0,0 +1,8 @@
+from swiftsmith.program import Program
+
+def annotated(seed):
+    """The program generated from a seed, annotated."""
+    program = Program(seed)
+    program.generate()
+    program.annotate()
+    return program
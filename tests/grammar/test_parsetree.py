@@ -1,3 +1,4 @@
+import io
 import unittest
 from swiftsmith.grammar.cfg import Nonterminal
 from swiftsmith.grammar.parsetree import ParseTree
@@ -58,6 +59,12 @@ class ParseTreeTest(unittest.TestCase):
         self.assertEqual(self.t2.parent, self.t4)
         self.assertEqual(self.t3.parent, self.t4)
     
+    def test_insert_child(self):
+        a = ParseTree(1, [ParseTree(2), ParseTree(4)])
+        a.insert_child(1, 3)
+        self.assertEqual(list(a.preorder()), [1, 2, 3, 4])
+        self.assertIs(a.children[1].parent, a)
+
     def test_ancestors(self):
         self.assertSequenceEqual(list(self.t2.ancestors()), [self.t4, self.t])
 
@@ -87,10 +94,22 @@ class ParseTreeTest(unittest.TestCase):
         tree.expand(())
         self.assertEqual(frontier_values(tree), [])
 
+    def test_expand_without_propagation_leaves_ancestors(self):
+        tree = ParseTree(self.A)
+        tree.expand([self.B, self.B])
+        tree.frontier[1].expand([self.A, self.A], propagate=False)
+        self.assertEqual(frontier_values(tree), [self.B, self.B])
+        self.assertEqual(frontier_values(tree.children[1]), [self.A, self.A])
+
     def test_string_traverses_tree(self):
         tree = ParseTree(self.A, ["Hello ", "world!"])
         self.assertEqual(tree.string(), "Hello world!")
 
+    def test_render_to_writes_string(self):
+        stream = io.StringIO()
+        self.t.render_to(stream)
+        self.assertEqual(stream.getvalue(), self.t.string())
+
     def test_string_excludes_childless_nonterminals(self):
         tree = ParseTree(self.A, [])
         self.assertEqual(tree.string(), "")
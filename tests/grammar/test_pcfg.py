@@ -0,0 +1,48 @@
+import unittest
+from swiftsmith.grammar.cfg import Nonterminal
+from swiftsmith.grammar.pcfg import PProduction, PCFG
+
+class PCFGTest(unittest.TestCase):
+    def setUp(self):
+        self.S = Nonterminal("S")
+        self.A = Nonterminal("A")
+        self.grammar = PCFG(self.S, [
+            PProduction(self.S, (self.A, "x", self.A), 1.0),
+            PProduction(self.A, ("a",), 0.5),
+            PProduction(self.A, ("b", self.A), 0.5),
+        ])
+
+    def test_randomtree_is_fully_expanded(self):
+        tree = self.grammar.randomtree()
+        for node in tree.preorder(values=False):
+            self.assertFalse(node.isunexpanded())
+            self.assertEqual(node.frontier, [])
+
+    def test_randomtree_uses_weights(self):
+        tree = self.grammar.randomtree(weights=lambda parent, rules: [
+            0.0 if rule.rhs[0] == "b" else 1.0 for rule in rules
+        ])
+        self.assertEqual(tree.string(), "axa")
+
+    def test_tables_are_computed_once(self):
+        productions, table = self.grammar.tables()
+        self.assertEqual(table[self.A], [0.5, 0.5])
+        self.assertEqual([rule.rhs for rule in productions[self.S]], [(self.A, "x", self.A)])
+        self.grammar.randomtree()
+        self.assertIs(self.grammar.tables()[0], productions)
+
+    def test_randomtree_builds_deep_trees(self):
+        symbols = [Nonterminal(f"N{i}") for i in range(3000)]
+        grammar = PCFG(symbols[0], [
+            PProduction(symbols[i], ("a", symbols[i + 1]), 1.0) for i in range(2999)
+        ] + [PProduction(symbols[-1], (), 1.0)])
+        tree = grammar.randomtree()
+        self.assertEqual(len(tree.frontier), 0)
+
+    def test_randomtree_is_bounded(self):
+        nesting = lambda parent, rules: [0.0 if rule.rhs == ("a",) else 1.0 for rule in rules]
+        self.grammar.max_depth = 5
+        self.assertEqual(self.grammar.randomtree(weights=nesting).string(), "bbbbaxbbbba")
+        self.grammar.max_depth = None
+        self.grammar.max_size = 10
+        self.assertLessEqual(len(self.grammar.randomtree(weights=nesting).string()), 9)
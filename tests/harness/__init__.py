@@ -0,0 +1,11 @@
+from swiftsmith.harness.runner import Toolchain
+
+import os
+import sys
+
+# Steps run in the job's directory, so the path of the stub compiler is absolute.
+STUB = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "scripts", "swiftc_stub.py"))
+
+def stub(*options, timeouts=None):
+    """A toolchain whose compiler is `scripts/swiftc_stub.py`, run with the given options."""
+    return Toolchain(swiftc=[sys.executable, STUB] + list(options), timeouts=timeouts)
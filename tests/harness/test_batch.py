@@ -0,0 +1,111 @@
+from swiftsmith.harness.batch import (
+    BatchJob, batches, bisect, find_culprits, generate_batch, locate_failure,
+)
+from swiftsmith.harness.runner import StepResult, run_job, write_sources
+from swiftsmith.harness.scheduler import Scheduler
+from swiftsmith.names import identifier
+from tests.harness import stub
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+SEEDS = ["AAE=", "AAI=", "AAM=", "ABC="]
+
+class BatchTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+        identifier.reset()
+
+    def job(self, seeds=SEEDS):
+        job = BatchJob(seeds, self.directory.name)
+        job.batch = generate_batch(seeds)
+        write_sources(job, job.batch.sources, 0.0)
+        return job
+
+    def test_batches(self):
+        self.assertEqual(list(batches("abcde", 2)), [("a", "b"), ("c", "d"), ("e",)])
+        self.assertEqual(list(batches([], 2)), [])
+
+    def test_namespaces(self):
+        batch = generate_batch(SEEDS[:2])
+        self.assertEqual(sorted(batch.sources), ["BatchA.swift", "BatchB.swift", "test.swift"])
+        module = batch.sources["BatchA.swift"]
+        self.assertIn("public enum P0 {", module)
+        self.assertIn("public enum P1 {", module)
+        for line in module.split("\n"):
+            if "func " in line and not line.startswith("\t\t"):
+                self.assertIn("static func ", line)
+            self.assertFalse(line.startswith("\tprivate "))
+        tests = batch.sources["test.swift"]
+        self.assertIn("import BatchA\n", tests)
+        self.assertIn("import BatchB\n", tests)
+        self.assertIn("BatchA.P1.", tests)
+        self.assertNotIn("ModuleA.", tests)
+
+    def test_locate(self):
+        batch = generate_batch(SEEDS[:2])
+        lines = batch.sources["BatchA.swift"].split("\n")
+        first = lines.index("public enum P0 {") + 1
+        second = lines.index("public enum P1 {") + 1
+        self.assertEqual(batch.locate("BatchA.swift", first), "AAE=")
+        self.assertEqual(batch.locate("/some/path/BatchA.swift", second), "AAI=")
+        self.assertIsNone(batch.locate("BatchA.swift", 1))
+        self.assertIsNone(batch.locate("Other.swift", first))
+
+    def test_subset(self):
+        batch = generate_batch(SEEDS)
+        subset = batch.subset(["AAI=", "ABC="])
+        self.assertEqual(subset.seeds, ["AAI=", "ABC="])
+        self.assertIn("public enum P1 {", subset.sources["BatchA.swift"])
+        self.assertIn("public enum P3 {", subset.sources["BatchA.swift"])
+        self.assertNotIn("public enum P0 {", subset.sources["BatchA.swift"])
+        self.assertNotIn("BatchA.P0.", subset.sources["test.swift"])
+
+    def test_passes(self):
+        job = self.job()
+        asyncio.run(run_job(job, stub()))
+        self.assertEqual(job.status(), "passed")
+
+    def test_locate_failure(self):
+        job = self.job()
+        line = job.batch.sources["BatchB.swift"].split("\n").index("public enum P2 {") + 2
+        job.steps.append(StepResult(
+            "compile", [], 1, "", f"/tmp/x/BatchB.swift:{line}:5: error: oops\n", 0.0, False,
+        ))
+        self.assertEqual(locate_failure(job), ["AAM="])
+
+    def test_bisect(self):
+        toolchain = stub("--stub-fail", "compile", "--stub-fail-if", "seed AAM=")
+        job = self.job()
+        asyncio.run(run_job(job, toolchain))
+        self.assertEqual(job.status(), "compile failed")
+        self.assertEqual(asyncio.run(bisect(job, toolchain)), ["AAM="])
+        self.assertFalse(os.path.exists(os.path.join(job.directory, "bisect")))
+
+    def test_find_culprits(self):
+        toolchain = stub("--stub-fail", "run", "--stub-fail-if", "BatchA.P1.")
+        job = self.job()
+        asyncio.run(run_job(job, toolchain))
+        self.assertEqual(job.status(), "run failed")
+        self.assertEqual(asyncio.run(find_culprits(job, toolchain)), ["AAI="])
+        self.assertEqual(job.culprits, ["AAI="])
+
+    def test_scheduler(self):
+        results = []
+        scheduler = Scheduler(
+            stub("--stub-fail", "compile", "--stub-fail-if", "seed ABC="),
+            workers=2,
+            directory=self.directory.name,
+            on_result=results.append,
+            batch_size=3,
+        )
+        report = asyncio.run(scheduler.run(SEEDS + ["Zm9v"], count=5))
+        self.assertEqual(report["jobs"], 2)
+        self.assertEqual(sorted(job.seeds for job in results), [SEEDS[:3], [SEEDS[3], "Zm9v"]])
+        failed = [job for job in results if not job.passed]
+        self.assertEqual([job.culprits for job in failed], [["ABC="]])
@@ -0,0 +1,85 @@
+from swiftsmith.harness.cache import CompileCache, artifacts
+from swiftsmith.harness.runner import Job, run_job
+from swiftsmith.metamorphic import unnecessary_addition
+from swiftsmith.names import identifier
+from tests.harness import stub
+
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+def write(directory, files):
+    for filename, text in files.items():
+        with open(os.path.join(directory, filename), "w") as f:
+            f.write(text)
+
+class CompileCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = os.path.join(self.directory.name, "cache")
+        self.work = os.path.join(self.directory.name, "work")
+        os.makedirs(self.work)
+
+    def tearDown(self):
+        self.directory.cleanup()
+        identifier.reset()
+
+    def test_key(self):
+        key = CompileCache.key("source", "M", "5.3", ["swiftc", "-O"])
+        self.assertEqual(key, CompileCache.key("source", "M", "5.3", ["swiftc", "-O"]))
+        self.assertNotEqual(key, CompileCache.key("source!", "M", "5.3", ["swiftc", "-O"]))
+        self.assertNotEqual(key, CompileCache.key("source", "N", "5.3", ["swiftc", "-O"]))
+        self.assertNotEqual(key, CompileCache.key("source", "M", "5.4", ["swiftc", "-O"]))
+        self.assertNotEqual(key, CompileCache.key("source", "M", "5.3", ["swiftc"]))
+
+    def test_artifacts(self):
+        write(self.work, {"M.swift": "", "M.swiftmodule": "", "libM.so": "", "libMB.so": "", "test": ""})
+        self.assertEqual(sorted(artifacts(self.work, "M")), ["M.swiftmodule", "libM.so"])
+
+    def test_store_and_fetch(self):
+        cache = CompileCache(self.cache)
+        write(self.work, {"libM.so": "library", "M.swiftmodule": "module"})
+        cache.store("ab12", self.work, ["libM.so", "M.swiftmodule"])
+
+        destination = os.path.join(self.directory.name, "destination")
+        os.makedirs(destination)
+        self.assertFalse(cache.fetch("cd34", destination))
+        self.assertTrue(cache.fetch("ab12", destination))
+        with open(os.path.join(destination, "libM.so")) as f:
+            self.assertEqual(f.read(), "library")
+        self.assertEqual(cache.statistics()["hits"], 1)
+        self.assertEqual(cache.statistics()["misses"], 1)
+
+        # Entries persist between runs.
+        self.assertTrue(CompileCache(self.cache).fetch("ab12", destination))
+
+    def test_evicts_least_recently_used(self):
+        cache = CompileCache(self.cache, max_bytes=25)
+        for key in ["aa", "bb", "cc"]:
+            write(self.work, {"libM.so": "x" * 10})
+            cache.store(key, self.work, ["libM.so"])
+            time.sleep(0.01)
+            if key == "bb":
+                cache.fetch("aa", self.work)
+                time.sleep(0.01)
+        self.assertEqual(cache.evictions, 1)
+        self.assertLessEqual(cache.size, 25)
+        self.assertTrue(cache.fetch("aa", self.work))
+        self.assertFalse(cache.fetch("bb", self.work))
+        self.assertTrue(cache.fetch("cc", self.work))
+
+    def test_compile_hits(self):
+        toolchain = stub()
+        cache = CompileCache(self.cache)
+        first = Job("Zm9v", os.path.join(self.directory.name, "first"), unnecessary_addition)
+        asyncio.run(run_job(first, toolchain, cache=cache))
+        second = Job("Zm9v", os.path.join(self.directory.name, "second"), unnecessary_addition)
+        asyncio.run(run_job(second, toolchain, cache=cache))
+
+        self.assertTrue(second.passed)
+        compiles = [step for step in second.steps if step.name == "compile"]
+        self.assertEqual([step.cached for step in compiles], [True, True])
+        self.assertTrue(os.path.exists(os.path.join(second.directory, "libModuleA.so")))
+        self.assertEqual(cache.statistics()["entries"], 2)
@@ -0,0 +1,106 @@
+from swiftsmith.harness.campaign import Campaign, campaign_seed
+from swiftsmith.harness.results import ResultStore
+from swiftsmith.harness.runner import Job, StepResult
+
+import base64
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+
+
+class CampaignTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "campaign.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_campaign_seed(self):
+        self.assertEqual(campaign_seed("x", 3), campaign_seed("x", 3))
+        self.assertNotEqual(campaign_seed("x", 3), campaign_seed("x", 4))
+        self.assertNotEqual(campaign_seed("x", 3), campaign_seed("y", 3))
+        self.assertEqual(len(base64.b64decode(campaign_seed("x", 3))), 32)
+
+    def test_reproducible(self):
+        first = list(itertools.islice(Campaign(self.path, "x").seeds(), 5))
+        second = list(itertools.islice(Campaign(self.path, "x").seeds(), 5))
+        self.assertEqual(first, second)
+        self.assertEqual(first, [campaign_seed("x", i) for i in range(5)])
+
+    def test_random_seed(self):
+        self.assertNotEqual(Campaign(self.path).seed, Campaign(self.path).seed)
+
+    def test_completed_ranges(self):
+        campaign = Campaign(self.path, "x")
+        seeds = list(itertools.islice(campaign.seeds(), 8))
+        for i in [0, 1, 5, 3, 2, 7]:
+            campaign.complete(seeds[i])
+        self.assertEqual(campaign.completed, [(0, 4), (5, 6), (7, 8)])
+        self.assertEqual(campaign.in_flight, {4, 6})
+        self.assertEqual(campaign.pending(), [(4, 5), (6, 7)])
+        campaign.complete(seeds[6])
+        campaign.complete(seeds[6])
+        self.assertEqual(campaign.completed, [(0, 4), (5, 8)])
+
+    def test_resume(self):
+        campaign = Campaign(self.path, "x")
+        seeds = campaign.seeds()
+        handed_out = list(itertools.islice(seeds, 6))
+        for seed in handed_out[:2] + handed_out[3:5]:
+            campaign.complete(seed)
+        campaign.save()
+        with open(self.path) as f:
+            state = json.load(f)
+        self.assertEqual(state["cursor"], 6)
+        self.assertEqual(state["completed"], [[0, 2], [3, 5]])
+        self.assertEqual(state["in_flight"], [2, 5])
+        self.assertEqual(state["pending"], [[2, 3], [5, 6]])
+
+        resumed = Campaign(self.path)
+        self.assertEqual(resumed.seed, "x")
+        again = list(itertools.islice(resumed.seeds(), 4))
+        self.assertEqual(again, [handed_out[2], handed_out[5], campaign_seed("x", 6), campaign_seed("x", 7)])
+        self.assertEqual(resumed.progress(), {
+            "seed": "x", "cursor": 8, "completed": 4, "in_flight": 4, "pending": 0,
+        })
+
+    def test_resume_idempotent(self):
+        campaign = Campaign(self.path, "x")
+        list(itertools.islice(campaign.seeds(), 3))
+        campaign.save()
+        for _ in range(2):
+            resumed = Campaign(self.path)
+            self.assertEqual(list(itertools.islice(resumed.seeds(), 3)),
+                             [campaign_seed("x", i) for i in range(3)])
+            resumed.save()
+        self.assertEqual(Campaign(self.path).cursor, 3)
+
+    def test_saves_periodically(self):
+        campaign = Campaign(self.path, "x", interval=0)
+        campaign.complete(next(campaign.seeds()))
+        self.assertEqual(Campaign(self.path).completed, [(0, 1)])
+
+    def test_other_campaign(self):
+        Campaign(self.path, "x").save()
+        with self.assertRaises(ValueError):
+            Campaign(self.path, "y")
+
+    def test_results_are_written_before_saving(self):
+        store = ResultStore(os.path.join(self.directory.name, "results.db"), interval=3600.0)
+        campaign = Campaign(self.path, "x", interval=0.0, results=store)
+        seed = next(campaign.seeds())
+        job = Job(seed, "unused")
+        job.steps.append(StepResult("generate", [], 0, "", "", 0.5, False))
+        store.add(job)
+        # Completing the seed saves the campaign, since it's always due.
+        campaign.complete(seed)
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)["completed"], [[0, 1]])
+        connection = sqlite3.connect(store.path)
+        self.assertEqual(connection.execute("SELECT seed FROM results").fetchall(), [(seed,)])
+        connection.close()
+        store.close()
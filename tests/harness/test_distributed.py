@@ -0,0 +1,197 @@
+from swiftsmith.harness.campaign import Campaign, campaign_seed
+from swiftsmith.harness.distributed import Coordinator, RemoteSeeds
+from swiftsmith.harness.results import ResultStore
+from swiftsmith.harness.scheduler import Scheduler
+from swiftsmith.metamorphic import unnecessary_addition
+from swiftsmith.names import identifier
+from tests.harness import stub
+
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def result(*seeds):
+    return {
+        "seed": " ".join(seeds), "seeds": list(seeds), "version": "v", "mr": None,
+        "fingerprint": None, "status": "passed", "culprits": None, "finished": 0.0,
+        "steps": [],
+    }
+
+
+class CoordinatorTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.clock = Clock()
+        self.store = ResultStore(os.path.join(self.directory.name, "results.db"), batch_size=1)
+        self.coordinator = Coordinator(
+            Campaign(os.path.join(self.directory.name, "campaign.json"), "x"),
+            self.store,
+            lease_size=3,
+            lease_duration=10.0,
+            count=7,
+            clock=self.clock,
+        )
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def seeds(self, *positions):
+        return [campaign_seed("x", i) for i in positions]
+
+    def test_leases(self):
+        first = self.coordinator.lease("a")
+        second = self.coordinator.lease("b")
+        self.assertEqual(first["seeds"], self.seeds(0, 1, 2))
+        self.assertEqual(second["seeds"], self.seeds(3, 4, 5))
+        self.assertNotEqual(first["id"], second["id"])
+        self.assertEqual(self.coordinator.lease("a")["seeds"], self.seeds(6))
+
+        # Every seed is leased, but leases may expire.
+        waiting = self.coordinator.lease("c")
+        self.assertEqual(waiting["seeds"], [])
+        self.assertEqual(waiting["wait"], 5.0)
+        self.clock.now = 8.0
+        self.assertEqual(self.coordinator.lease("c")["wait"], 2.0)
+
+        self.assertEqual(self.coordinator.report("a", [result(s) for s in self.seeds(0, 1, 2, 6)]), 4)
+        self.assertEqual(self.coordinator.report("b", [result(*self.seeds(3, 4, 5))]), 1)
+        self.assertEqual(self.coordinator.lease("c"), {"done": True})
+        self.assertEqual(self.store.throughput()["jobs"], 5)
+        self.assertEqual(self.coordinator.campaign.completed, [(0, 7)])
+
+    def test_campaign_is_saved_after_results(self):
+        path = os.path.join(self.directory.name, "flushed.json")
+        store = ResultStore(os.path.join(self.directory.name, "flushed.db"), interval=3600.0)
+        # The campaign would save itself on every completion.
+        coordinator = Coordinator(Campaign(path, "x", interval=0.0), store, lease_size=2,
+                                  interval=30.0, clock=self.clock)
+        first, second = coordinator.lease("a")["seeds"]
+        coordinator.report("a", [result(first)])
+        self.assertFalse(os.path.exists(path))
+        self.clock.now = 30.0
+        coordinator.report("a", [result(second)])
+        with open(path) as f:
+            self.assertEqual(json.load(f)["completed"], [[0, 2]])
+        connection = sqlite3.connect(store.path)
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM results").fetchone(), (2,))
+        connection.close()
+        store.close()
+
+    def test_expired_leases_are_reassigned(self):
+        self.coordinator.lease("a")
+        self.coordinator.lease("b")
+        self.clock.now = 5.0
+        self.coordinator.report("b", [result(self.seeds(3)[0])])
+        self.clock.now = 12.0
+        # a's lease expired; b's was renewed when it reported.
+        self.assertEqual(self.coordinator.lease("c")["seeds"], self.seeds(0, 1, 2))
+        self.assertEqual(self.coordinator.status()["expired"], 1)
+
+        # a reports late: its results are added once, and not again by c.
+        self.assertEqual(self.coordinator.report("a", [result(self.seeds(0)[0])]), 1)
+        self.assertEqual(self.coordinator.report("c", [result(s) for s in self.seeds(0, 1)]), 1)
+        self.assertEqual(self.coordinator.status()["duplicates"], 1)
+
+    def test_release(self):
+        self.coordinator.lease("a")
+        self.coordinator.report("a", [result(self.seeds(0)[0])])
+        self.coordinator.release("a", self.seeds(1, 2))
+        self.assertEqual(self.coordinator.lease("b")["seeds"], self.seeds(1, 2, 3))
+        self.assertEqual(self.coordinator.status()["leases"], 1)
+
+
+class DistributedTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = ResultStore(os.path.join(self.directory.name, "results.db"))
+        self.coordinator = Coordinator(
+            Campaign(os.path.join(self.directory.name, "campaign.json"), "x"),
+            self.store,
+            lease_size=2,
+            lease_duration=5.0,
+            count=9,
+            poll=0.1,
+        )
+        self.server = self.coordinator.serve("localhost", 0)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = f"http://localhost:{self.server.server_port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.store.close()
+        self.directory.cleanup()
+        identifier.reset()
+
+    async def work(self, name):
+        remote = RemoteSeeds(self.url, name, batch_size=2, interval=0.5)
+        scheduler = Scheduler(
+            stub(),
+            workers=2,
+            directory=os.path.join(self.directory.name, name),
+            on_result=remote.add,
+            job_options={"mr": unnecessary_addition},
+            generators=1,
+        )
+        while not remote.done:
+            await scheduler.run(remote.seeds())
+            await remote.flush()
+            await remote.release()
+            await asyncio.sleep(remote.wait)
+        await remote.close()
+        self.assertEqual(remote.errors, 0)
+        return scheduler.report()["jobs"]
+
+    def test_workers(self):
+        async def main():
+            return await asyncio.gather(self.work("a"), self.work("b"))
+
+        jobs = asyncio.run(main())
+        self.assertEqual(sum(jobs), 9)
+        self.store.flush()
+        seeds = [row[0] for row in self.store.connection.execute("SELECT seed FROM results")]
+        self.assertEqual(sorted(seeds), sorted(campaign_seed("x", i) for i in range(9)))
+        status = self.coordinator.status()
+        self.assertEqual(status["campaign"]["completed"], 9)
+        self.assertEqual(status["duplicates"], 0)
+
+    def test_unreachable(self):
+        async def main():
+            remote = RemoteSeeds("http://localhost:1", "a", interval=0.5, timeout=1.0)
+            seeds = [seed async for seed in remote.seeds()]
+            return remote, seeds
+
+        remote, seeds = asyncio.run(main())
+        self.assertEqual(seeds, [])
+        self.assertFalse(remote.done)
+        self.assertEqual(remote.wait, 0.5)
+        self.assertEqual(remote.errors, 1)
+
+    def test_release(self):
+        async def main():
+            remote = RemoteSeeds(self.url, "a")
+            seeds = remote.seeds()
+            taken = [await seeds.__anext__() for _ in range(3)]
+            await remote.close()
+            return taken
+
+        taken = asyncio.run(main())
+        self.assertEqual(taken, [campaign_seed("x", i) for i in range(3)])
+        self.assertEqual(self.coordinator.status()["leases"], 0)
+        self.assertEqual(self.coordinator.lease("b")["seeds"], taken[:2])
@@ -0,0 +1,85 @@
+from swiftsmith.harness.metrics import Metrics, prometheus
+from swiftsmith.harness.runner import Job, StepResult
+from swiftsmith.harness.scheduler import Scheduler
+from swiftsmith.metamorphic import unnecessary_addition
+from swiftsmith.names import identifier
+from tests.harness import stub
+
+import asyncio
+import io
+import json
+import os
+import tempfile
+import unittest
+
+def job(*steps, sources=None):
+    job = Job("AAE=", "")
+    job.sources = sources or {}
+    for name, returncode, duration in steps:
+        job.steps.append(StepResult(name, [], returncode, "", "", duration, False))
+    return job
+
+class MetricsTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+        identifier.reset()
+
+    def test_shards_are_combined(self):
+        metrics = Metrics()
+        metrics.shard("a").record(job(("generate", 0, 0.01), ("run", 0, 0.5), sources={"A.swift": "x" * 300}))
+        metrics.shard("b").record(job(("generate", 0, 0.02), ("compile", 1, 2.0)))
+        metrics.shard("a").record(job(("generate", 0, 0.03), ("compile", 0, 1.0), ("link", 1, 0.1)))
+        self.assertEqual(metrics.statuses(), {"passed": 1, "compile failed": 1, "link failed": 1})
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["programs"], 3)
+        self.assertEqual(snapshot["failures"], {"compile failed": 1, "link failed": 1})
+        histograms = snapshot["histograms"]
+        self.assertEqual(histograms["generate_seconds"]["count"], 3)
+        self.assertAlmostEqual(histograms["generate_seconds"]["total"], 0.06)
+        self.assertEqual(histograms["compile_seconds"]["max"], 2.0)
+        self.assertEqual(histograms["program_bytes"]["count"], 1)
+        self.assertEqual(histograms["program_bytes"]["min"], 300)
+
+    def test_prometheus(self):
+        metrics = Metrics()
+        metrics.shard("a").record(job(("run", 0, 0.003)))
+        metrics.shard("a").record(job(("run", 0, 100.0)))
+        text = prometheus(metrics.snapshot({"elapsed": 2.0, "queues": {"compile": 3}}))
+        self.assertIn('swiftsmith_programs_total{status="passed"} 2\n', text)
+        self.assertIn('swiftsmith_run_seconds_bucket{le="0.002"} 0\n', text)
+        self.assertIn('swiftsmith_run_seconds_bucket{le="0.004"} 1\n', text)
+        self.assertIn('swiftsmith_run_seconds_bucket{le="+Inf"} 2\n', text)
+        self.assertIn("swiftsmith_run_seconds_count 2\n", text)
+        self.assertIn('swiftsmith_queue_depth{queue="compile"} 3\n', text)
+        self.assertIn("# TYPE swiftsmith_run_seconds histogram\n", text)
+
+    def test_scheduler_exports(self):
+        status = os.path.join(self.directory.name, "status.json")
+        textfile = os.path.join(self.directory.name, "swiftsmith.prom")
+        log = io.StringIO()
+        metrics = Metrics(textfile, status, interval=0.1, log=log)
+        scheduler = Scheduler(
+            stub("--stub-delay", "0.1"),
+            workers=2,
+            directory=os.path.join(self.directory.name, "work"),
+            job_options={"mr": unnecessary_addition},
+            metrics=metrics,
+        )
+        report = asyncio.run(scheduler.run(["AAE=", "AAI=", "AAM="]))
+        self.assertEqual(report["statuses"], {"passed": 3})
+        self.assertEqual(set(report["queues"]), {"compile", "link", "run"})
+        with open(status) as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot["programs"], 3)
+        self.assertGreater(snapshot["programs_per_second"], 0)
+        self.assertEqual(snapshot["histograms"]["compile_seconds"]["count"], 6)
+        with open(textfile) as f:
+            self.assertIn('swiftsmith_programs_total{status="passed"} 3', f.read())
+        # Exported while running, and once at the end.
+        lines = log.getvalue().splitlines()
+        self.assertGreater(len(lines), 1)
+        self.assertTrue(lines[-1].startswith("3 programs"))
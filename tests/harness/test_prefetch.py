@@ -0,0 +1,91 @@
+from swiftsmith.harness.prefetch import Prefetcher
+from swiftsmith.harness.runner import generate_sources
+from swiftsmith.metamorphic import unnecessary_addition
+
+import asyncio
+import signal
+import time
+import unittest
+
+def noisy(seed):
+    print("uh oh", seed)
+    return {"test.swift": seed}
+
+def slow(seed):
+    if seed == "slow":
+        time.sleep(30)
+    return {"test.swift": seed}
+
+def stuck(seed):
+    if seed == "stuck":
+        # Generation can't be interrupted, so the process has to be killed.
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+        time.sleep(30)
+    return {"test.swift": seed}
+
+async def consume(prefetcher):
+    prefetcher.start()
+    try:
+        results = []
+        while True:
+            generated = await prefetcher.get()
+            if generated is None:
+                return results
+            results.append(generated)
+    finally:
+        prefetcher.close()
+
+class PrefetcherTests(unittest.TestCase):
+    def test_generates_every_seed(self):
+        seeds = ["AAE=", "AAI=", "AAM=", "ABC=", "Zm9v"]
+        prefetcher = Prefetcher(seeds, processes=2, options={"mr": unnecessary_addition})
+        results = asyncio.run(consume(prefetcher))
+        self.assertEqual(sorted(g.seed for g in results), sorted(seeds))
+        for generated in results:
+            self.assertIsNone(generated.error)
+            self.assertEqual(generated.sources, generate_sources(generated.seed, unnecessary_addition))
+        self.assertEqual(prefetcher.generated, 5)
+        self.assertGreater(prefetcher.busy, 0)
+
+    def test_errors(self):
+        results = asyncio.run(consume(Prefetcher(["A"], processes=1)))
+        self.assertEqual(len(results), 1)
+        self.assertIsNone(results[0].sources)
+        self.assertIn("Error", results[0].error)
+
+    def test_output_is_captured(self):
+        results = asyncio.run(consume(Prefetcher(["AAE="], processes=1, function=noisy)))
+        self.assertEqual(results[0].sources, {"test.swift": "AAE="})
+        self.assertEqual(results[0].stdout, "uh oh AAE=\n")
+
+    def test_timeout(self):
+        prefetcher = Prefetcher(["slow", "fast"], processes=2, function=slow, timeout=0.5)
+        results = {g.seed: g for g in asyncio.run(consume(prefetcher))}
+        self.assertTrue(results["slow"].timedout)
+        self.assertIn("sleep", results["slow"].error)
+        self.assertEqual(results["fast"].sources, {"test.swift": "fast"})
+        self.assertFalse(results["fast"].timedout)
+        self.assertEqual(prefetcher.timeouts, 1)
+        self.assertEqual(prefetcher.recycled, 1)
+
+    def test_stuck_process_is_killed(self):
+        prefetcher = Prefetcher(["stuck", "fast"], processes=1, function=stuck, timeout=0.5)
+        start = time.perf_counter()
+        results = {g.seed: g for g in asyncio.run(consume(prefetcher))}
+        self.assertLess(time.perf_counter() - start, 10)
+        self.assertTrue(results["stuck"].timedout)
+        self.assertEqual(results["fast"].sources, {"test.swift": "fast"})
+        self.assertEqual(prefetcher.recycled, 1)
+
+    def test_tuning(self):
+        prefetcher = Prefetcher([], processes=2, maximum=10)
+        self.assertEqual(prefetcher.target, 2)
+        prefetcher.latency, prefetcher.interval = 1.0, 0.5
+        prefetcher._tune()
+        self.assertEqual(prefetcher.target, 4)
+        prefetcher.interval = 0.01
+        prefetcher._tune()
+        self.assertEqual(prefetcher.target, 10)
+        prefetcher.interval = 100.0
+        prefetcher._tune()
+        self.assertEqual(prefetcher.target, 2)
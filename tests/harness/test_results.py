@@ -0,0 +1,137 @@
+from swiftsmith.harness.results import ResultStore, fingerprint
+from swiftsmith.harness.runner import Job, StepResult
+from swiftsmith.metamorphic import failable_initializer
+from swiftsmith.program import version
+from swiftsmith.swarm import Configuration
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+
+def job(seed, failure=None, sources=None):
+    job = Job(seed, "unused")
+    job.sources = sources if sources is not None else {"test.swift": seed}
+    job.steps.append(StepResult("generate", [], 0, "", "", 0.5, False))
+    job.steps.append(StepResult("compile", ["swiftc"], 0, "", "", 2.0, False, True))
+    if failure == "run":
+        job.steps.append(StepResult("link", ["swiftc"], 0, "", "", 1.0, False))
+        job.steps.append(StepResult("run", ["./test"], 134, "", "Assertion failed", 0.1, False))
+    elif failure == "link":
+        job.steps.append(StepResult("link", ["swiftc"], None, "out", "", 60.0, True))
+    else:
+        job.steps.append(StepResult("link", ["swiftc"], 0, "", "", 1.0, False))
+        job.steps.append(StepResult("run", ["./test"], 0, "", "", 0.1, False))
+    return job
+
+
+class ResultStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "results.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_records(self):
+        with ResultStore(self.path) as store:
+            store.add(job("AAE=", "run"))
+        connection = sqlite3.connect(self.path)
+        self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone(), ("wal",))
+        row = connection.execute(
+            "SELECT seed, version, mr, fingerprint, status FROM results"
+        ).fetchone()
+        self.assertEqual(row, (
+            "AAE=", version, failable_initializer.__name__,
+            fingerprint({"test.swift": "AAE="}), "run failed",
+        ))
+        steps = connection.execute(
+            "SELECT name, returncode, duration, cached, stderr FROM steps ORDER BY position"
+        ).fetchall()
+        self.assertEqual(steps, [
+            ("generate", 0, 0.5, 0, ""),
+            ("compile", 0, 2.0, 1, ""),
+            ("link", 0, 1.0, 0, ""),
+            ("run", 134, 0.1, 0, "Assertion failed"),
+        ])
+        connection.close()
+
+    def test_batches_inserts(self):
+        store = ResultStore(self.path, batch_size=3, interval=3600)
+        reader = sqlite3.connect(self.path)
+        count = lambda: reader.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        store.add(job("AAE="))
+        store.add(job("AAI="))
+        self.assertEqual(count(), 0)
+        store.add(job("AAM="))
+        self.assertEqual(count(), 3)
+        store.add(job("ABC="))
+        store.close()
+        self.assertEqual(count(), 4)
+        reader.close()
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint({"a": "1", "b": "2"}), fingerprint({"b": "2", "a": "1"}))
+        self.assertNotEqual(fingerprint({"a": "1"}), fingerprint({"a": "2"}))
+        self.assertNotEqual(fingerprint({"a": "12"}), fingerprint({"a1": "2"}))
+
+    def test_reports(self):
+        with ResultStore(self.path) as store:
+            store.add(job("AAE="))
+            store.add(job("AAI=", "run"))
+            store.add(job("AAM=", "link"))
+            store.add(job("ABC=", "run"))
+            store.flush()
+
+            self.assertEqual(store.throughput()["jobs"], 4)
+            self.assertEqual(store.throughput(since=2**40)["jobs"], 0)
+            self.assertEqual(store.failures(), {"run failed": 2, "link timeout": 1})
+
+            stages = store.stages()
+            self.assertEqual(list(stages), ["generate", "compile", "link", "run"])
+            self.assertEqual(stages["compile"]["count"], 4)
+            self.assertEqual(stages["compile"]["cached"], 4)
+            self.assertEqual(stages["link"]["max"], 60.0)
+
+            failed = store.failed()
+            self.assertEqual([f["seed"] for f in failed], ["ABC=", "AAM=", "AAI="])
+            self.assertEqual(failed[0]["step"], "run")
+            self.assertEqual(failed[0]["stderr"], "Assertion failed")
+            self.assertEqual(failed[1]["step"], "link")
+            self.assertEqual(failed[1]["stdout"], "out")
+            self.assertEqual([f["seed"] for f in store.failed("link timeout")], ["AAM="])
+            self.assertEqual(len(store.failed(limit=1)), 1)
+
+    def test_shared(self):
+        first = ResultStore(self.path, batch_size=1)
+        second = ResultStore(self.path, batch_size=1)
+        first.add(job("AAE="))
+        second.add(job("AAI="))
+        self.assertEqual(first.throughput()["jobs"], 2)
+        first.close()
+        second.close()
+
+    def test_configuration(self):
+        configuration = Configuration(disabled=[1], access=[0.0, 1.0, 1.0, 1.0, 1.0])
+        swarmed = job("AAI=", "run")
+        swarmed.configuration = configuration
+        with ResultStore(self.path) as store:
+            store.add(job("AAE=", "run"))
+            store.add(swarmed)
+            store.flush()
+            failed = store.failed()
+        self.assertEqual(Configuration.from_dict(failed[0]["configuration"]), configuration)
+        self.assertIsNone(failed[1]["configuration"])
+
+    def test_adds_configuration_column(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute(
+            "CREATE TABLE results (id INTEGER PRIMARY KEY, seed TEXT NOT NULL, version TEXT NOT NULL, "
+            "mr TEXT, fingerprint TEXT, status TEXT NOT NULL, culprits TEXT, finished REAL NOT NULL)"
+        )
+        connection.close()
+        with ResultStore(self.path) as store:
+            store.add(job("AAE=", "run"))
+            store.flush()
+            self.assertEqual(store.failed()[0]["configuration"], None)
@@ -0,0 +1,104 @@
+from swiftsmith.harness.runner import Job, generate_sources, run_job, run_step
+from swiftsmith.metamorphic import unnecessary_addition
+from swiftsmith.names import identifier
+from tests.harness import stub
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+class BrokenJob(Job):
+    def generate_sources(self):
+        print("generating", self.seed)
+        raise RuntimeError("the generator is broken")
+
+class RunStepTests(unittest.TestCase):
+    def test_captures_output(self):
+        step = asyncio.run(run_step(
+            "echo", [sys.executable, "-c", "import sys; print('out'); sys.exit(3)"],
+        ))
+        self.assertEqual(step.returncode, 3)
+        self.assertEqual(step.stdout.strip(), "out")
+        self.assertFalse(step.timedout)
+        self.assertGreater(step.duration, 0)
+
+    def test_stdin(self):
+        step = asyncio.run(run_step(
+            "cat", [sys.executable, "-c", "import sys; print(sys.stdin.read().upper())"],
+            stdin=b"source",
+        ))
+        self.assertEqual(step.stdout.strip(), "SOURCE")
+
+    def test_timeout(self):
+        step = asyncio.run(run_step(
+            "sleep", [sys.executable, "-c", "import time; time.sleep(10)"], timeout=0.2,
+        ))
+        self.assertTrue(step.timedout)
+        self.assertIsNone(step.returncode)
+        self.assertLess(step.duration, 5)
+
+class JobTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+        # Tests which build trees by hand expect fresh identifiers.
+        identifier.reset()
+
+    def test_sources(self):
+        sources = generate_sources("Zm9v", unnecessary_addition)
+        self.assertEqual(set(sources), {"ModuleA.swift", "ModuleB.swift", "test.swift"})
+        self.assertIn("import ModuleB", sources["test.swift"])
+
+        sources = generate_sources("Zm9v", unnecessary_addition, oracle=True)
+        self.assertEqual(set(sources), {"ModuleB.swift", "test.swift"})
+
+    def test_passes(self):
+        job = asyncio.run(run_job(Job("Zm9v", self.directory.name, unnecessary_addition), stub()))
+        self.assertTrue(job.passed)
+        self.assertEqual(job.status(), "passed")
+        self.assertEqual([s.name for s in job.steps], ["generate", "compile", "compile", "link", "run"])
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, "libModuleA.so")))
+
+    def test_oracle_compiles_one_module(self):
+        job = Job("Zm9v", self.directory.name, unnecessary_addition, oracle=True)
+        asyncio.run(run_job(job, stub()))
+        self.assertEqual([s.name for s in job.steps], ["generate", "compile", "link", "run"])
+        self.assertIn("-lModuleB", job.steps[2].args)
+
+    def test_stops_at_failure(self):
+        for step in ["compile", "link", "run"]:
+            job = Job("Zm9v", self.directory.name, unnecessary_addition)
+            asyncio.run(run_job(job, stub("--stub-fail", step)))
+            self.assertFalse(job.passed)
+            self.assertEqual(job.status(), f"{step} failed")
+            self.assertEqual(job.steps[-1].name, step)
+
+    def test_generator_errors(self):
+        job = asyncio.run(run_job(BrokenJob("Zm9v", self.directory.name), stub()))
+        self.assertEqual(job.status(), "generate failed")
+        step, = job.steps
+        self.assertEqual(step.name, "generate")
+        self.assertEqual(step.stdout, "generating Zm9v\n")
+        self.assertIn("RuntimeError: the generator is broken", step.stderr)
+
+    def test_compile_timeout(self):
+        job = Job("Zm9v", self.directory.name, unnecessary_addition)
+        asyncio.run(run_job(job, stub("--stub-delay", "10", timeouts={"compile": 0.2})))
+        self.assertEqual(job.status(), "compile timeout")
+        self.assertEqual(len(job.steps), 2)
+
+    def test_stub_options(self):
+        job = Job("Zm9v", self.directory.name, unnecessary_addition)
+        asyncio.run(run_job(job, stub("--stub-size", "5000", "--stub-output", "it's done")))
+        self.assertTrue(job.passed)
+        self.assertGreaterEqual(os.path.getsize(os.path.join(self.directory.name, "libModuleA.so")), 5000)
+        self.assertEqual(job.steps[-1].stdout.strip(), "it's done")
+
+        for rate, status in [("0", "passed"), ("1", "link failed")]:
+            job = Job("Zm9v", self.directory.name, unnecessary_addition)
+            asyncio.run(run_job(job, stub("--stub-fail", "link", "--stub-fail-rate", rate)))
+            self.assertEqual(job.status(), status)
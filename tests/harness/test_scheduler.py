@@ -0,0 +1,155 @@
+from swiftsmith.harness.cache import CompileCache
+from swiftsmith.harness.runner import Toolchain
+from swiftsmith.harness.scheduler import Scheduler, Stage, default_workers, random_seeds
+from swiftsmith.metamorphic import unnecessary_addition
+from swiftsmith.names import identifier
+from swiftsmith.swarm import Swarm
+from tests.harness import stub
+
+import asyncio
+import itertools
+import json
+import os
+import random
+import tempfile
+import unittest
+
+class SchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.results = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+        identifier.reset()
+
+    def scheduler(self, toolchain, workers=2, **kwargs):
+        return Scheduler(
+            toolchain,
+            workers=workers,
+            directory=self.directory.name,
+            on_result=self.results.append,
+            job_options={"mr": unnecessary_addition},
+            **kwargs,
+        )
+
+    def test_runs_every_seed(self):
+        seeds = ["AAE=", "AAI=", "AAM=", "ABC=", "Zm9v"]
+        scheduler = self.scheduler(stub(), queue_size=1)
+        report = asyncio.run(scheduler.run(seeds))
+        self.assertEqual(sorted(job.seed for job in self.results), sorted(seeds))
+        self.assertEqual(report["statuses"], {"passed": 5})
+        self.assertEqual(report["stages"]["compile"]["jobs"], 5)
+        for stage in report["stages"].values():
+            self.assertGreater(stage["utilization"], 0)
+            self.assertLessEqual(stage["utilization"], 1)
+
+    def test_cache(self):
+        cache = CompileCache(os.path.join(self.directory.name, "cache"))
+        report = asyncio.run(self.scheduler(stub(), cache=cache).run(["AAE="] * 3))
+        self.assertEqual(report["statuses"], {"passed": 3})
+        self.assertEqual(report["cache"]["entries"], 2)
+        self.assertGreaterEqual(report["cache"]["hits"], 2)
+
+    def test_count(self):
+        report = asyncio.run(self.scheduler(stub()).run(random_seeds(random.Random(0)), count=3))
+        self.assertEqual(report["jobs"], 3)
+
+    def test_swarm(self):
+        seeds = ["AAE=", "AAI=", "AAM=", "ABC=", "Zm9v"]
+        swarm = Swarm(seed="swarm", size=2)
+        report = asyncio.run(self.scheduler(stub(), swarm=swarm).run(seeds))
+        self.assertEqual(report["statuses"], {"passed": 5})
+        self.assertEqual(report["swarm"]["sampled"], 3)
+        configurations = {job.seed: job.configuration for job in self.results}
+        again = Swarm(seed="swarm", size=2)
+        self.assertEqual([configurations[seed] for seed in seeds], [again.next() for _ in seeds])
+
+    def test_failures_finish_jobs(self):
+        report = asyncio.run(self.scheduler(stub("--stub-fail", "link")).run(["AAE=", "AAI="]))
+        self.assertEqual(report["statuses"], {"link failed": 2})
+        self.assertEqual(report["stages"]["run"]["jobs"], 0)
+
+    def test_errors_finish_jobs(self):
+        toolchain = Toolchain(swiftc=[os.path.join(self.directory.name, "missing")])
+        report = asyncio.run(self.scheduler(toolchain).run(["AAE="]))
+        self.assertEqual(report["statuses"], {"compile failed": 1})
+        self.assertIn("FileNotFoundError", self.results[0].failed_step.stderr)
+
+    def test_reclaims_directories(self):
+        directories = []
+        def check(job):
+            directories.append(job.directory)
+            self.assertTrue(os.listdir(job.directory))
+        scheduler = self.scheduler(stub())
+        scheduler.on_result = check
+        asyncio.run(scheduler.run(["AAE=", "AAI=", "AAM="]))
+        for directory in directories:
+            self.assertFalse(os.path.exists(directory))
+
+    def test_default_directory(self):
+        scheduler = Scheduler(stub(), workers=1, job_options={"mr": unnecessary_addition})
+        report = asyncio.run(scheduler.run(["AAE="]))
+        self.assertEqual(report["statuses"], {"passed": 1})
+        self.assertFalse(os.path.exists(report["workspace"]["directory"]))
+
+    def test_keeps_failures(self):
+        artifacts = os.path.join(self.directory.name, "artifacts")
+        report = asyncio.run(self.scheduler(stub("--stub-fail", "link"), artifacts=artifacts).run(["AAE="]))
+        self.assertEqual(report["workspace"]["kept"], 1)
+        kept, = os.listdir(artifacts)
+        self.assertIn("ModuleA.swift", os.listdir(os.path.join(artifacts, kept)))
+        with open(os.path.join(artifacts, kept, "result.json")) as f:
+            self.assertEqual(json.load(f)["status"], "link failed")
+
+        report = asyncio.run(self.scheduler(stub(), artifacts=artifacts).run(["AAI="]))
+        self.assertEqual(report["workspace"]["kept"], 0)
+        self.assertEqual(len(os.listdir(artifacts)), 1)
+
+    def test_stop_drains(self):
+        async def run():
+            scheduler = self.scheduler(stub("--stub-delay", "0.2"))
+            task = asyncio.ensure_future(scheduler.run(itertools.cycle(["AAE="])))
+            await asyncio.sleep(0.5)
+            scheduler.stop()
+            return await task
+        report = asyncio.run(run())
+        self.assertGreater(report["jobs"], 0)
+        self.assertEqual(set(report["statuses"]), {"passed"})
+
+    def test_cancel(self):
+        async def run():
+            scheduler = self.scheduler(stub("--stub-delay", "10"))
+            task = asyncio.ensure_future(scheduler.run(itertools.cycle(["AAE="])))
+            await asyncio.sleep(0.5)
+            scheduler.cancel()
+            return await task
+        report = asyncio.run(asyncio.wait_for(run(), 5))
+        self.assertNotIn("passed", report["statuses"])
+
+    def test_cancel_after_stop(self):
+        async def run():
+            scheduler = self.scheduler(stub("--stub-delay", "1"))
+            task = asyncio.ensure_future(scheduler.run(itertools.cycle(["AAE="])))
+            await asyncio.sleep(0.5)
+            scheduler.stop()
+            while not scheduler._tasks[0].done():
+                await asyncio.sleep(0.05)
+            scheduler.cancel()
+            # `run` returns a report even if it's cancelled, so wait_for can't tell.
+            done, _ = await asyncio.wait([task], timeout=2)
+            self.assertEqual(done, {task})
+            return task.result()
+        report = asyncio.run(run())
+        self.assertNotIn("passed", report["statuses"])
+
+class WorkersTests(unittest.TestCase):
+    def test_default_workers(self):
+        self.assertGreaterEqual(default_workers(), 1)
+        self.assertLessEqual(default_workers(), os.cpu_count())
+        self.assertEqual(default_workers(memory_per_job=2**60), 1)
+
+    def test_utilization(self):
+        stage = Stage("compile", 2)
+        stage.busy = 1.0
+        self.assertEqual(stage.utilization(1.0), 0.5)
@@ -0,0 +1,73 @@
+from swiftsmith.harness.runner import Job, StepResult
+from swiftsmith.harness.workspace import Workspace, is_bug_candidate, tmpfs
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+def finished(seed, directory, returncode=0, size=0):
+    job = Job(seed, directory)
+    job.steps.append(StepResult("run", [], returncode, "", "", 0.0, False))
+    with open(os.path.join(directory, "test"), "w") as f:
+        f.write("x" * size)
+    return job
+
+class WorkspaceTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.artifacts = os.path.join(self.directory.name, "artifacts")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def workspace(self, size=2, **kwargs):
+        return Workspace(size, os.path.join(self.directory.name, "work"), **kwargs)
+
+    def test_recycles_directories(self):
+        workspace = self.workspace()
+        first = asyncio.run(workspace.acquire())
+        second = asyncio.run(workspace.acquire())
+        self.assertNotEqual(first, second)
+        workspace.release(finished("AAE=", first))
+        self.assertEqual(os.listdir(first), [])
+        self.assertEqual(asyncio.run(workspace.acquire()), first)
+        workspace.close()
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(workspace.directory))
+
+    def test_default_directory(self):
+        workspace = Workspace(1)
+        if tmpfs() is not None:
+            self.assertTrue(workspace.directory.startswith(tmpfs()))
+        asyncio.run(workspace.acquire())
+        workspace.close()
+        self.assertFalse(os.path.exists(workspace.directory))
+
+    def test_keeps_bug_candidates(self):
+        workspace = self.workspace(artifacts=self.artifacts)
+        passed = finished("AAE=", asyncio.run(workspace.acquire()))
+        failed = finished("a/b+", asyncio.run(workspace.acquire()), returncode=1)
+        self.assertFalse(is_bug_candidate(passed))
+        self.assertTrue(is_bug_candidate(failed))
+        self.assertIsNone(workspace.release(passed))
+        kept = workspace.release(failed)
+        self.assertEqual(kept, os.path.join(self.artifacts, "a_b-"))
+        self.assertEqual(sorted(os.listdir(kept)), ["result.json", "test"])
+        with open(os.path.join(kept, "result.json")) as f:
+            self.assertEqual(json.load(f)["status"], "run failed")
+        self.assertEqual(os.listdir(failed.directory), [])
+        self.assertEqual(workspace.statistics()["kept"], 1)
+
+    def test_quota(self):
+        workspace = self.workspace(artifacts=self.artifacts, quota=3000)
+        for seed in ["AAE=", "AAI=", "AAM="]:
+            job = finished(seed, asyncio.run(workspace.acquire()), returncode=1, size=1000)
+            workspace.release(job)
+        self.assertLessEqual(workspace.size, 3000)
+        self.assertEqual(sorted(os.listdir(self.artifacts)), ["AAI", "AAM"])
+        self.assertEqual(workspace.evictions, 1)
+
+        # The kept artifacts count towards the quota of the next workspace.
+        self.assertEqual(self.workspace(artifacts=self.artifacts).size, workspace.size)
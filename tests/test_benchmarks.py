@@ -0,0 +1,36 @@
+import unittest
+from benchmarks import harness, scaling, suite, timing
+from swiftsmith.names import identifier
+
+class BenchmarkTests(unittest.TestCase):
+    def test_compare_flags_regressions_beyond_threshold(self):
+        baseline = {"a": {"min": 1.0}, "b": {"min": 1.0}, "c": {"min": 1.0}}
+        results = {"a": {"min": 1.05}, "b": {"min": 1.2}, "d": {"min": 5.0}}
+        comparisons = timing.compare(results, baseline, threshold=0.1)
+        self.assertEqual([(c[0], c[4]) for c in comparisons], [("a", False), ("b", True)])
+
+    def test_fixed_seeds_are_stable(self):
+        self.assertEqual(suite.fixed_seeds(2), ["AAAAAA==", "AAAAAQ=="])
+
+    def test_suite_runs(self):
+        results = suite.run(seed_count=1, repeat=1)
+        self.assertIn("mr/failable-init", "".join(results))
+        for result in results.values():
+            self.assertEqual(len(result["runs"]), 1)
+
+    def test_fit_exponent(self):
+        sizes = [10, 100, 1000]
+        self.assertAlmostEqual(scaling.fit_exponent(sizes, [n * 2.0 for n in sizes]), 1.0)
+        self.assertAlmostEqual(scaling.fit_exponent(sizes, [n * n for n in sizes]), 2.0)
+
+    def test_harness_runs(self):
+        try:
+            results = harness.run(workers=[1, 2], seed_count=2, stub_options=["--stub-fail", "run"])
+        finally:
+            identifier.reset()
+        self.assertEqual(set(results), {"harness/workers=1", "harness/workers=2"})
+        for result in results.values():
+            self.assertEqual(result["statuses"], {"run failed": 2})
+            self.assertGreater(result["seeds_per_second"], 0)
+            self.assertGreater(result["overhead"], 0)
+            self.assertLessEqual(result["idle"], 1)
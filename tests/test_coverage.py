@@ -0,0 +1,120 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import random
+import tempfile
+import unittest
+from swiftsmith.coverage import CoverageTracker
+from swiftsmith.grammar import Nonterminal, PProduction, PCFG
+from swiftsmith.swift import swift
+
+def append_programs(path, seed, count=10):
+    random.seed(seed)
+    for i in range(count):
+        tracker = CoverageTracker.load(swift, path) if os.path.exists(path) else CoverageTracker(swift)
+        tracker.record(swift.randomtree(weights=tracker.weights), seed=f"{seed}-{i}")
+        tracker.append(path)
+
+class CoverageTrackerTests(unittest.TestCase):
+    def setUp(self):
+        self.S = Nonterminal("S")
+        self.A = Nonterminal("A")
+        self.grammar = PCFG(self.S, [
+            PProduction(self.S, (self.A, self.S), 0.5),
+            PProduction(self.S, (self.A,), 0.5),
+            PProduction(self.A, ("a",), 0.9),
+            PProduction(self.A, ("b",), 0.1),
+        ])
+
+    def test_randomtree_records_productions(self):
+        tree = self.grammar.randomtree()
+        self.assertIn(tree.production, self.grammar[:2])
+        self.assertIn(tree.children[0].production, self.grammar[2:])
+
+    def test_record_counts_productions_and_pairs(self):
+        tracker = CoverageTracker(self.grammar)
+        tree = self.grammar.ParseTree(self.S)
+        tree.expand([self.A])
+        tree.production = self.grammar[1]
+        tree.children[0].expand(["b"])
+        tree.children[0].production = self.grammar[3]
+
+        tracker.record(tree)
+        self.assertEqual(tracker.production_counts, [0, 1, 0, 1])
+        self.assertDictEqual(tracker.pair_counts, {(1, 3): 1})
+        self.assertEqual(tracker.uncovered(), [self.grammar[0], self.grammar[2]])
+
+    def test_weights_favor_uncovered_productions_within_bounds(self):
+        tracker = CoverageTracker(self.grammar, min_factor=0.5, max_factor=2.0)
+        tracker._update([0, 1, 2], [(0, 2), (1, 2)])
+        weights = tracker.weights(self.grammar[0], self.grammar[2:])
+        self.assertGreater(weights[1] / weights[0], 0.1 / 0.9)
+        self.assertLessEqual(weights[1] / weights[0], (0.1 * 2.0) / (0.9 * 0.5))
+
+    def test_weights_do_not_make_recursion_unbounded(self):
+        tracker = CoverageTracker(self.grammar, max_factor=100.0, max_radius=0.6)
+        tracker._update([1, 2, 3], [(1, 2), (1, 3)])
+        weights = tracker.weights(self.grammar[0], self.grammar[:2])
+        self.assertLessEqual(weights[0] / sum(weights), 0.6 + 1e-6)
+
+    def test_load_replays_campaign_log(self):
+        random.seed(0)
+        tracker = CoverageTracker(swift)
+        for i in range(3):
+            tracker.record(swift.randomtree(weights=tracker.weights), seed=str(i))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "coverage.log")
+            tracker.save(path)
+            replayed = CoverageTracker.load(swift, path)
+
+        self.assertEqual(replayed.production_counts, tracker.production_counts)
+        self.assertDictEqual(replayed.pair_counts, tracker.pair_counts)
+        self.assertDictEqual(replayed.table(), tracker.table())
+
+    def test_load_rejects_log_from_another_grammar(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "coverage.log")
+            CoverageTracker(self.grammar).save(path)
+            with self.assertRaises(ValueError):
+                CoverageTracker.load(swift, path)
+
+    def test_adaptive_weights_reach_full_coverage_sooner(self):
+        def programs_until_full_coverage(adaptive, seed):
+            random.seed(seed)
+            tracker = CoverageTracker(swift)
+            while True:
+                weights = tracker.weights if adaptive else None
+                tracker.record(swift.randomtree(weights=weights))
+                coverage = tracker.coverage()
+                if coverage["productions"] == coverage["total_productions"] and \
+                   coverage["pairs"] == coverage["total_pairs"]:
+                    return coverage["programs"]
+
+        seeds = range(10)
+        uniform = sum(programs_until_full_coverage(False, seed) for seed in seeds)
+        adaptive = sum(programs_until_full_coverage(True, seed) for seed in seeds)
+        self.assertLess(adaptive, uniform)
+
+    def test_append_adds_new_entries(self):
+        random.seed(0)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "coverage.log")
+            tracker = CoverageTracker(swift)
+            tracker.record(swift.randomtree(), seed="0")
+            tracker.append(path)
+            tracker.record(swift.randomtree(), seed="1")
+            tracker.append(path)
+            tracker.append(path)
+            replayed = CoverageTracker.load(swift, path)
+        self.assertEqual([entry["seed"] for entry in replayed.log], ["0", "1"])
+        self.assertEqual(replayed.production_counts, tracker.production_counts)
+
+    def test_concurrent_appends(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "coverage.log")
+            with ProcessPoolExecutor(max_workers=4) as pool:
+                list(pool.map(append_programs, [path] * 4, range(4)))
+            replayed = CoverageTracker.load(swift, path)
+            self.assertEqual(sorted(os.listdir(directory)), ["coverage.log"])
+        self.assertEqual(len(replayed.log), 40)
+        self.assertEqual(len({entry["seed"] for entry in replayed.log}), 40)
@@ -0,0 +1,85 @@
+from swiftsmith.expression import FunctionCall
+from swiftsmith.interpreter import EnumValue, Interpreter, InterpreterError, parse_literal, swift_literal, wrap
+from swiftsmith.metamorphic import unnecessary_addition, unnecessary_multiplication
+from swiftsmith.semantics import SemanticParseTree
+from swiftsmith.standard_library import Bool, Int, Optional
+from swiftsmith.types import AccessLevel, EnumType
+from tests import annotated
+
+import io
+import unittest
+
+def calls(program, count):
+    for _ in range(count):
+        fname, ftype = program.rootscope.choose_function(at_least=AccessLevel.public)
+        call = SemanticParseTree(FunctionCall(fname, ftype), [])
+        call.annotate()
+        yield call
+
+class LiteralTests(unittest.TestCase):
+    def setUp(self):
+        self.A = EnumType("A", access=AccessLevel.public)
+        self.A.add_case("a", [])
+        self.A.add_case("b", [Int, Bool])
+        self.optional = Optional.specialize(Wrapped=self.A)
+
+    def test_wrap(self):
+        self.assertEqual(wrap(2**63 - 1 + 1), -2**63)
+        self.assertEqual(wrap(-2**63 - 1), 2**63 - 1)
+        self.assertEqual(wrap((2**62) * 4), 0)
+        self.assertEqual(wrap(-5), -5)
+
+    def test_parse_literal(self):
+        self.assertEqual(parse_literal("-12", Int), -12)
+        self.assertEqual(parse_literal("true", Bool), True)
+        self.assertEqual(parse_literal(".a", self.A), EnumValue(self.A, "a", ()))
+        self.assertEqual(parse_literal("A.b(3, false)", self.A), EnumValue(self.A, "b", (3, False)))
+        value = parse_literal("Optional<A>.some(A.b(1, true))", self.optional)
+        self.assertEqual(value.values[0].values, (1, True))
+
+    def test_parse_invalid_literal(self):
+        with self.assertRaises(InterpreterError):
+            parse_literal("A.c", self.A)
+        with self.assertRaises(InterpreterError):
+            parse_literal("A.b(1)", self.A)
+
+    def test_swift_literal(self):
+        value = parse_literal(".some(.b(-1, true))", self.optional)
+        self.assertEqual(swift_literal(value, self.optional), "Optional<A>.some(A.b(-1, true))")
+        self.assertEqual(
+            swift_literal(value, self.optional, "M"),
+            "Optional<M.A>.some(M.A.b(-1, true))",
+        )
+
+class InterpreterTests(unittest.TestCase):
+    def test_interprets_generated_programs(self):
+        for seed in ["AAE=", "AAI=", "AAM=", "ABC=", "Zm9v"]:
+            program = annotated(seed)
+            interpreter = Interpreter(program.parsetree)
+            for call in calls(program, 20):
+                value = interpreter.evaluate_call(call)
+                datatype = call.value.functiontype.returntype
+                self.assertEqual(parse_literal(swift_literal(value, datatype), datatype), value)
+
+    def test_variants_have_the_same_results(self):
+        program = annotated("Zm9v")
+        expected = Interpreter(program.parsetree)
+        variants = program.variants([unnecessary_addition, unnecessary_multiplication], 5)
+        interpreters = [Interpreter(variant.root) for variant in variants]
+        for call in calls(program, 20):
+            for interpreter in interpreters:
+                self.assertEqual(interpreter.evaluate_call(call), expected.evaluate_call(call))
+
+    def test_undeclared_function(self):
+        with self.assertRaises(InterpreterError):
+            Interpreter(annotated("AAE=").parsetree).call("undeclared", [])
+
+class OracleTestsTests(unittest.TestCase):
+    def test_write_oracle_tests(self):
+        program = annotated("AAM=")
+        f = io.StringIO()
+        program.write_oracle_tests(f, "M", count=5, variants=("B",))
+        lines = [line for line in f.getvalue().splitlines() if line.startswith("assert")]
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(all(line.startswith("assert(MB.") for line in lines))
+        self.assertIn("import MB", f.getvalue())
@@ -0,0 +1,89 @@
+import unittest
+from swiftsmith.grammar import ParseTree
+from swiftsmith.memory import census, MemoryBudgetExceeded, MemoryProfiler
+from swiftsmith.profiling import Profiler
+from swiftsmith.program import Program
+
+import time
+import tracemalloc
+
+class MemoryProfilerTests(unittest.TestCase):
+    def profile(self, memory):
+        profiler = Profiler()
+        profiler.add_hook(memory)
+        memory.start()
+        try:
+            profiler.start_program("AAE=")
+            program = Program("AAE=", profiler=profiler)
+            program.generate()
+            program.annotate()
+            profiler.end_program()
+        finally:
+            memory.stop()
+        return profiler.programs[0]["phases"]
+
+    def test_phases_record_memory(self):
+        phases = self.profile(MemoryProfiler(top=5))
+        memory = phases["generate"]["memory"]
+        self.assertGreater(memory["allocated"], 0)
+        self.assertGreaterEqual(memory["peak"], memory["allocated"])
+        self.assertLessEqual(len(memory["sites"]), 5)
+        self.assertGreater(memory["types"]["ParseTree"]["count"], 0)
+
+    def test_summary_includes_memory(self):
+        profiler = Profiler()
+        memory = MemoryProfiler(detailed=False)
+        profiler.add_hook(memory)
+        memory.start()
+        try:
+            with profiler.phase("allocate"):
+                data = [0] * 10000
+        finally:
+            memory.stop()
+        profiler.end_program()
+        summary = profiler.summary()["phases"]["allocate"]
+        self.assertGreater(summary["memory.peak"]["max"], 0)
+        self.assertNotIn("sites", profiler.programs[0]["phases"]["allocate"]["memory"])
+
+    def test_budget_aborts_phase(self):
+        with self.assertRaises(MemoryBudgetExceeded) as context:
+            self.profile(MemoryProfiler(budget=1024, detailed=False))
+        self.assertEqual(context.exception.phase, "generate")
+        self.assertGreater(context.exception.peak, 1024)
+
+    def test_no_interrupt_after_phase(self):
+        profiler = Profiler()
+        memory = MemoryProfiler(budget=2**20, detailed=False, interval=0.001)
+        profiler.add_hook(memory)
+        memory.start()
+        try:
+            with profiler.phase("small"):
+                pass
+            # Exceeds the budget between phases, which the watchdog ignores.
+            allocated = [bytes(1024) for _ in range(4096)]
+            time.sleep(0.1)
+        finally:
+            memory.stop()
+        self.assertEqual(len(allocated), 4096)
+
+    def test_stop_leaves_tracing_it_did_not_start(self):
+        tracemalloc.start()
+        try:
+            memory = MemoryProfiler()
+            memory.start()
+            memory.stop()
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+        memory.start()
+        memory.stop()
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_census_counts_parse_trees(self):
+        trees = [ParseTree("a") for _ in range(10)]
+        count, size = census()["ParseTree"]
+        self.assertGreaterEqual(count, 10)
+        self.assertGreater(size, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import tempfile
+import unittest
+from swiftsmith.profiling import PhaseHook, Profiler
+
+def save_programs(path, count=10):
+    for _ in range(count):
+        profiler = Profiler()
+        profiler.start_program()
+        with profiler.phase("generate"):
+            pass
+        profiler.end_program()
+        profiler.save(path)
+
+class RecordingHook(PhaseHook):
+    def __init__(self):
+        self.events = []
+
+    def start_phase(self, name):
+        self.events.append(("start", name))
+
+    def end_phase(self, name, record):
+        self.events.append(("end", name))
+        record["extra"] = 1
+
+class ProfilerTests(unittest.TestCase):
+    def test_phases_are_recorded_per_program(self):
+        profiler = Profiler()
+        profiler.start_program("AA==")
+        with profiler.phase("generate"):
+            pass
+        profiler.end_program()
+        self.assertEqual(len(profiler.programs), 1)
+        self.assertEqual(profiler.programs[0]["seed"], "AA==")
+        self.assertSetEqual(set(profiler.programs[0]["phases"]["generate"]), {"wall", "cpu"})
+
+    def test_repeated_phase_times_are_summed(self):
+        profiler = Profiler()
+        profiler.start_program()
+        with profiler.phase("render"):
+            pass
+        first = profiler._current["phases"]["render"]["wall"]
+        with profiler.phase("render"):
+            pass
+        profiler.end_program()
+        self.assertGreaterEqual(profiler.programs[0]["phases"]["render"]["wall"], first)
+
+    def test_hooks_observe_phases(self):
+        profiler = Profiler()
+        hook = RecordingHook()
+        profiler.add_hook(hook)
+        profiler.start_program()
+        with profiler.phase("annotate"):
+            pass
+        profiler.end_program()
+        self.assertEqual(hook.events, [("start", "annotate"), ("end", "annotate")])
+        self.assertEqual(profiler.programs[0]["phases"]["annotate"]["extra"], 1)
+
+    def test_summary_aggregates_batch(self):
+        profiler = Profiler()
+        for _ in range(3):
+            profiler.start_program()
+            with profiler.phase("generate"):
+                pass
+            profiler.end_program()
+        wall = profiler.summary()["phases"]["generate"]["wall"]
+        self.assertEqual(wall["count"], 3)
+        self.assertEqual(sum(wall["histogram"]["counts"]), 3)
+        self.assertLessEqual(wall["min"], wall["p50"])
+        self.assertLessEqual(wall["p50"], wall["max"])
+
+    def test_pstats_are_written_per_phase(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = Profiler(pstats_dir=directory)
+            profiler.start_program()
+            with profiler.phase("generate"):
+                sum(range(100))
+            profiler.end_program()
+            profiler.write_pstats()
+            self.assertTrue(os.path.exists(os.path.join(directory, "generate.pstats")))
+
+    def test_save_aggregates_without_changing_programs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first, second = os.path.join(directory, "p.json"), os.path.join(directory, "m.json")
+            previous = Profiler()
+            previous.start_program()
+            previous.end_program()
+            previous.save(first)
+
+            profiler = Profiler()
+            profiler.start_program()
+            profiler.end_program()
+            profiler.save(first)
+            profiler.save(second)
+            self.assertEqual(len(profiler.programs), 1)
+            with open(first) as f:
+                self.assertEqual(len(json.load(f)["programs"]), 2)
+            with open(second) as f:
+                self.assertEqual(len(json.load(f)["programs"]), 1)
+
+    def test_concurrent_saves_aggregate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "p.json")
+            with ProcessPoolExecutor(max_workers=4) as pool:
+                list(pool.map(save_programs, [path] * 4))
+            with open(path) as f:
+                self.assertEqual(len(json.load(f)["programs"]), 40)
+            self.assertEqual(sorted(os.listdir(directory)), ["p.json", "p.json.lock"])
@@ -0,0 +1,50 @@
+import io
+import unittest
+from swiftsmith.profiling import Profiler
+from swiftsmith.program import Program, decode_seed
+
+class ProgramTests(unittest.TestCase):
+    def test_decode_seed(self):
+        self.assertEqual(decode_seed("AAE="), 1)
+
+    def test_same_seed_generates_same_program(self):
+        def generate(seed):
+            program = Program(seed)
+            program.generate()
+            program.annotate()
+            return program.render()
+        self.assertEqual(generate("AAE="), generate("AAE="))
+
+    def test_render_to_matches_render(self):
+        for seed in ["AAE=", "Zm9v"]:
+            program = Program(seed)
+            program.generate()
+            program.annotate()
+            stream = io.StringIO()
+            program.render_to(stream)
+            self.assertEqual(stream.getvalue(), program.render())
+
+    def test_write_tests(self):
+        program = Program("Zm9v")
+        program.generate()
+        program.annotate()
+        f = io.StringIO()
+        program.write_tests(f, "Module", count=3, variants=("B", "C"))
+        lines = [line for line in f.getvalue().splitlines() if line.startswith("assert")]
+        self.assertEqual(len(lines), 6)
+        for line in lines:
+            self.assertRegex(line, r"^assert\(ModuleA\.(.+)\.hashValue == Module[BC]\.\1\.hashValue\)$")
+
+    def test_phases_are_profiled(self):
+        profiler = Profiler()
+        profiler.start_program("AAE=")
+        program = Program("AAE=", profiler=profiler)
+        program.generate()
+        program.annotate()
+        program.render()
+        program.write_tests(io.StringIO(), "Module", count=1)
+        profiler.end_program()
+        self.assertSetEqual(
+            set(profiler.programs[0]["phases"]),
+            {"generate", "annotate", "render", "tests"}
+        )
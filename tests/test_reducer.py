@@ -0,0 +1,72 @@
+from swiftsmith.metamorphic import unnecessary_addition
+from swiftsmith.names import identifier
+from swiftsmith.program import Program
+from swiftsmith.reducer import Reducer, apply_edits, minimal_derivations, size
+from swiftsmith.swarm import Configuration
+from swiftsmith.swift import swift
+from tests.harness import stub
+
+import unittest
+
+class ReducerTests(unittest.TestCase):
+    def tearDown(self):
+        identifier.reset()
+
+    def test_minimal_derivations(self):
+        rules, sizes = minimal_derivations(swift)
+        # Every nonterminal derives some finite tree.
+        self.assertEqual(set(rules), {rule.lhs for rule in swift})
+        self.assertTrue(all(size < float("inf") for size in sizes.values()))
+
+    def test_apply_edits(self):
+        rules, sizes = minimal_derivations(swift)
+        tree = Program("Zm9v").generate()
+        minimized = apply_edits(tree, {((), None)}, rules)
+        self.assertIs(minimized, tree)
+        self.assertEqual(size(tree), sizes[tree.value])
+
+        # Replacing the root with a descendant of the same symbol drops a declaration.
+        tree = Program("Zm9v").generate()
+        path = next(
+            (i,) for i, child in enumerate(tree.children) if child.value == tree.value
+        )
+        hoisted = apply_edits(tree, {((), path)}, rules)
+        self.assertIs(hoisted, tree.children[path[0]])
+        self.assertIsNone(hoisted.parent)
+        self.assertLess(size(hoisted), size(tree))
+
+    def test_reduces_failing_program(self):
+        reducer = Reducer(
+            "Zm9v",
+            stub("--stub-fail", "compile", "--stub-fail-if", "enum"),
+            mr=unnecessary_addition,
+            processes=2,
+        )
+        sources = reducer.reduce()
+        self.assertIn("enum", "".join(sources.values()))
+        report = reducer.report()
+        self.assertEqual(report["status"], "compile failed")
+        self.assertLess(report["reduced_size"], report["original_size"] / 4)
+        self.assertGreater(report["tested"], 0)
+
+        # Candidates which were already tested aren't tested again.
+        tested = reducer.tested
+        reducer.test([frozenset(), reducer.edits])
+        self.assertEqual(reducer.tested, tested)
+
+    def test_passing_program(self):
+        reducer = Reducer("Zm9v", stub(), mr=unnecessary_addition, processes=1)
+        with self.assertRaises(ValueError):
+            reducer.reduce()
+
+    def test_configuration(self):
+        # Without the production which declares enums, the program has none to fail on.
+        reducer = Reducer(
+            "Zm9v",
+            stub("--stub-fail", "compile", "--stub-fail-if", "enum"),
+            mr=unnecessary_addition,
+            processes=1,
+            configuration=Configuration(disabled=[1]),
+        )
+        with self.assertRaises(ValueError):
+            reducer.reduce()
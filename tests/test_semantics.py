@@ -1,6 +1,6 @@
 import copy
 import unittest
-from swiftsmith.semantics import SemanticParseTree, SemanticNonterminal
+from swiftsmith.semantics import SemanticParseTree, SemanticNonterminal, Token
 
 class SNTest(SemanticNonterminal):
     required_annotations = set(["bar"])
@@ -69,3 +69,134 @@ class TestSemantics(unittest.TestCase):
         self.assertEqual(x, 0)
         a._run_deferred()
         self.assertEqual(x, 2)
+
+class NodeIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.tree = SemanticParseTree("root", [
+            SemanticParseTree(SNTest("a"), ["x", "y"]),
+            SemanticParseTree("z"),
+            SNTest("b"),
+        ])
+
+    def test_nodes_by_class_in_preorder(self):
+        nodes = self.tree.index().nodes(SNTest)
+        self.assertEqual([n.value.foo for n in nodes], ["a", "b"])
+        self.assertEqual(len(self.tree.index().nodes(str)), 6)
+
+    def test_nodes_by_datatype(self):
+        tree = SemanticParseTree("root", [Typed(1), Typed(2), Typed(1)])
+        nodes = tree.index().nodes(Typed, datatype=1)
+        self.assertEqual(nodes, [tree.children[0], tree.children[2]])
+
+    def test_inserted_child_is_indexed_in_order(self):
+        index = self.tree.index()
+        first = self.tree.children[0]
+        first.insert_child(1, SemanticParseTree(SNTest("c"), [SNTest("d")]))
+        self.tree.add_child(SNTest("e"))
+        nodes = index.nodes(SNTest)
+        self.assertEqual([n.value.foo for n in nodes], ["a", "c", "d", "b", "e"])
+        self.assertEqual(nodes, [n for n in self.tree.preorder(values=False)
+                                 if isinstance(n.value, SNTest)])
+
+    def test_removed_child_is_unindexed(self):
+        index = self.tree.index()
+        self.tree.remove_child(self.tree.children[0])
+        self.assertEqual([n.value.foo for n in index.nodes(SNTest)], ["b"])
+        self.assertNotIn("x", self.tree)
+
+    def test_repeated_insertions_stay_ordered(self):
+        index = self.tree.index()
+        for i in range(100):
+            self.tree.children[0].insert_child(0, SNTest(str(i)))
+        expected = [n for n in self.tree.preorder(values=False) if isinstance(n.value, SNTest)]
+        self.assertEqual(index.nodes(SNTest), expected)
+
+    def test_replaced_children_are_indexed(self):
+        index = self.tree.index()
+        first, second, third = self.tree.children
+        replacement = SemanticParseTree(SNTest("c"), [SNTest("d")])
+        self.tree.replace_children([first, replacement, third])
+        self.assertIs(replacement.parent, self.tree)
+        self.assertIsNone(second.parent)
+        self.assertEqual([n.value.foo for n in index.nodes(SNTest)], ["a", "c", "d", "b"])
+        self.assertNotIn("z", self.tree)
+
+    def test_contains(self):
+        self.assertIn("y", self.tree)
+        self.assertIn("SNTest", self.tree)
+        self.assertNotIn("w", self.tree)
+
+class Typed(SNTest):
+    def __init__(self, datatype):
+        super().__init__("typed")
+        self.datatype = datatype
+
+class Counted(Token):
+    renders = 0
+
+    def annotate(self, scope, context):
+        self.annotations["text"] = "t"
+
+    def string(self):
+        Counted.renders += 1
+        return self.annotations["text"]
+
+class CachedStringTests(unittest.TestCase):
+    def setUp(self):
+        Counted.renders = 0
+        self.tree = SemanticParseTree("root", [
+            SemanticParseTree("left", [Counted()]),
+            SemanticParseTree("right", [Counted()]),
+        ])
+        self.tree.annotate()
+
+    def test_string_is_cached(self):
+        self.assertEqual(self.tree.string(), "tt")
+        self.tree.string()
+        self.assertEqual(Counted.renders, 2)
+
+    def test_annotation_change_rerenders_path(self):
+        self.tree.string()
+        self.tree.children[0].children[0].value.annotations["text"] = "u"
+        self.assertEqual(self.tree.string(), "ut")
+        self.assertEqual(Counted.renders, 3)
+
+    def test_child_change_rerenders_path(self):
+        self.tree.string()
+        self.tree.children[1].add_child("v")
+        self.assertEqual(self.tree.string(), "ttv")
+        self.assertEqual(Counted.renders, 2)
+
+    def test_annotation_subtree_change_rerenders_owner(self):
+        token = Counted()
+        token.string = lambda: token.annotations["subtree"].string()
+        tree = SemanticParseTree("root", [token])
+        subtree = SemanticParseTree("sub", ["a"])
+        token.annotations["subtree"] = subtree
+        self.assertEqual(tree.string(), "a")
+        subtree.add_child("b")
+        self.assertEqual(tree.string(), "ab")
+
+    def test_annotation_methods_rerender_path(self):
+        self.tree.string()
+        annotations = self.tree.children[0].children[0].value.annotations
+        annotations.update(text="u")
+        self.assertEqual(self.tree.string(), "ut")
+        annotations.pop("text")
+        annotations.setdefault("text", "v")
+        self.assertEqual(self.tree.string(), "vt")
+        self.assertEqual(Counted.renders, 4)
+
+    def test_replaced_children_rerender_path(self):
+        self.tree.string()
+        self.tree.children[1].replace_children(["w"])
+        self.assertEqual(self.tree.string(), "tw")
+        self.assertEqual(Counted.renders, 2)
+
+    def test_deep_copy_of_annotated_tree(self):
+        self.tree.string()
+        duplicate = copy.deepcopy(self.tree)
+        self.assertEqual(duplicate.string(), "tt")
+        duplicate.children[0].children[0].value.annotations["text"] = "u"
+        self.assertEqual(duplicate.string(), "ut")
+        self.assertEqual(self.tree.string(), "tt")
@@ -0,0 +1,102 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import tempfile
+import unittest
+from swiftsmith.expression import Variable
+from swiftsmith.grammar import Nonterminal, PProduction, PCFG
+from swiftsmith.scope import Scope
+from swiftsmith.standard_library import Int
+from swiftsmith.statistics import counters, Counters, StatisticsLog, tree_statistics
+
+def save_statistics(path, count=10):
+    S = Nonterminal("S")
+    grammar = PCFG(S, [PProduction(S, ("a",), 1.0)])
+    for _ in range(count):
+        log = StatisticsLog()
+        log.record(grammar.randomtree())
+        log.save(path)
+
+class CountersTests(unittest.TestCase):
+    def tearDown(self):
+        counters.enabled = False
+        counters.reset()
+
+    def test_disabled_counters_record_nothing(self):
+        c = Counters()
+        c.increment("foo")
+        c.observe("bar", 3)
+        self.assertDictEqual(c.snapshot(), {"counts": {}, "observations": {}})
+
+    def test_enabled_counters_record_events_and_values(self):
+        c = Counters()
+        c.enabled = True
+        c.increment("foo")
+        c.increment("foo", 2)
+        c.observe("bar", 3)
+        c.observe("bar", 5)
+        snapshot = c.snapshot()
+        self.assertEqual(snapshot["counts"]["foo"], 3)
+        self.assertEqual(snapshot["observations"]["bar"]["count"], 2)
+        self.assertEqual(snapshot["observations"]["bar"]["min"], 3)
+        self.assertEqual(snapshot["observations"]["bar"]["max"], 5)
+
+    def test_variable_fallback_is_counted(self):
+        counters.enabled = True
+        v = Variable(Int)
+        v.annotate(Scope(), None)
+        self.assertEqual(counters.counts["fallback.expression.variable_to_literal"], 1)
+        self.assertEqual(counters.counts["scope.choose_variable"], 1)
+
+    def test_tree_statistics(self):
+        S = Nonterminal("S")
+        grammar = PCFG(S, [PProduction(S, ("a", "b"), 1.0)])
+        tree = grammar.randomtree()
+        self.assertDictEqual(
+            tree_statistics(tree),
+            {"size": 3, "depth": 2, "expansions": {"S": 1}}
+        )
+
+    def test_log_aggregates_batch(self):
+        S = Nonterminal("S")
+        grammar = PCFG(S, [PProduction(S, ("a",), 1.0)])
+        counters.enabled = True
+        log = StatisticsLog()
+        for seed in ["a", "b"]:
+            counters.reset()
+            counters.increment("foo")
+            counters.observe("bar", 4)
+            log.record(grammar.randomtree(), seed=seed)
+        batch = log.summary()["batch"]
+        self.assertEqual(batch["programs"], 2)
+        self.assertEqual(batch["counts"]["foo"], 2)
+        self.assertEqual(batch["observations"]["bar"]["count"], 2)
+        self.assertEqual(batch["expansions"]["S"], 2)
+        self.assertEqual(batch["size"]["total"], 4)
+
+    def test_concurrent_saves_aggregate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "s.json")
+            with ProcessPoolExecutor(max_workers=4) as pool:
+                list(pool.map(save_statistics, [path] * 4))
+            with open(path) as f:
+                self.assertEqual(json.load(f)["batch"]["programs"], 40)
+
+    def test_save_aggregates_without_changing_programs(self):
+        S = Nonterminal("S")
+        grammar = PCFG(S, [PProduction(S, ("a",), 1.0)])
+        with tempfile.TemporaryDirectory() as directory:
+            first, second = os.path.join(directory, "s.json"), os.path.join(directory, "t.json")
+            previous = StatisticsLog()
+            previous.record(grammar.randomtree())
+            previous.save(first)
+
+            log = StatisticsLog()
+            log.record(grammar.randomtree())
+            log.save(first)
+            log.save(second)
+            self.assertEqual(len(log.programs), 1)
+            with open(first) as f:
+                self.assertEqual(json.load(f)["batch"]["programs"], 2)
+            with open(second) as f:
+                self.assertEqual(json.load(f)["batch"]["programs"], 1)
@@ -0,0 +1,107 @@
+from swiftsmith import types
+from swiftsmith.harness.runner import generate_sources
+from swiftsmith.harness.scheduler import random_seeds
+from swiftsmith.names import identifier
+from swiftsmith.program import Program
+from swiftsmith.swarm import Configuration, Swarm, expected_size, max_tree_depth, max_tree_size
+from swiftsmith.swift import swift
+from swiftsmith.types import AccessLevel
+
+import json
+import random
+import time
+import unittest
+
+def depths(tree):
+    """The depth of each node of a tree."""
+    depths = []
+    stack = [(tree, 0)]
+    while stack:
+        node, depth = stack.pop()
+        depths.append(depth)
+        stack.extend((child, depth + 1) for child in node.children or ())
+    return depths
+
+class SwarmTests(unittest.TestCase):
+    def tearDown(self):
+        identifier.reset()
+
+    def test_expected_size(self):
+        self.assertGreater(expected_size(swift), 1)
+        # Without its only production which ends the list, S can't derive a finite tree.
+        weights = [0.0 if i == 2 else rule.probability for i, rule in enumerate(swift)]
+        self.assertEqual(expected_size(swift, weights), float("inf"))
+        self.assertEqual(expected_size(swift, limit=1.0), float("inf"))
+
+    def test_configurations_are_valid(self):
+        swarm = Swarm(seed="swarm", size=1, disable=0.5)
+        for _ in range(20):
+            configuration = swarm.next()
+            self.assertLessEqual(configuration.expected_size(), swarm.max_size)
+            symbols = {rule.lhs for rule in configuration.grammar()}
+            self.assertEqual(symbols, {rule.lhs for rule in swift})
+            self.assertEqual(configuration.access[AccessLevel.local], 0.0)
+        self.assertEqual(swarm.statistics()["sampled"], 20)
+
+    def test_batches(self):
+        swarm = Swarm(seed="swarm", size=3)
+        configurations = [swarm.next() for _ in range(6)]
+        self.assertEqual(len(set(configurations[:3])), 1)
+        self.assertNotEqual(configurations[2], configurations[3])
+        # The configurations are determined by the seed.
+        again = Swarm(seed="swarm", size=3)
+        self.assertEqual([again.next() for _ in range(6)], configurations)
+
+    def test_grammar_is_reused(self):
+        configuration = Swarm(seed="swarm").next()
+        copy = Configuration.from_dict(json.loads(json.dumps(configuration.to_dict())))
+        self.assertEqual(copy, configuration)
+        self.assertIs(copy.grammar(), configuration.grammar())
+
+    def test_disabled_productions_are_unused(self):
+        configuration = Configuration(disabled=[1], weights=None)
+        for seed in ["AAE=", "AAI=", "AAM="]:
+            tree = Program(seed, grammar=configuration.grammar()).generate()
+            self.assertFalse(any(
+                node.production is not None and node.production.rhs == swift[1].rhs
+                for node in tree.preorder(values=False)
+            ))
+
+    def test_access_weights(self):
+        configuration = Configuration(access=[0.0, 0.0, 0.0, 0.0, 1.0])
+        with configuration.applied():
+            self.assertEqual({AccessLevel.random() for _ in range(20)}, {AccessLevel.public})
+        self.assertEqual(types.access_weights, (0.0, 0.3, 0.1, 0.2, 0.4))
+
+    def test_programs_are_valid(self):
+        swarm = Swarm(seed="valid", size=1)
+        for i in range(10):
+            configuration = swarm.next()
+            program = Program(f"AA{i:02d}", grammar=configuration.grammar())
+            with configuration.applied():
+                program.generate()
+                program.annotate()
+                program.validate()
+
+    def test_generate_sources(self):
+        configuration = Swarm(seed="sources").next()
+        sources = generate_sources("AAE=", configuration=configuration)
+        self.assertEqual(sources, generate_sources("AAE=", configuration=configuration))
+        self.assertNotEqual(sources, generate_sources("AAE="))
+
+    def test_heavy_tailed_configurations_are_bounded(self):
+        # The 50th configuration of this swarm once generated a tree 115 statements deep
+        # for the 50th seed, which took minutes to annotate.
+        swarm = Swarm(seed="x", size=1)
+        seeds = random_seeds(random.Random(5))
+        start = time.monotonic()
+        for _ in range(50):
+            configuration = swarm.next()
+            program = Program(next(seeds), grammar=configuration.grammar())
+            with configuration.applied():
+                tree = program.generate()
+                program.annotate()
+            identifier.reset()
+            self.assertLess(max(depths(tree)), max_tree_depth + 20)
+            self.assertLess(len(depths(tree)), 2 * max_tree_size)
+        self.assertLess(time.monotonic() - start, 60)
@@ -0,0 +1,93 @@
+from swiftsmith.expression import Value, Variable as ExpressionVariable
+from swiftsmith.function import Function, FuncDeclaration
+from swiftsmith.metamorphic import failable_initializer
+from swiftsmith.scope import Scope
+from swiftsmith.standard_library import Bool, Int
+from swiftsmith.statement import Declaration, Variable as StatementVariable
+from swiftsmith.types import AccessLevel, EnumType
+from swiftsmith.validation import InvalidProgram, Validator, validate
+from tests import annotated
+
+import unittest
+
+def tokens(tree, cls):
+    """The values of the nodes of a tree, and of its expressions' subtrees."""
+    for node in tree.preorder(values=False):
+        if isinstance(node.value, cls):
+            yield node.value
+        subtree = getattr(node.value, "annotations", {}).get("subtree")
+        if subtree is not None:
+            yield from tokens(subtree, cls)
+
+class ValidatorTests(unittest.TestCase):
+    def assertProblem(self, tree, text):
+        reasons = [problem.reason for problem in Validator().check(tree)]
+        self.assertTrue(any(text in reason for reason in reasons), reasons)
+
+    def test_generated_programs_are_valid(self):
+        for seed in ["AAE=", "AAI=", "ABC=", "Zm9v"]:
+            self.assertEqual(Validator().check(annotated(seed).parsetree), [])
+
+    def test_undeclared_variable(self):
+        tree = annotated("Zm9v").parsetree
+        token = next(t for t in tokens(tree, ExpressionVariable) if t.annotations["variable"])
+        token.annotations["variable"] = Scope.Variable("undeclared", token.datatype, False)
+        self.assertProblem(tree, "use of undeclared variable undeclared")
+
+    def test_declaration_type_mismatch(self):
+        tree = annotated("Zm9v").parsetree
+        declaration = next(tokens(tree, Declaration))
+        wrong = Bool if declaration.annotations["datatype"] != Bool else Int
+        declaration.annotations["datatype"] = wrong
+        self.assertProblem(tree, f"used as {wrong.full_name()}")
+
+    def test_assignment_to_constant(self):
+        tree = annotated("ABC=").parsetree
+        assigned = {t.annotations["name"] for t in tokens(tree, StatementVariable)}
+        declaration = next(t for t in tokens(tree, Declaration) if t.annotations["name"] in assigned)
+        declaration.mutable = False
+        self.assertProblem(tree, "assignment to constant")
+
+    def test_invalid_literal(self):
+        tree = annotated("Zm9v").parsetree
+        value = next(t for t in tokens(tree, Value) if t.datatype == Int)
+        value.annotations["value"] = "true"
+        self.assertProblem(tree, "is not a value of type Int")
+
+    def test_public_function_with_private_type(self):
+        tree = annotated("AAE=").parsetree
+        declaration = next(n for n in tree.preorder(values=False)
+                           if isinstance(n.value, FuncDeclaration)
+                           and n.value.annotations["access"] == AccessLevel.public)
+        function = declaration.childwhere(lambda n: isinstance(n.value, Function)).value
+        function.annotations["arguments"] = {"x": EnumType("P", access=AccessLevel.private)}
+        self.assertProblem(tree, "uses the less visible type P")
+
+    def test_missing_return(self):
+        tree = annotated("AAE=").parsetree
+        node = next(n for n in tree.preorder(values=False) if n.value == "return ")
+        node.value = "_ = "
+        self.assertProblem(tree, "missing return")
+
+    def test_failable_initializer(self):
+        tree = annotated("Zm9v").parsetree
+        failable_initializer(tree)
+        self.assertIn("init?() { self = Ao.aq }", tree.string())
+        self.assertEqual(Validator().check(tree), [])
+
+        # The initializer's expression uses a variable of the function it was taken from.
+        tree = annotated("ABC=").parsetree
+        failable_initializer(tree)
+        self.assertIn("init?() { self = x }", tree.string())
+        self.assertProblem(tree, "use of undeclared variable x")
+
+    def test_validate_raises_first_problem(self):
+        tree = annotated("AAE=").parsetree
+        next(n for n in tree.preorder(values=False) if n.value == "return ").value = "_ = "
+        with self.assertRaises(InvalidProgram) as context:
+            validate(tree)
+        self.assertIn("missing return", context.exception.reason)
+        self.assertIsNotNone(context.exception.node)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+from swiftsmith.expression import Expression
+from swiftsmith.metamorphic import failable_initializer, unnecessary_addition, unnecessary_multiplication
+from swiftsmith.program import Program
+from swiftsmith.semantics import SemanticParseTree
+from swiftsmith.standard_library import Int
+from swiftsmith.variants import Variant, variants
+
+from contextlib import redirect_stdout
+import io
+import random
+import unittest
+
+class VariantTests(unittest.TestCase):
+    def setUp(self):
+        self.tree = SemanticParseTree("root", [
+            SemanticParseTree("left", [Expression(Int)]),
+            SemanticParseTree("right", ["a", "b"]),
+        ])
+        self.tree.annotate()
+        self.original = self.tree.string()
+        self.expression = self.tree.children[0].string()
+
+    def test_variant_leaves_base_unchanged(self):
+        variant = Variant(self.tree)
+        self.assertTrue(variant.apply(unnecessary_addition))
+        self.assertEqual(self.tree.string(), self.original)
+        self.assertEqual(variant.string(), f"({self.expression}) + 0ab")
+
+    def test_variant_shares_untouched_subtrees(self):
+        variant = Variant(self.tree)
+        variant.apply(unnecessary_addition)
+        self.assertIsNot(variant.root, self.tree)
+        self.assertIsNot(variant.root.children[0], self.tree.children[0])
+        self.assertIs(variant.root.children[1], self.tree.children[1])
+
+    def test_variant_reuses_rendered_subtrees(self):
+        self.tree.string()
+        variant = Variant(self.tree)
+        variant.apply(unnecessary_addition)
+        self.assertIsNotNone(variant.root.children[1]._string)
+        self.assertIsNone(variant.root._string)
+        self.assertEqual(variant.string(), f"({self.expression}) + 0ab")
+        self.assertEqual(self.tree.string(), self.original)
+
+    def test_composed_relations_edit_same_copy(self):
+        variant = Variant(self.tree)
+        variant.apply(unnecessary_addition)
+        variant.apply(unnecessary_multiplication)
+        self.assertEqual(variant.string(), f"(({self.expression}) + 0) * 1ab")
+        self.assertEqual(variant.relations, [unnecessary_addition, unnecessary_multiplication])
+
+    def test_inapplicable_relation_is_not_recorded(self):
+        variant = Variant(self.tree)
+        with redirect_stdout(io.StringIO()):
+            self.assertFalse(variant.apply(failable_initializer))
+        self.assertIs(variant.root, self.tree)
+        self.assertEqual(variant.relations, [])
+
+    def test_variants_of_program(self):
+        program = Program("Zm9v")
+        program.generate()
+        program.annotate()
+        original = program.render()
+        random.seed(0)
+        mrs = [unnecessary_addition, unnecessary_multiplication, failable_initializer]
+        with redirect_stdout(io.StringIO()):
+            results = list(variants(program.parsetree, mrs, 5))
+        self.assertEqual(len(results), 5)
+        self.assertEqual(program.render(), original)
+        for variant in results:
+            self.assertTrue(variant.relations)
+            self.assertNotEqual(program.render(variant), original)
+
+if __name__ == '__main__':
+    unittest.main()